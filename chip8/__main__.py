@@ -0,0 +1,10 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import runpy
+
+# python -m chip8 program.ch8
+runpy.run_module('chip8.chip8', run_name='__main__', alter_sys=True)
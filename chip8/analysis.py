@@ -0,0 +1,193 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import collections
+
+from .disassembler import disassemble
+from .quirks import DEFAULT_PROFILE, profile_for_filename
+
+PROGRAM_START = 0x200
+
+# Longest subroutine body (instructions) checked for the purity.
+MAX_PURE_SUBROUTINE = 64
+
+# Opcodes of the extended instruction sets (the masks & values).
+SCHIP_OPCODES = [
+    (0xFFF0, 0x00C0),  # SCD n
+    (0xFFFF, 0x00FB),  # SCR
+    (0xFFFF, 0x00FC),  # SCL
+    (0xFFFF, 0x00FD),  # EXIT
+    (0xFFFF, 0x00FE),  # LOW
+    (0xFFFF, 0x00FF),  # HIGH
+    (0xF0FF, 0xF030),  # LD HF, Vx
+    (0xF0FF, 0xF075),  # LD R, Vx
+    (0xF0FF, 0xF085)   # LD Vx, R
+]
+
+XOCHIP_OPCODES = [
+    (0xFFF0, 0x00D0),  # SCU n
+    (0xF00F, 0x5002),  # SAVE Vx - Vy
+    (0xF00F, 0x5003),  # LOAD Vx - Vy
+    (0xFFFF, 0xF000),  # LD I, nnnn (4 bytes)
+    (0xFFFF, 0xF002),  # AUDIO
+    (0xF0FF, 0xF001),  # PLANE n
+    (0xF0FF, 0xF03A)   # PITCH Vx
+]
+
+# Skip instructions: SE, SNE, SER, SNER, SKP & SKNP
+SKIP_PREFIXES = (0x3, 0x4, 0x5, 0x9)
+SKIP_KEY_OPCODES = (0x9E, 0xA1)
+
+# code        - addresses of the reachable instructions,
+# data        - addresses of the ROM bytes which aren't a part of any reachable instruction,
+# subroutines - CALL targets,
+# references  - LDI targets,
+# indirect    - addresses of the JMPR instructions (the targets depend on V0),
+# platform    - name of the detected quirk profile.
+Analysis = collections.namedtuple(
+    'Analysis', 'code data subroutines references indirect platform')
+
+# registers - the V registers the body reads or writes,
+# index     - True when the body reads or writes I,
+# start/end - the address range of the body instructions.
+Effects = collections.namedtuple('Effects', 'registers index start end')
+
+
+def _matches(opcode, patterns):
+    return any(opcode & mask == value for mask, value in patterns)
+
+
+def trace_code(data, origin=PROGRAM_START):
+    """
+    Follows the control flow of the program image from the origin.
+    Returns the sets of the reachable instruction addresses, CALL targets,
+    LDI targets, JMPR addresses & the used extended opcodes.
+    """
+    end = origin + len(data)
+    code, subroutines, references, indirect, extended = set(), set(), set(), set(), set()
+    pending = [origin]
+
+    while pending:
+        addr = pending.pop()
+        while addr is not None and origin <= addr < end - 1 and addr not in code:
+            opcode = data[addr - origin] << 8 | data[addr - origin + 1]
+            if _matches(opcode, SCHIP_OPCODES) or _matches(opcode, XOCHIP_OPCODES):
+                extended.add(opcode)
+                code.add(addr)
+                addr = None if opcode == 0x00FD else addr + (4 if opcode == 0xF000 else 2)
+            elif disassemble(opcode).startswith('DW'):
+                addr = None
+            else:
+                code.add(addr)
+                addr = _successor(opcode, addr, subroutines, references, indirect, pending)
+
+    return code, subroutines, references, indirect, extended
+
+
+def _successor(opcode, addr, subroutines, references, indirect, pending):
+    """
+    Notes the targets of the instruction at the address (the branches are
+    appended to the pending addresses). Returns the address of the next
+    instruction on the path (None when the path ends).
+    """
+    prefix, nnn = opcode >> 12, opcode & 0xfff
+    if opcode == 0x00EE:
+        return None
+    if prefix == 0x1:
+        return nnn
+    if prefix == 0x2:
+        subroutines.add(nnn)
+        pending.append(nnn)
+    elif prefix == 0xA:
+        references.add(nnn)
+    elif prefix == 0xB:
+        indirect.add(addr)
+        pending.append(nnn)
+        return None
+    elif prefix in SKIP_PREFIXES or (prefix == 0xE and opcode & 0xff in SKIP_KEY_OPCODES):
+        pending.append(addr + 4)
+    return addr + 2
+
+
+def register_effects(opcode):
+    """
+    Returns the V registers & whether I is accessed by the opcode which
+    touches only the registers (None for all the other opcodes). The registers
+    are approximated from above, e.g. 8xy1 includes VF (the vf_reset quirk).
+    """
+    prefix, x, y = opcode >> 12, (opcode >> 8) & 0xf, (opcode >> 4) & 0xf
+    if prefix in (0x3, 0x4, 0x6, 0x7):
+        return (x,), False
+    if prefix in (0x5, 0x9) and opcode & 0xf == 0:
+        return (x, y), False
+    if prefix == 0x8 and opcode & 0xf in (0x0, 0x1, 0x2, 0x3, 0x4, 0x5, 0x6, 0x7, 0xE):
+        return (x, y, 0xf), False
+    if prefix == 0xA:
+        return (), True
+    if prefix == 0xF and opcode & 0xff in (0x1E, 0x29):
+        return (x,), True
+    return None
+
+
+def pure_subroutine(memory, addr):
+    """
+    Returns the Effects of the subroutine at the address if its body only
+    reads & writes the registers and I (no DRW, RND, key, timer, memory
+    or stack access), None otherwise. The jumps & skips are followed within
+    the body; the subroutine must return with RET.
+    """
+    registers, index, returns = set(), False, False
+    code, pending = set(), [addr]
+
+    while pending:
+        addr = pending.pop()
+        while addr not in code:
+            if addr + 1 >= len(memory) or len(code) == MAX_PURE_SUBROUTINE:
+                return None
+            opcode = memory[addr] << 8 | memory[addr + 1]
+            code.add(addr)
+
+            if opcode == 0x00EE:
+                returns = True
+                break
+            if opcode >> 12 == 0x1:
+                addr = opcode & 0xfff
+                continue
+            effects = register_effects(opcode)
+            if effects is None:
+                return None
+            registers.update(effects[0])
+            index = index or effects[1]
+            if opcode >> 12 in SKIP_PREFIXES:
+                pending.append(addr + 4)
+            addr += 2
+
+    if not returns:
+        return None
+    return Effects(tuple(sorted(registers)), index, min(code), max(code) + 2)
+
+
+def detect_platform(extended, fname=None):
+    """Returns the quirk profile name matching the used extended opcodes (or the file name)."""
+    if any(_matches(opcode, XOCHIP_OPCODES) for opcode in extended):
+        return 'xochip'
+    if extended:
+        return 'schip'
+    return profile_for_filename(fname) if fname else DEFAULT_PROFILE
+
+
+def analyze(data, fname=None, origin=PROGRAM_START):
+    """Returns the static analysis of the program image."""
+    code, subroutines, references, indirect, extended = trace_code(data, origin)
+    covered = set(code)
+    covered.update(addr + 1 for addr in code)
+    image = range(origin, origin + len(data))
+    return Analysis(code=code,
+                    data=set(addr for addr in image if addr not in covered),
+                    subroutines=subroutines,
+                    references=references,
+                    indirect=indirect,
+                    platform=detect_platform(extended, fname))
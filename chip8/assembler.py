@@ -0,0 +1,419 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import argparse
+import os
+import re
+
+PROGRAM_START = 0x200
+MEMORY_SIZE   = 0x1000
+
+# Mnemonic: (operands, opcode base). The operands are encoded the same way
+# as the chip8.inc macros do:
+#   a - 12-bit address (nnn), r - register (x, then y), b - byte (kk), n - nibble
+INSTRUCTIONS = {
+    'cls':  ('',    0x00E0), 'ret':  ('',    0x00EE),
+    'jmp':  ('a',   0x1000), 'call': ('a',   0x2000),
+    'se':   ('rb',  0x3000), 'sne':  ('rb',  0x4000),
+    'ser':  ('rr',  0x5000), 'ld':   ('rb',  0x6000),
+    'add':  ('rb',  0x7000), 'ldr':  ('rr',  0x8000),
+    'or':   ('rr',  0x8001), 'and':  ('rr',  0x8002),
+    'xor':  ('rr',  0x8003), 'addr': ('rr',  0x8004),
+    'sub':  ('rr',  0x8005), 'shr':  ('rr',  0x8006),
+    'subn': ('rr',  0x8007), 'shl':  ('rr',  0x800E),
+    'sner': ('rr',  0x9000), 'ldi':  ('a',   0xA000),
+    'jmpr': ('a',   0xB000), 'rnd':  ('rb',  0xC000),
+    'drw':  ('rrn', 0xD000), 'skp':  ('r',   0xE09E),
+    'sknp': ('r',   0xE0A1), 'ldt':  ('r',   0xF007),
+    'ldk':  ('r',   0xF00A), 'lddt': ('r',   0xF015),
+    'ldst': ('r',   0xF018), 'addi': ('r',   0xF01E),
+    'ldf':  ('r',   0xF029), 'ldb':  ('r',   0xF033),
+    'ldir': ('r',   0xF055), 'ldri': ('r',   0xF065)
+}
+
+OPERAND_MASKS = {'a': 0xfff, 'b': 0xff, 'n': 0xf}
+
+# Already provided by the built-in instruction set.
+BUILTIN_INCLUDES = ('chip8.inc',)
+
+REGISTER = re.compile(r'^v(1[0-5]|[0-9a-f])$', re.IGNORECASE)
+LABEL    = re.compile(r'^([A-Za-z_.][\w.]*):')
+TOKEN    = re.compile(r"""\s*(?:
+    (?P<number>0x[0-9a-f]+|0b[01]+|[0-9]+) |
+    (?P<char>'.') |
+    (?P<name>[A-Za-z_.$][\w.]*) |
+    (?P<op><<|>>|[-+*/%&|^~()])
+)""", re.IGNORECASE | re.VERBOSE)
+
+NUMBER_BASES = {'0x': 16, '0b': 2}
+
+BINARY_OPERATORS = (
+    ('|',),
+    ('^',),
+    ('&',),
+    ('<<', '>>'),
+    ('+', '-'),
+    ('*', '/', '%'),
+)
+
+
+class AssemblerException(Exception):
+    def __init__(self, line, message):
+        super(AssemblerException, self).__init__(
+            'Line {}: {}.'.format(line, message))
+        self.line = line
+
+
+def _apply(op, a, b):
+    if op == '|':
+        return a | b
+    if op == '^':
+        return a ^ b
+    if op == '&':
+        return a & b
+    if op == '<<':
+        return a << b
+    if op == '>>':
+        return a >> b
+    if op == '+':
+        return a + b
+    if op == '-':
+        return a - b
+    if op == '*':
+        return a * b
+    if b == 0:
+        raise ValueError('division by zero')
+    return a // b if op == '/' else a % b
+
+
+class Expression(object):
+    """
+    Integer expression evaluator.
+
+    Supports the decimal, hexadecimal (0x) & binary (0b) numbers, character
+    literals, symbols, the current address ($), unary - & ~ and the binary
+    operators with the C precedence.
+    """
+
+    def __init__(self, text, symbols, address, scope=''):
+        self.tokens = self.tokenize(text)
+        self.symbols = symbols
+        self.address = address
+        self.scope = scope
+        self.position = 0
+
+    @staticmethod
+    def tokenize(text):
+        tokens = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = TOKEN.match(text, position)
+            if match is None:
+                raise ValueError('unexpected character in {!r}'.format(text))
+            tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            position = match.end()
+        return tokens
+
+    def evaluate(self):
+        if not self.tokens:
+            raise ValueError('missing expression')
+        value = self._binary(0)
+        if self.position != len(self.tokens):
+            raise ValueError('unexpected {!r}'.format(self.tokens[self.position][1]))
+        return value
+
+    def _peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def _binary(self, level):
+        if level == len(BINARY_OPERATORS):
+            return self._unary()
+        value = self._binary(level + 1)
+        while self._peek()[0] == 'op' and self._peek()[1] in BINARY_OPERATORS[level]:
+            op = self.tokens[self.position][1]
+            self.position += 1
+            value = _apply(op, value, self._binary(level + 1))
+        return value
+
+    def _unary(self):
+        kind, value = self._peek()
+        self.position += 1
+        parse = self.UNARY_OPERATORS.get(value) if kind == 'op' else self.TERMS.get(kind)
+        if parse is None:
+            raise ValueError('unexpected {!r}'.format(value))
+        return parse(self, value)
+
+    def _number(self, value):
+        base = NUMBER_BASES.get(value[:2].lower())
+        return int(value, 10) if base is None else int(value[2:], base)
+
+    def _char(self, value):
+        return ord(value[1])
+
+    def _name(self, value):
+        if value == '$':
+            return self.address
+        if value.startswith('.'):
+            value = self.scope + value
+        if value not in self.symbols:
+            raise ValueError('undefined symbol {!r}'.format(value))
+        return self.symbols[value]
+
+    def _negative(self, value):
+        return -self._unary()
+
+    def _inverted(self, value):
+        return ~self._unary()
+
+    def _parenthesized(self, value):
+        result = self._binary(0)
+        if self._peek()[1] != ')':
+            raise ValueError('missing closing parenthesis')
+        self.position += 1
+        return result
+
+    # The parsers of the terms by the token kind & of the unary operators.
+    TERMS = {'number': _number, 'char': _char, 'name': _name}
+    UNARY_OPERATORS = {'-': _negative, '~': _inverted, '(': _parenthesized}
+
+
+def split_operands(text):
+    """Splits the operands by commas (the quoted strings are kept whole)."""
+    operands, current, quote = [], '', None
+    for char in text:
+        if quote:
+            current += char
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            current += char
+            quote = char
+        elif char == ',':
+            operands.append(current.strip())
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        operands.append(current.strip())
+    return operands
+
+
+def strip_comment(line):
+    """Removes the ; comment from the line (ignoring the quoted semicolons)."""
+    quote = None
+    for index, char in enumerate(line):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == ';':
+            return line[:index]
+    return line
+
+
+class Assembler(object):
+    """
+    Two-pass CHIP-8 assembler.
+
+    The syntax follows the chip8.inc nasm macros (the same mnemonics and
+    encodings) extended with:
+    - labels (name:) & local labels (.name:) scoped to the last global label,
+    - expressions (see Expression),
+    - db, dw, org, equ & %define directives,
+    - %include of other source files (chip8.inc is built-in).
+    """
+
+    def __init__(self, origin=PROGRAM_START, include_path='.'):
+        self.origin = origin
+        self.include_path = include_path
+
+    def assemble(self, source):
+        """Assembles the source and returns the program bytes."""
+        lines = self._preprocess(source, self.include_path)
+
+        # Pass 1: resolves the addresses of the labels.
+        self.symbols = {}
+        self._pass(lines, emit=False)
+
+        # Pass 2: encodes the instructions & data.
+        self.output = bytearray()
+        self._pass(lines, emit=True)
+        return self.output
+
+    def _preprocess(self, source, path):
+        """Returns the (line number, text) pairs with the includes expanded."""
+        lines = []
+        for number, line in enumerate(source.splitlines(), 1):
+            line = strip_comment(line).strip()
+            if not line.lower().startswith('%include'):
+                lines.append((number, line))
+                continue
+
+            fname = line[len('%include'):].strip().strip('"\'')
+            if os.path.basename(fname) in BUILTIN_INCLUDES:
+                continue
+            fname = os.path.join(path, fname)
+            try:
+                with open(fname) as f:
+                    lines.extend(self._preprocess(f.read(), os.path.dirname(fname)))
+            except IOError as e:
+                raise AssemblerException(number, 'cannot include {} ({})'.format(
+                    fname, e.strerror))
+        return lines
+
+    def _pass(self, lines, emit):
+        self.address = self.origin
+        self.size = 0
+        self.scope = ''
+        for number, line in lines:
+            try:
+                self._line(line, emit)
+            except ValueError as e:
+                raise AssemblerException(number, str(e))
+
+    def _symbol(self, name):
+        """Returns the full name of the (local) symbol."""
+        return self.scope + name if name.startswith('.') else name
+
+    def _evaluate(self, text, emit):
+        """Evaluates the expression (unresolved symbols are 0 in the pass 1)."""
+        try:
+            return Expression(text, self.symbols, self.address, self.scope).evaluate()
+        except ValueError as e:
+            if emit or 'undefined symbol' not in str(e):
+                raise
+            return 0
+
+    def _define(self, name, value, emit):
+        name = self._symbol(name)
+        if not emit and name in self.symbols:
+            raise ValueError('symbol {!r} redefined'.format(name))
+        self.symbols[name] = value
+
+    def _line(self, line, emit):
+        match = LABEL.match(line)
+        if match:
+            name = match.group(1)
+            if not name.startswith('.'):
+                self.scope = name
+            self._define(name, self.address, emit)
+            line = line[match.end():].strip()
+
+        if not line:
+            return
+        if line.startswith('[') and line.endswith(']'):
+            line = line[1:-1].strip()
+
+        parts = line.split(None, 1)
+        mnemonic = parts[0].lower()
+        rest = parts[1] if len(parts) > 1 else ''
+        words = rest.split(None, 1) + ['']
+
+        if mnemonic != '%define' and words[0].lower() == 'equ':
+            self._define(parts[0], self._evaluate(words[1], emit), emit)
+        elif mnemonic in self.DIRECTIVES:
+            self.DIRECTIVES[mnemonic](self, rest, emit)
+        elif mnemonic in INSTRUCTIONS:
+            opcode = self._instruction(mnemonic, split_operands(rest), emit)
+            self._emit(bytearray(((opcode >> 8) & 0xff, opcode & 0xff)), emit)
+        else:
+            raise ValueError('unknown instruction {!r}'.format(parts[0]))
+
+    def _define_directive(self, text, emit):
+        words = text.split(None, 1) + ['']
+        self._define(words[0], self._evaluate(words[1], emit), emit)
+
+    def _org(self, text, emit):
+        address = self._evaluate(text, True)
+        if not self.size:
+            self.address = address
+        elif address < self.address:
+            raise ValueError('org {:#x} moves backwards'.format(address))
+        else:
+            self._emit(bytearray(address - self.address), emit)
+
+    def _db(self, text, emit):
+        self._emit(self._data(text, emit), emit)
+
+    def _dw(self, text, emit):
+        data = bytearray()
+        for operand in split_operands(text):
+            value = self._evaluate(operand, emit)
+            data.extend(((value >> 8) & 0xff, value & 0xff))
+        self._emit(data, emit)
+
+    # The directives by the mnemonic (except equ, which follows the name it defines).
+    DIRECTIVES = {'%define': _define_directive, 'org': _org, 'db': _db, 'dw': _dw}
+
+    def _data(self, text, emit):
+        data = bytearray()
+        for operand in split_operands(text):
+            if len(operand) > 1 and operand[0] == '"' and operand[-1] == '"':
+                data.extend(bytearray(operand[1:-1].encode('latin-1')))
+            else:
+                data.append(self._evaluate(operand, emit) & 0xff)
+        return data
+
+    def _register(self, operand, emit):
+        match = REGISTER.match(operand)
+        if match:
+            return int(match.group(1), 10 if len(match.group(1)) == 2 else 16)
+        return self._evaluate(operand, emit) & 0xf
+
+    def _instruction(self, mnemonic, operands, emit):
+        kinds, opcode = INSTRUCTIONS[mnemonic]
+        if len(operands) != len(kinds):
+            raise ValueError('{} expects {} operand(s), got {}'.format(
+                mnemonic, len(kinds), len(operands)))
+
+        registers = 0
+        for kind, operand in zip(kinds, operands):
+            if kind == 'r':
+                shift = 8 if registers == 0 else 4
+                opcode |= self._register(operand, emit) << shift
+                registers += 1
+            else:
+                opcode |= self._evaluate(operand, emit) & OPERAND_MASKS[kind]
+        return opcode
+
+    def _emit(self, data, emit):
+        if self.address + len(data) > MEMORY_SIZE:
+            raise ValueError('program exceeds the memory size')
+        if emit:
+            self.output.extend(data)
+        self.address += len(data)
+        self.size += len(data)
+
+
+def assemble(source, origin=PROGRAM_START, include_path='.'):
+    """Assembles the CHIP-8 source code and returns the program bytes."""
+    return Assembler(origin, include_path).assemble(source)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        'python -m chip8.assembler',
+        description='CHIP-8 assembler',
+        formatter_class=lambda prog: argparse.HelpFormatter(
+            prog, max_help_position=100, width=150))
+
+    parser.add_argument('source', help='Assembly source file')
+
+    parser.add_argument('-o', '--output', required=True,
+                        help='Specify the output ROM file')
+
+    parser.add_argument('--org', type=lambda value: int(value, 0), default=PROGRAM_START,
+                        help='Specify the origin address (default=0x200)')
+
+    args = parser.parse_args()
+    with open(args.source) as f:
+        program = assemble(f.read(), args.org, os.path.dirname(args.source) or '.')
+    with open(args.output, 'wb') as f:
+        f.write(program)
@@ -0,0 +1,101 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import argparse
+import os
+import subprocess
+import sys
+import timeit
+
+from .assembler import assemble
+from .chip8 import Chip8
+
+CYCLES = 200000
+REPEAT = 3
+
+# Mix of the ALU, memory, BCD, font & drawing instructions (no key waits).
+PROGRAM = """
+            ld v0, 0
+            ld v1, 0
+    loop:   add v0, 1
+            addr v1, v0
+            ldr v2, v1
+            shr v2, v2
+            xor v2, v0
+            and v2, v1
+            ld v3, 0x0f
+            and v3, v2
+            ldf v3
+            drw v0, v1, 5
+            ldi 0x300
+            ldb v1
+            ldri v2
+            ldir v2
+            sne v0, 0
+            cls
+            jmp loop
+"""
+
+
+def measure_ips(data=None, cycles=CYCLES, repeat=REPEAT):
+    """Returns the best instructions per second of the repeated headless runs."""
+    data = assemble(PROGRAM) if data is None else data
+    best = None
+
+    for _ in range(repeat):
+        cycle = Chip8(data, headless=True, seed=0).cycle
+        start = timeit.default_timer()
+        for _ in range(cycles):
+            cycle()
+        elapsed = timeit.default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return cycles / best
+
+
+def measure_interpreter(python, program=None, cycles=CYCLES, repeat=REPEAT):
+    """Runs the benchmark with another Python interpreter and returns its IPS."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command = [python, '-m', 'chip8.benchmark', '--cycles', str(cycles), '--repeat', str(repeat)]
+    if program is not None:
+        command.append(os.path.abspath(program))
+    output = subprocess.check_output(command, cwd=root, stderr=subprocess.STDOUT)
+    return float(output.decode('ascii').split()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        'python -m chip8.benchmark',
+        description='CHIP-8 interpreter benchmark (instructions per second)',
+        formatter_class=lambda prog: argparse.HelpFormatter(
+            prog, max_help_position=100, width=150))
+
+    parser.add_argument('program', nargs='?',
+                        help='CHIP-8 ROM (default=builtin instruction mix)')
+
+    parser.add_argument('-n', '--cycles', type=int, default=CYCLES,
+                        help='Specify number of cycles per run (default={})'.format(CYCLES))
+
+    parser.add_argument('-r', '--repeat', type=int, default=REPEAT,
+                        help='Specify number of runs (default={})'.format(REPEAT))
+
+    parser.add_argument('--compare', metavar='PYTHON',
+                        help='Run the benchmark also with the other interpreter (e.g. python2.7)')
+
+    args = parser.parse_args()
+    data = None
+    if args.program is not None:
+        with open(args.program, 'rb') as f:
+            data = bytearray(f.read())
+
+    ips = measure_ips(data, args.cycles, args.repeat)
+    if args.compare is None:
+        print('{:.0f}'.format(ips))
+        sys.exit(0)
+
+    other = measure_interpreter(args.compare, args.program, args.cycles, args.repeat)
+    print('Python {}.{}: {:.0f} IPS'.format(sys.version_info[0], sys.version_info[1], ips))
+    print('{}: {:.0f} IPS'.format(args.compare, other))
+    print('Speedup: {:.2f}x'.format(ips / other))
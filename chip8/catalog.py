@@ -0,0 +1,238 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import argparse
+import collections
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+
+from .analysis import analyze
+from .quirks import PROFILES
+
+# Bump when the analysis changes, the older entries are recomputed by the next scan.
+ANALYSIS_VERSION = 1
+
+ROM_EXTENSIONS = ('.ch8', '.c8', '.sc8', '.xo8')
+MAP_SIZE = 0x1000 // 8  # One bit per memory address
+
+# Recommended cycles per 60Hz frame of the platforms.
+CYCLES_PER_FRAME = {
+    'chip8':  16,
+    'vip':    16,
+    'schip':  30,
+    'xochip': 200
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roms (
+    sha256           TEXT PRIMARY KEY,
+    size             INTEGER NOT NULL,
+    platform         TEXT NOT NULL,
+    cycles_per_frame INTEGER NOT NULL,
+    instructions     INTEGER NOT NULL,
+    subroutines      INTEGER NOT NULL,
+    indirect_jumps   INTEGER NOT NULL,
+    code_map         BLOB NOT NULL,
+    data_map         BLOB NOT NULL,
+    version          INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path   TEXT PRIMARY KEY,
+    name   TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    mtime  REAL NOT NULL,
+    size   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256);
+CREATE INDEX IF NOT EXISTS roms_platform ON roms (platform);
+"""
+
+ENTRY_COLUMNS = ('files.path, files.name, roms.sha256, roms.size, roms.platform, '
+                 'roms.cycles_per_frame, roms.instructions, roms.subroutines, '
+                 'roms.indirect_jumps, roms.code_map, roms.data_map')
+
+
+class Entry(collections.namedtuple('Entry', 'path name sha256 size platform cycles_per_frame '
+                                            'instructions subroutines indirect_jumps '
+                                            'code_map data_map')):
+    """Catalog entry (the maps are the bitmaps of the memory addresses)."""
+    __slots__ = ()
+
+    @property
+    def quirks(self):
+        return PROFILES[self.platform]
+
+    def is_code(self, addr):
+        return bool(self.code_map[addr >> 3] >> (addr & 7) & 1)
+
+    def is_data(self, addr):
+        return bool(self.data_map[addr >> 3] >> (addr & 7) & 1)
+
+
+def rom_hash(data):
+    """Returns the SHA-256 hex digest of the ROM."""
+    return hashlib.sha256(bytes(data)).hexdigest()
+
+
+def address_map(addresses):
+    """Returns the bitmap of the memory addresses."""
+    bitmap = bytearray(MAP_SIZE)
+    for addr in addresses:
+        bitmap[addr >> 3] |= 1 << (addr & 7)
+    return bitmap
+
+
+def analyze_rom(path):
+    """
+    Reads & analyzes the ROM file (runs in the worker processes).
+    Returns the row of the roms table.
+    """
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    analysis = analyze(data, path)
+    return (rom_hash(data), len(data), analysis.platform,
+            CYCLES_PER_FRAME[analysis.platform], len(analysis.code),
+            len(analysis.subroutines), len(analysis.indirect),
+            address_map(analysis.code), address_map(analysis.data), ANALYSIS_VERSION)
+
+
+def find_roms(paths):
+    """Yields the ROM files (the directories are searched recursively)."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, _, names in os.walk(path):
+            for name in sorted(names):
+                if os.path.splitext(name)[1].lower() in ROM_EXTENSIONS:
+                    yield os.path.join(root, name)
+
+
+class Catalog(object):
+    """
+    ROM catalog.
+
+    The SQLite database keeps the analysis of every ROM keyed by its SHA-256
+    (so the copies of the same ROM are analyzed once) and the files mapping
+    the paths to the hashes. A scan rehashes only the files whose size or
+    modification time has changed and analyzes only the new ROMs (and the ones
+    analyzed by the older ANALYSIS_VERSION), in parallel.
+    """
+
+    def __init__(self, fname):
+        self.db = sqlite3.connect(fname)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def scan(self, paths, processes=None):
+        """
+        Adds the ROM files to the catalog.
+        Returns the number of the newly analyzed ROMs.
+        """
+        known = dict((row[0], row[1:]) for row in
+                     self.db.execute('SELECT path, mtime, size, sha256 FROM files'))
+        analyzed = set(row[0] for row in
+                       self.db.execute('SELECT sha256 FROM roms WHERE version = ?',
+                                       (ANALYSIS_VERSION,)))
+        files, pending = [], {}
+
+        for path in find_roms(paths):
+            path = os.path.abspath(path)
+            stat = os.stat(path)
+            mtime, size, sha256 = known.get(path, (None, None, None))
+            if (mtime, size) != (stat.st_mtime, stat.st_size):
+                with open(path, 'rb') as f:
+                    sha256 = rom_hash(f.read())
+                files.append((path, os.path.basename(path), sha256, stat.st_mtime, stat.st_size))
+            if sha256 not in analyzed:
+                pending.setdefault(sha256, path)
+
+        if processes == 1 or len(pending) < 2:
+            rows = [analyze_rom(path) for path in pending.values()]
+        else:
+            pool = multiprocessing.Pool(processes)
+            try:
+                rows = pool.map(analyze_rom, list(pending.values()))
+            finally:
+                pool.close()
+                pool.join()
+
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO roms VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                [row[:7] + (sqlite3.Binary(row[7]), sqlite3.Binary(row[8]), row[9])
+                                 for row in rows])
+            self.db.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)', files)
+        return len(rows)
+
+    def _entries(self, where, params):
+        rows = self.db.execute(
+            'SELECT {} FROM files JOIN roms ON files.sha256 = roms.sha256 WHERE {} '
+            'ORDER BY files.name'.format(ENTRY_COLUMNS, where), params)
+        return [Entry(*row[:-2] + (bytearray(row[-2]), bytearray(row[-1]))) for row in rows]
+
+    def lookup(self, sha256):
+        """Returns the entry of the ROM hash (None if unknown)."""
+        entries = self._entries('roms.sha256 = ?', (sha256,))
+        return entries[0] if entries else None
+
+    def lookup_file(self, path):
+        """Returns the entry of the ROM file (None if unknown)."""
+        entries = self._entries('files.path = ?', (os.path.abspath(path),))
+        return entries[0] if entries else None
+
+    def query(self, platform=None, name=None):
+        """Returns the entries of the platform and/or the file name pattern (e.g. '%pong%')."""
+        where, params = ['1'], []
+        if platform is not None:
+            where.append('roms.platform = ?')
+            params.append(platform)
+        if name is not None:
+            where.append('files.name LIKE ?')
+            params.append(name)
+        return self._entries(' AND '.join(where), params)
+
+
+def format_entry(entry):
+    """Formats the catalog entry."""
+    return '{} {:<6} {:>3} cycles/frame {:>5}B ({} instructions, {} subroutines) {}'.format(
+        entry.sha256[:12], entry.platform, entry.cycles_per_frame, entry.size,
+        entry.instructions, entry.subroutines, entry.path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        'python -m chip8.catalog',
+        description='CHIP-8 ROM catalog',
+        formatter_class=lambda prog: argparse.HelpFormatter(
+            prog, max_help_position=100, width=150))
+
+    parser.add_argument('catalog', help='Catalog database file')
+
+    parser.add_argument('-a', '--add', nargs='+', metavar='PATH',
+                        help='Add the ROM files / directories to the catalog')
+
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='Specify number of the analysis processes (default=CPU count)')
+
+    parser.add_argument('-p', '--platform', choices=sorted(PROFILES),
+                        help='List only the ROMs of the platform')
+
+    parser.add_argument('-n', '--name', metavar='PATTERN',
+                        help='List only the ROMs matching the file name pattern (e.g. %%pong%%)')
+
+    args = parser.parse_args()
+    catalog = Catalog(args.catalog)
+
+    if args.add:
+        print('Analyzed {} new ROMs.'.format(catalog.scan(args.add, args.jobs)))
+    else:
+        for entry in catalog.query(args.platform, args.name):
+            print(format_entry(entry))
+    catalog.close()
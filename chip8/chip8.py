@@ -1,4 +1,3 @@
-#!/usr/bin/env python2
 #
 # CHIP-8 interpreter.
 #
@@ -6,16 +5,51 @@
 # This software is released under the MIT license.
 
 import argparse
+import collections
+import logging
 import pygame
+import random
+import time
 
-from display import Display
-from memory import Memory
-from opcode import Opcode
+from .catalog import Catalog, rom_hash
+from .display import FONTS, KEY_INDEX, Display
+from .flight import CRASH_DUMP, FLIGHT_RECORDER_SIZE, FlightRecorder
+from .halt import HALTED, idle_loop
+from .hud import Hud
+from .memo import MemoOpcode
+from .memory import Memory, PagedMemory, split_pages
+from .metrics import METRICS_INTERVAL, Metrics, MetricsFileWriter, MetricsServer
+from .opcode import Opcode
+from .quirks import DEFAULT_PROFILE, PROFILES, profile_for_filename
+from .recorder import (RECORD_SCALE, InputRecorder, Recorder, ReplayFormatException,
+                       load_replay, play_replay)
+from .rewind import Rewind
+from .state import MachineState
+from .terminal import CELLS, TerminalRunner
+from .threaded import ThreadedRunner
+from .timeline import Timeline
+from .tracer import CODECS, Tracer, TraceWriter
 
 # Settings
 PROGRAM_COUNTER_START = 0x200
-STACK_POINTER_START   = 0x50
+STACK_POINTER_START   = 0x0
 SOUND_EFFECT_FILENAME = 'buzz.wav'
+CYCLES_PER_FRAME      = 16
+REWIND_KEY            = pygame.K_BACKSPACE
+HUD_KEY               = pygame.K_F1
+
+# Result of the stepping API: the stop reason ('cycles', 'pc', 'frame',
+# 'predicate' or 'halted'), the executed cycles & the completed frames.
+RunResult = collections.namedtuple('RunResult', 'reason cycles frames')
+
+
+def spins(vm):
+    """Returns True when the VM spins in an idle loop (which can't end without the input)."""
+    return idle_loop(vm) is not None
+
+
+# The registers kept in the plain attributes.
+REGISTERS = ('i', 'pc', 'sp', 'dt', 'st')
 
 
 class Chip8(object):
@@ -34,53 +68,449 @@ class Chip8(object):
     - 1 x 8-bit delay timer (DT)
     - 1 x 8-bit sound timer (ST)
     - 16 x 16 bit array using for stack
+    - 16 keys keypad (stored as the bit mask of pressed keys)
+
+    The emulated state is kept in the MachineState block: the memory, V0-VF,
+    the stack & the framebuffer are views onto it, while I, PC, SP & the timers
+    are the plain attributes (fast to access), stored into the block when the
+    state is read (the state property) and loaded back by load_registers
+    after the block was written. The VMs created with the pages of the memory
+    image share them copy-on-write (the memory isn't in the block then).
     """
 
-    def __init__(self, data, scale=10):
-        self.mem = Memory()
-        self.mem.store_many(PROGRAM_COUNTER_START, data)
+    def __init__(self, data, scale=10, headless=False, engine=Opcode, seed=None, quirks=None,
+                 state=None, pages=None):
+        if state is not None:
+            self._state = state
+        elif pages is not None:
+            self._state = MachineState(memory=PagedMemory(pages))
+        else:
+            self._state = MachineState()
+        self.mem = self._state.memory if self._state.paged else Memory(self._state.memory)
+        self.v = self._state.v
+        self.stack = self._state.stack
+        self.load_registers()
 
-        self.opcode = Opcode(self)
-        self.display = Display(self, scale=scale)
-        self.display.load_fonts()
+        self.quirks = quirks or PROFILES[DEFAULT_PROFILE]
+        self.opcode = engine(self)
+        self.display = Display(self, scale=scale, headless=headless,
+                               clip=self.quirks.clip_sprites, pixels=self._state.framebuffer)
         self.display.load_sound(SOUND_EFFECT_FILENAME)
 
-        self.v = bytearray(0x10)
-        self.pc = PROGRAM_COUNTER_START
-        self.sp = STACK_POINTER_START
+        self.rom = data  # The program started by reset
+        self.random = random.Random(seed)
+        self.keys = 0
+        self.rewinding = False  # The rewind key is held
+        self.hud = None         # The HUD toggled by the HUD key
+        self.frame_listeners = []
 
-        self.dt = 0
-        self.st = 0
-        self.i = 0
+        # Frame structure of the stepping API
+        self.cycles_per_frame = CYCLES_PER_FRAME
+        self.frame = 0         # Completed frames
+        self.frame_cycles = 0  # Cycles executed in the current frame (by run & run_until)
+
+        if state is None:
+            if pages is None:
+                self.mem.store_many(PROGRAM_COUNTER_START, data)
+                self.display.load_fonts()
+            self.pc = PROGRAM_COUNTER_START
+            self.sp = STACK_POINTER_START
 
     @classmethod
-    def load_program_from_file(cls, fname, scale):
-        """Loads up program data into memory."""
+    def load_program_from_file(cls, fname, scale, quirks=None, headless=False, seed=None,
+                               engine=Opcode):
+        """
+        Loads up program data into memory. The quirk profile defaults to the one
+        matching the file extension.
+        """
         with open(fname, 'rb') as f:
             data = bytearray(f.read())
-        return cls(data, scale)
+        return cls(data, scale, headless=headless, engine=engine, seed=seed,
+                   quirks=PROFILES[quirks or profile_for_filename(fname)])
+
+    @staticmethod
+    def memory_image(data):
+        """
+        Returns the memory pages with the fonts & the program, which can be
+        shared by many paged VMs, e.g. Chip8(None, headless=True, pages=image).
+        """
+        mem = Memory()
+        mem.store_many(0, FONTS)
+        mem.store_many(PROGRAM_COUNTER_START, data)
+        return split_pages(mem._mem)
+
+    @staticmethod
+    def boot_state(image, paged=False):
+        """Returns the machine state starting the program of the memory image."""
+        if paged:
+            state = MachineState(memory=PagedMemory(image))
+        else:
+            state = MachineState()
+            Memory(state.memory).store_many(0, bytearray().join(image))
+        state.registers.pc = PROGRAM_COUNTER_START
+        state.registers.sp = STACK_POINTER_START
+        return state
+
+    def reset(self, state=None):
+        """
+        Restarts the machine in place from the boot state (by default the one
+        of the loaded program). The display, the sound & the engine are kept.
+        """
+        if state is None:
+            if self.rom is None:
+                raise ValueError('No program to restart')
+            state = self.boot_state(self.memory_image(self.rom), self.state.paged)
+        self.restore(state)
+        self.keys = 0
+        self.rewinding = False
+        self.frame = 0
+        self.frame_cycles = 0
+
+    def load_rom(self, data, quirks=None, state=None):
+        """
+        Switches the machine to the program in place (the quirks default to
+        the current ones). The boot state can be prepared upfront (see RomPool).
+        """
+        self.rom = data
+        if quirks is not None:
+            self.quirks = quirks
+            self.display.clip = quirks.clip_sprites
+        # Rebuilds the dispatch tables & drops the caches of the engine in place,
+        # so the instrumentation swapped onto the instance stays attached.
+        self.opcode.__init__(self)
+        self.reset(state)
 
-    def run(self, delay):
+    def clone(self):
+        """
+        Returns the headless copy of the VM: a new VM (the display & the engine
+        tables are built again) with the copy of the state block.
+        """
+        vm = type(self)(None, headless=True, engine=type(self.opcode), quirks=self.quirks,
+                        state=self.state.copy())
+        vm.random.setstate(self.random.getstate())
+        vm.keys = self.keys
+        return vm
+
+    @property
+    def state(self):
+        """The machine state (with the registers stored into the block)."""
+        self.store_registers()
+        return self._state
+
+    def store_registers(self):
+        """Stores the register attributes into the state block."""
+        registers = self._state.registers
+        for name in REGISTERS:
+            setattr(registers, name, getattr(self, name))
+
+    def load_registers(self):
+        """Loads the register attributes from the state block (e.g. after it was written)."""
+        registers = self._state.registers
+        for name in REGISTERS:
+            setattr(self, name, getattr(registers, name))
+
+    def snapshot(self):
+        """Returns the copy of the machine state."""
+        return self.state.copy()
+
+    def restore(self, snapshot):
+        """Restores the machine state from the snapshot."""
+        self._state.load(snapshot)
+        self.load_registers()
+        self.display.dirty = True
+        self.display.redraw()
+
+    def cycle(self):
         """Fetches the opcode (2 bytes) from the memory and executes it."""
+        opcode = self.mem.fetch_word(self.pc)
+
+        self.pc += 2
+        self.opcode.instruction_lookup(opcode)
+        self.opcode.decrement_registers()
+
+    def end_frame(self):
+        """Notifies the frame listeners about the end of the emulated frame."""
+        self.frame += 1
+        for listener in self.frame_listeners:
+            listener()
+
+    def step(self, n=1):
+        """
+        Executes n cycles (ending the frames every cycles_per_frame cycles).
+        Returns the RunResult.
+        """
+        return self.run_until(cycles=n)
+
+    def run_until(self, pc=None, frame=None, cycles=None, predicate=None):
+        """
+        Executes the program until:
+        - pc        - the PC reaches the address (after at least one cycle),
+        - frame     - the frame counter reaches the number,
+        - cycles    - the number of the cycles were executed,
+        - predicate - the predicate called with the VM returns True; it's
+                      evaluated only when the control flow leaves the straight
+                      line code and at the end of the frames,
+        - or the program halts (spins in the idle loop which doesn't wait
+          for the input).
+        The frame listeners are called at the end of every frame
+        (cycles_per_frame cycles, including the ones of the memoized calls).
+        Returns the RunResult.
+        """
+        checked = pc is not None or predicate is not None
+        executed = frames = 0
+
+        while True:
+            if frame is not None and self.frame >= frame:
+                return RunResult('frame', executed, frames)
+            budget = max(self.cycles_per_frame - self.frame_cycles, 0)
+            if cycles is not None:
+                if executed >= cycles:
+                    return RunResult('cycles', executed, frames)
+                budget = min(budget, cycles - executed)
+
+            start = self.frame_cycles
+            if checked:
+                reason = self._run_checked_batch(budget, pc, predicate)
+            else:
+                reason = self._run_batch(budget)
+            executed += self.frame_cycles - start
+            if reason is not None:
+                return RunResult(reason, executed, frames)
+
+            if self.frame_cycles >= self.cycles_per_frame:
+                # The cycles skipped past the frame end (see MemoOpcode) are
+                # taken from the next frames.
+                self.frame_cycles -= self.cycles_per_frame
+                self.end_frame()
+                frames += 1
+                if predicate is not None and predicate(self):
+                    return RunResult('predicate', executed, frames)
+                if idle_loop(self) == HALTED:
+                    return RunResult('halted', executed, frames)
+
+    def _run_batch(self, budget):
+        """
+        Executes the cycles of the batch (within the frame). The batch ends
+        early when the memoized calls skip past its end, like in run.
+        Returns None.
+        """
+        cycle = self.cycle
+        end = self.frame_cycles + budget
+        while self.frame_cycles < end:
+            cycle()
+            self.frame_cycles += 1
+
+    def _run_checked_batch(self, budget, pc, predicate):
+        """
+        Executes the cycles of the batch (within the frame) checking the PC
+        & the predicate after every cycle. Returns the stop reason ('pc' or
+        'predicate') or None when the whole batch was executed.
+        """
+        cycle = self.cycle
+        for _ in range(budget):
+            previous = self.pc
+            cycle()
+            self.frame_cycles += 1
+            if self.pc == pc:
+                return 'pc'
+            branched = self.pc != previous + 2
+            if branched and predicate is not None and predicate(self):
+                return 'predicate'
+        return None
+
+    def handle_events(self):
+        """
+        Updates the keypad state using the pygame events.
+        Returns False when the user wants to quit.
+        """
+        running = True
+        for event in pygame.event.get():
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                elif event.key == REWIND_KEY:
+                    self.rewinding = True
+                elif event.key == HUD_KEY and self.hud is not None:
+                    self.hud.toggle()
+                elif event.key in KEY_INDEX:
+                    self.keys |= 1 << KEY_INDEX[event.key]
+            elif event.type == pygame.KEYUP and event.key == REWIND_KEY:
+                self.rewinding = False
+            elif event.type == pygame.KEYUP and event.key in KEY_INDEX:
+                self.keys &= ~(1 << KEY_INDEX[event.key])
+            elif event.type == pygame.QUIT:
+                running = False
+        return running
+
+    def sleep(self, seconds):
+        """Sleeps between the cycles or frames (the runners pace the emulation with it)."""
+        time.sleep(seconds)
+
+    def wait_event(self):
+        """Sleeps until the next pygame event (which is left in the queue)."""
+        pygame.event.post(pygame.event.wait())
+
+    def run(self, delay, cycles_per_frame=CYCLES_PER_FRAME, metrics=None, rewind=None):
+        """
+        Executes the program until the user quits.
+        The input is handled at the end of every frame (cycles_per_frame cycles).
+        While the rewind key is held the frames are stepped back instead.
+        While the program spins in an idle loop the emulation sleeps until
+        the next event.
+        """
         running = True
         while running:
-            pygame.time.wait(delay)
-            opcode = self.mem.fetch_word(self.pc)
+            if rewind is not None and self.rewinding:
+                rewind.step_back()
+                self.sleep(delay * cycles_per_frame / 1000.0)
+                running = self.handle_events()
+                continue
 
-            self.pc += 2
-            self.opcode.instruction_lookup(opcode)
-            self.opcode.decrement_registers()
+            emulated = 0.0  # Seconds spent in the cycles (without the pacing sleeps)
+            while self.frame_cycles < cycles_per_frame:
+                self.sleep(delay / 1000.0)
+                start = time.time()
+                self.cycle()
+                emulated += time.time() - start
+                self.frame_cycles += 1
+            self.frame_cycles -= cycles_per_frame
+            self.end_frame()
+            if metrics is not None:
+                metrics.frame(cycles_per_frame, emulated)
+            running = self.handle_events()
+            while running and not self.rewinding and idle_loop(self) is not None:
+                self.wait_event()
+                running = self.handle_events()
 
-            for event in pygame.event.get():
-                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                    running = False
-                if event.type == pygame.QUIT:
-                    running = False
+    def run_headless(self, cycles_per_frame=CYCLES_PER_FRAME):
+        """
+        Executes the program without the input until it halts (spins in
+        an idle loop, which can't end without the input). Returns the number
+        of the cycles executed until the control flow entered the idle loop.
+        """
+        self.cycles_per_frame = cycles_per_frame
+        return self.run_until(predicate=spins).cycles
+
+
+def resolve_settings(args, rom):
+    """
+    Returns the quirk profile, the cycles per frame, the random seed & the
+    replay (or None) of the command line arguments: the replay's settings,
+    the cataloged ones or the defaults.
+    """
+    quirks, cycles_per_frame, seed = args.quirks, args.cycles_per_frame, args.seed
+    replay = None
+    if args.replay:
+        replay = load_replay(args.replay)
+        if replay.rom != rom:
+            raise ReplayFormatException('recorded with another ROM')
+        quirks, cycles_per_frame, seed = replay.quirks, replay.cycles_per_frame, replay.seed
+    elif args.catalog:
+        catalog = Catalog(args.catalog)
+        entry = catalog.lookup_file(args.program)
+        catalog.close()
+        if entry is None:
+            logging.warning('%s is not in the catalog', args.program)
+        else:
+            quirks = quirks or entry.platform
+            cycles_per_frame = cycles_per_frame or entry.cycles_per_frame
+
+    quirks = quirks or profile_for_filename(args.program)
+    cycles_per_frame = cycles_per_frame or CYCLES_PER_FRAME
+    if args.record_inputs and seed is None:
+        seed = random.randrange(1 << 32)
+    return quirks, cycles_per_frame, seed, replay
+
+
+def attach_recording(args, vm, rom, quirks, seed, cycles_per_frame):
+    """
+    Attaches the video & input recorders, the tracer, the flight recorder
+    and the rewind buffer selected by the arguments. Returns the flight
+    recorder, the rewind buffer (or None) & the list of the closing calls.
+    """
+    closing = []
+    if args.record:
+        recorder = Recorder(vm, args.record, args.record_scale)
+        recorder.attach()
+        closing += [recorder.detach, recorder.close]
+        logging.info('Recording to %s', args.record)
+
+    if args.record_inputs:
+        input_recorder = InputRecorder(vm, args.record_inputs, rom, quirks, seed, cycles_per_frame)
+        input_recorder.attach()
+        closing += [input_recorder.detach, input_recorder.close]
+        logging.info('Recording the input to %s', args.record_inputs)
+
+    if args.trace:
+        tracer = Tracer(vm, TraceWriter(args.trace, args.trace_codec))
+        tracer.attach()
+        closing += [tracer.detach, tracer.writer.close,
+                    lambda: logging.info('Traced %d instructions', tracer.cycle)]
+        logging.info('Tracing to %s (%s)', args.trace, args.trace_codec)
+
+    flight_recorder = None
+    if args.flight_recorder > 0:
+        flight_recorder = FlightRecorder(vm, args.flight_recorder)
+        flight_recorder.attach()
+
+    rewind = None
+    if args.rewind:
+        rewind = Rewind(vm, args.rewind)
+        rewind.attach()
+        logging.info('Rewind buffer of %ds (%d bytes)', args.rewind, rewind.memory_size)
+    return flight_recorder, rewind, closing
+
+
+def attach_monitoring(args, vm):
+    """
+    Attaches the metrics (with their exporters), the HUD & the timeline
+    selected by the arguments. Returns the metrics the runners report to
+    (or None) & the list of the closing calls.
+    """
+    metrics, closing = None, []
+    if args.metrics_port is not None or args.metrics_file:
+        metrics = Metrics()
+        metrics.attach(vm)
+        if args.metrics_port is not None:
+            closing.append(MetricsServer(metrics, args.metrics_port).close)
+            logging.info('Serving the metrics on http://127.0.0.1:%d/metrics', args.metrics_port)
+        if args.metrics_file:
+            closing.append(MetricsFileWriter(metrics, args.metrics_file, args.metrics_interval).close)
+            logging.info('Writing the metrics to %s', args.metrics_file)
+
+    if args.hud and vm.display.surface is not None:
+        vm.hud = Hud(vm, metrics)
+        vm.hud.show()
+        metrics = vm.hud.metrics
+
+    if args.timeline:
+        timeline = Timeline(vm, metrics)
+        timeline.attach()
+        metrics = timeline.metrics
+        closing += [timeline.detach, lambda: timeline.write(args.timeline),
+                    lambda: logging.info('Timeline of %d spans written to %s',
+                                         len(timeline), args.timeline)]
+        logging.info('Recording the timeline to %s', args.timeline)
+    return metrics, closing
+
+
+def run_program(args, vm, replay, cycles_per_frame, metrics, rewind):
+    """Runs the program in the mode selected by the arguments."""
+    if replay is not None:
+        logging.info('Replayed %d frames', play_replay(vm, replay))
+    elif args.headless:
+        print('halted at cycle {}'.format(vm.run_headless(cycles_per_frame)))
+    elif args.terminal:
+        TerminalRunner(vm, cycles_per_frame, args.terminal, metrics=metrics).run()
+    elif args.threaded:
+        ThreadedRunner(vm, cycles_per_frame, metrics=metrics, rewind=rewind).run()
+    else:
+        vm.run(args.delay, cycles_per_frame, metrics, rewind)
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
-        './chip8.py',
+        'python -m chip8',
         description='CHIP-8 interpreter',
         formatter_class=lambda prog: argparse.HelpFormatter(
             prog, max_help_position=100, width=150))
@@ -93,9 +523,104 @@ if __name__ == '__main__':
     parser.add_argument('-s', '--scale', type=int, default=10,
                         help='Specify scale for width & height (default=10)')
 
+    parser.add_argument('-c', '--cycles-per-frame', type=int,
+                        help='Specify cycles per frame (default=from the catalog or {})'.format(
+                            CYCLES_PER_FRAME))
+
+    parser.add_argument('--threaded', action='store_true', default=False,
+                        help='Run the emulation on a worker thread')
+
+    parser.add_argument('--headless', action='store_true', default=False,
+                        help='Run without the display & input until the program halts')
+
+    parser.add_argument('--terminal', nargs='?', choices=sorted(CELLS), const='half',
+                        help='Render to the terminal with the half-block (default) or braille cells')
+
+    parser.add_argument('-m', '--memoize', action='store_true', default=False,
+                        help='Cache the effects of the pure subroutine calls')
+
+    parser.add_argument('-q', '--quirks', choices=sorted(PROFILES),
+                        help='Specify the quirk profile (default=from the catalog or chosen by '
+                             'the ROM extension)')
+
+    parser.add_argument('--catalog', metavar='FILE',
+                        help='Look up the ROM quirks & cycles per frame in the ROM catalog')
+
+    parser.add_argument('-r', '--seed', type=int,
+                        help='Specify the random seed (default=random)')
+
+    parser.add_argument('--record', metavar='FILE',
+                        help='Record the frames to the video file (.gif, .apng or .y4m)')
+
+    parser.add_argument('--record-scale', type=int, default=RECORD_SCALE,
+                        help='Specify scale of the recorded video (default={})'.format(RECORD_SCALE))
+
+    parser.add_argument('--record-inputs', metavar='FILE',
+                        help='Record the keypad input to the replay file')
+
+    parser.add_argument('--replay', metavar='FILE',
+                        help='Run the replay file headless as fast as possible (e.g. with --record)')
+
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='Serve the Prometheus metrics on the local HTTP port')
+
+    parser.add_argument('--metrics-file', metavar='FILE',
+                        help='Write the Prometheus metrics to the file periodically')
+
+    parser.add_argument('--metrics-interval', type=float, default=METRICS_INTERVAL,
+                        help='Specify the metrics file update interval (default={}s)'.format(
+                            METRICS_INTERVAL))
+
+    parser.add_argument('--rewind', type=int, metavar='SECONDS',
+                        help='Keep the last SECONDS of the frames for rewinding (hold Backspace)')
+
+    parser.add_argument('--flight-recorder', type=int, default=0, metavar='SIZE',
+                        help='Keep the last SIZE instructions for the crash dump, e.g. {} '
+                             '(default=0, disabled)'.format(FLIGHT_RECORDER_SIZE))
+
+    parser.add_argument('--crash-dump', metavar='FILE', default=CRASH_DUMP,
+                        help='Specify the crash dump file (default={})'.format(CRASH_DUMP))
+
+    parser.add_argument('--hud', action='store_true', default=False,
+                        help='Show the performance HUD (toggle with F1)')
+
+    parser.add_argument('--timeline', metavar='FILE',
+                        help='Write the frame phase timeline to the Chrome trace file at exit')
+
     parser.add_argument('-v', '--verbose', action='store_true', default=False,
-                        help='Enable verbose output')  # TODO: Import logging
+                        help='Enable verbose output')
+
+    parser.add_argument('-t', '--trace', metavar='FILE',
+                        help='Write binary execution trace to the file')
+
+    parser.add_argument('--trace-codec', choices=sorted(CODECS), default='zlib',
+                        help='Specify trace chunk compression (default=zlib)')
 
     args = parser.parse_args()
-    vm = Chip8.load_program_from_file(args.program, args.scale)
-    vm.run(args.delay)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format='%(levelname)s: %(message)s')
+
+    with open(args.program, 'rb') as f:
+        rom = rom_hash(f.read())
+    quirks, cycles_per_frame, seed, replay = resolve_settings(args, rom)
+
+    headless = replay is not None or args.terminal is not None or args.headless
+    vm = Chip8.load_program_from_file(args.program, args.scale, quirks, headless=headless,
+                                      seed=seed, engine=MemoOpcode if args.memoize else Opcode)
+    logging.info('Loaded %s (%s)', args.program, quirks)
+
+    flight_recorder, rewind, closing = attach_recording(args, vm, rom, quirks, seed, cycles_per_frame)
+    metrics, monitoring = attach_monitoring(args, vm)
+
+    try:
+        run_program(args, vm, replay, cycles_per_frame, metrics, rewind)
+    except Exception as e:
+        if flight_recorder is not None:
+            flight_recorder.dump(args.crash_dump, e)
+            logging.error('Crash dump written to %s', args.crash_dump)
+        raise
+    finally:
+        for close in monitoring + closing:
+            close()
+        if args.memoize:
+            logging.info('Memoized calls: %d hits, %d misses', vm.opcode.hits, vm.opcode.misses)
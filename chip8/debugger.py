@@ -0,0 +1,351 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import argparse
+import cmd
+import collections
+import operator
+import re
+
+from .chip8 import Chip8
+from .disassembler import disassemble_range
+from .quirks import DEFAULT_PROFILE, PROFILES
+from .swap import Swaps
+
+READ  = 'r'
+WRITE = 'w'
+
+# Memory accessors used by the instructions (the instruction fetch isn't watched).
+READ_ACCESSORS  = ('fetch_byte', 'fetch_many')
+WRITE_ACCESSORS = ('store_byte', 'store_word', 'store_many')
+
+Stop = collections.namedtuple('Stop', 'reason pc cycles detail')
+
+CONDITION = re.compile(
+    r'^\s*(V[0-9A-F]|I|PC|SP|DT|ST)\s*(==|!=|<=|>=|<|>)\s*(0x[0-9A-F]+|[0-9]+)\s*$',
+    re.IGNORECASE)
+
+OPERATORS = {
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt,
+    '<=': operator.le, '>': operator.gt, '>=': operator.ge
+}
+
+
+class BreakpointHit(Exception):
+    def __init__(self, pc):
+        super(BreakpointHit, self).__init__(
+            'Breakpoint at {:03X}.'.format(pc))
+        self.pc = pc
+
+
+def parse_condition(text):
+    """
+    Parses the register condition, e.g. 'V3 == 0x10' or 'I >= 0x300'.
+    Returns the function of the VM.
+    """
+    match = CONDITION.match(text)
+    if match is None:
+        raise ValueError('Invalid condition: {}'.format(text))
+    register, op, value = match.groups()
+    register = register.upper()
+    compare, value = OPERATORS[op], int(value, 0)
+
+    if register.startswith('V') and len(register) == 2:
+        index = int(register[1], 16)
+        return lambda vm: compare(vm.v[index], value)
+    attribute = register.lower()
+    return lambda vm: compare(getattr(vm, attribute), value)
+
+
+class Debugger(object):
+    """
+    CHIP-8 debugger.
+
+    The breakpoints & watchpoints are implemented by swapping instrumented
+    versions of the instruction_lookup & memory accessor methods onto the VM
+    instances. When none are set the original methods are restored, so the
+    VM runs exactly the same code as without the debugger.
+    """
+
+    def __init__(self, vm):
+        self.vm = vm
+        self.breakpoints = {}
+        self.watchpoints = []
+        self.hits = []
+        self.cycles = 0
+
+        self._resume_pc = None
+        self._swaps = Swaps()
+
+    # Breakpoints & watchpoints
+
+    def add_breakpoint(self, pc, condition=None):
+        """Adds the breakpoint, the condition is the function of the VM."""
+        self.breakpoints[pc] = condition
+        self._install_breakpoints()
+
+    def remove_breakpoint(self, pc):
+        """Removes the breakpoint."""
+        del self.breakpoints[pc]
+        if not self.breakpoints:
+            self._swaps.restore(self.vm.opcode, 'instruction_lookup')
+
+    def add_watchpoint(self, start, end=None, mode=WRITE):
+        """Adds the watchpoint of the inclusive memory range ('r', 'w' or 'rw' accesses)."""
+        end = start if end is None else end
+        self.watchpoints.append((start, end, mode))
+        self._install_watchpoints()
+
+    def remove_watchpoint(self, start, end=None):
+        """Removes the watchpoints of the memory range."""
+        end = start if end is None else end
+        self.watchpoints = [w for w in self.watchpoints if w[:2] != (start, end)]
+        modes = ''.join(w[2] for w in self.watchpoints)
+        if READ not in modes:
+            for name in READ_ACCESSORS:
+                self._swaps.restore(self.vm.mem, name)
+        if WRITE not in modes:
+            for name in WRITE_ACCESSORS:
+                self._swaps.restore(self.vm.mem, name)
+
+    def _install_breakpoints(self):
+        vm = self.vm
+        breakpoints = self.breakpoints
+
+        def wrapper(lookup):
+            def instruction_lookup(opcode):
+                pc = vm.pc - 2
+                if pc in breakpoints and pc != self._resume_pc:
+                    condition = breakpoints[pc]
+                    if condition is None or condition(vm):
+                        vm.pc = pc
+                        raise BreakpointHit(pc)
+                self._resume_pc = None
+                return lookup(opcode)
+            return instruction_lookup
+
+        self._swaps.swap(vm.opcode, 'instruction_lookup', wrapper)
+
+    def _install_watchpoints(self):
+        mem = self.vm.mem
+        modes = ''.join(w[2] for w in self.watchpoints)
+
+        def watched(access, size_of):
+            def wrapper(method):
+                def accessor(addr, *args):
+                    end = addr + size_of(args) - 1
+                    for start, stop, mode in self.watchpoints:
+                        if access in mode and addr <= stop and start <= end:
+                            self.hits.append((access, max(addr, start)))
+                    return method(addr, *args)
+                return accessor
+            return wrapper
+
+        if READ in modes:
+            self._swaps.swap(mem, 'fetch_byte', watched(READ, lambda args: 1))
+            self._swaps.swap(mem, 'fetch_many', watched(READ, lambda args: args[0]))
+        if WRITE in modes:
+            self._swaps.swap(mem, 'store_byte', watched(WRITE, lambda args: 1))
+            self._swaps.swap(mem, 'store_word', watched(WRITE, lambda args: 2))
+            self._swaps.swap(mem, 'store_many', watched(WRITE, lambda args: len(args[0])))
+
+    def detach(self):
+        """Removes all the breakpoints & watchpoints."""
+        for pc in list(self.breakpoints):
+            self.remove_breakpoint(pc)
+        for start, end, _ in list(self.watchpoints):
+            self.remove_watchpoint(start, end)
+
+    # Execution
+
+    def _run(self, done=None, max_cycles=None):
+        """
+        Executes the cycles until the done function returns True, a breakpoint
+        or watchpoint is hit, max_cycles are executed or the user hits Ctrl-C.
+        """
+        vm = self.vm
+        self._resume_pc = vm.pc
+        executed = 0
+        del self.hits[:]
+
+        while max_cycles is None or executed < max_cycles:
+            try:
+                vm.cycle()
+            except BreakpointHit as e:
+                return Stop('breakpoint', e.pc, self.cycles, None)
+            except KeyboardInterrupt:
+                return Stop('interrupt', vm.pc, self.cycles, None)
+            executed += 1
+            self.cycles += 1
+
+            if self.hits:
+                access, addr = self.hits[0]
+                return Stop('watchpoint', vm.pc, self.cycles, (access, addr))
+            if done is not None and done():
+                return Stop('step', vm.pc, self.cycles, None)
+        return Stop('limit', vm.pc, self.cycles, None)
+
+    def step(self):
+        """Executes a single instruction."""
+        return self._run(lambda: True)
+
+    def step_over(self, max_cycles=None):
+        """Executes a single instruction, the whole subroutine in case of CALL."""
+        vm = self.vm
+        if vm.mem.fetch_word(vm.pc) >> 12 != 0x2:
+            return self.step()
+        pc, sp = vm.pc + 2, vm.sp
+        return self._run(lambda: vm.pc == pc and vm.sp == sp, max_cycles)
+
+    def step_out(self, max_cycles=None):
+        """Executes the instructions until the current subroutine returns."""
+        vm = self.vm
+        sp = vm.sp
+        return self._run(lambda: vm.sp < sp, max_cycles)
+
+    def cont(self, max_cycles=None):
+        """Executes the instructions until a breakpoint or watchpoint is hit."""
+        return self._run(max_cycles=max_cycles)
+
+
+def format_stop(stop):
+    """Formats the reason why the execution has stopped."""
+    if stop.reason == 'watchpoint':
+        access, addr = stop.detail
+        return 'Watchpoint: {} [{:03X}], stopped at {:03X} (cycle {})'.format(
+            'read' if access == READ else 'write', addr, stop.pc, stop.cycles)
+    return '{}: stopped at {:03X} (cycle {})'.format(
+        stop.reason.capitalize(), stop.pc, stop.cycles)
+
+
+def _address(text):
+    return int(text, 16)
+
+
+class DebuggerShell(cmd.Cmd):
+    """Interactive debugger shell."""
+
+    prompt = '(chip8) '
+
+    def __init__(self, debugger):
+        cmd.Cmd.__init__(self)
+        self.debugger = debugger
+        self.vm = debugger.vm
+
+    def emptyline(self):
+        pass
+
+    def _report(self, stop):
+        print(format_stop(stop))
+        self.do_list('')
+
+    def do_break(self, arg):
+        """break ADDR [CONDITION] - sets the breakpoint, e.g. break 2a0 V3 == 0x10"""
+        parts = arg.split(None, 1)
+        condition = parse_condition(parts[1]) if len(parts) > 1 else None
+        self.debugger.add_breakpoint(_address(parts[0]), condition)
+
+    def do_delete(self, arg):
+        """delete ADDR - removes the breakpoint"""
+        self.debugger.remove_breakpoint(_address(arg))
+
+    def do_watch(self, arg):
+        """watch START[:END] [r|w|rw] - sets the memory watchpoint"""
+        parts = arg.split()
+        bounds = [_address(a) for a in parts[0].split(':')]
+        self.debugger.add_watchpoint(bounds[0], bounds[-1], parts[1] if len(parts) > 1 else WRITE)
+
+    def do_unwatch(self, arg):
+        """unwatch START[:END] - removes the memory watchpoint"""
+        bounds = [_address(a) for a in arg.split(':')]
+        self.debugger.remove_watchpoint(bounds[0], bounds[-1])
+
+    def do_step(self, arg):
+        """step - executes a single instruction"""
+        self._report(self.debugger.step())
+
+    def do_next(self, arg):
+        """next - executes a single instruction, steps over the CALLs"""
+        self._report(self.debugger.step_over())
+
+    def do_finish(self, arg):
+        """finish - executes until the current subroutine returns"""
+        self._report(self.debugger.step_out())
+
+    def do_continue(self, arg):
+        """continue [CYCLES] - executes until a breakpoint or watchpoint is hit"""
+        self._report(self.debugger.cont(int(arg) if arg else None))
+
+    def do_registers(self, arg):
+        """registers - shows the registers"""
+        vm = self.vm
+        print(' '.join('V{:X}={:02X}'.format(r, vm.v[r]) for r in range(0x10)))
+        print('I={:03X} PC={:03X} SP={:X} DT={:02X} ST={:02X} stack=[{}]'.format(
+            vm.i, vm.pc, vm.sp, vm.dt, vm.st,
+            ' '.join('{:03X}'.format(vm.stack[i]) for i in range(vm.sp))))
+
+    def do_memory(self, arg):
+        """memory ADDR [LENGTH] - dumps the memory"""
+        parts = arg.split()
+        addr = _address(parts[0])
+        data = self.vm.mem.fetch_many(addr, int(parts[1]) if len(parts) > 1 else 16)
+        for offset in range(0, len(data), 16):
+            print('{:03X}: {}'.format(addr + offset, ' '.join(
+                '{:02X}'.format(b) for b in data[offset:offset + 16])))
+
+    def do_list(self, arg):
+        """list [ADDR] - disassembles the code around the address (default=PC)"""
+        addr = _address(arg) if arg else self.vm.pc
+        for line in disassemble_range(self.vm.mem, addr - 6, addr + 8, self.vm.pc):
+            print(line)
+
+    def do_screen(self, arg):
+        """screen - prints the framebuffer"""
+        display = self.vm.display
+        for y in range(display.height):
+            print(''.join('#' if display.get_pixel((x, y)) else '.'
+                          for x in range(display.width)))
+
+    def do_keys(self, arg):
+        """keys MASK - sets the keypad mask (hex)"""
+        self.vm.keys = int(arg, 16)
+
+    def do_quit(self, arg):
+        """quit - exits the debugger"""
+        return True
+
+    do_b, do_s, do_n, do_c, do_q = do_break, do_step, do_next, do_continue, do_quit
+
+    def onecmd(self, line):
+        try:
+            return cmd.Cmd.onecmd(self, line)
+        except (ValueError, IndexError, KeyError) as e:
+            print('Error: {}'.format(e))
+        except Exception as e:
+            print('{}: {}'.format(type(e).__name__, e))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        'python -m chip8.debugger',
+        description='CHIP-8 debugger',
+        formatter_class=lambda prog: argparse.HelpFormatter(
+            prog, max_help_position=100, width=150))
+
+    parser.add_argument('program', help='CHIP-8 ROM')
+
+    parser.add_argument('-q', '--quirks', choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help='Specify the quirk profile (default={})'.format(DEFAULT_PROFILE))
+
+    parser.add_argument('-r', '--seed', type=int, default=0,
+                        help='Specify the random seed (default=0)')
+
+    args = parser.parse_args()
+    with open(args.program, 'rb') as f:
+        data = bytearray(f.read())
+
+    vm = Chip8(data, headless=True, seed=args.seed, quirks=PROFILES[args.quirks])
+    DebuggerShell(Debugger(vm)).cmdloop()
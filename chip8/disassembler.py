@@ -0,0 +1,73 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+CLEAR_AND_RETURN_FORMATS = {
+    0x00E0: 'CLS', 0x00EE: 'RET'
+}
+
+FORMATS = {
+    0x1: 'JMP 0x{nnn:03X}',          0x2: 'CALL 0x{nnn:03X}',
+    0x3: 'SE V{x:X}, 0x{kk:02X}',    0x4: 'SNE V{x:X}, 0x{kk:02X}',
+    0x5: 'SER V{x:X}, V{y:X}',       0x6: 'LD V{x:X}, 0x{kk:02X}',
+    0x7: 'ADD V{x:X}, 0x{kk:02X}',   0x9: 'SNER V{x:X}, V{y:X}',
+    0xA: 'LDI 0x{nnn:03X}',          0xB: 'JMPR 0x{nnn:03X}',
+    0xC: 'RND V{x:X}, 0x{kk:02X}',   0xD: 'DRW V{x:X}, V{y:X}, {n}'
+}
+
+BITWISE_FORMATS = {
+    0x0: 'LDR',  0x1: 'OR',   0x2: 'AND',
+    0x3: 'XOR',  0x4: 'ADDR', 0x5: 'SUB',
+    0x6: 'SHR',  0x7: 'SUBN', 0xE: 'SHL'
+}
+
+KEY_FORMATS = {
+    0x9E: 'SKP V{x:X}', 0xA1: 'SKNP V{x:X}'
+}
+
+MISC_FORMATS = {
+    0x07: 'LDT V{x:X}',  0x0A: 'LDK V{x:X}',  0x15: 'LDDT V{x:X}',
+    0x18: 'LDST V{x:X}', 0x1E: 'ADDI V{x:X}', 0x29: 'LDF V{x:X}',
+    0x33: 'LDB V{x:X}',  0x55: 'LDIR V{x:X}', 0x65: 'LDRI V{x:X}'
+}
+
+
+def disassemble(opcode):
+    """Returns the mnemonic of the opcode (DW for the unknown opcodes)."""
+    fmt = None
+    prefix = opcode >> 12
+
+    if prefix == 0x0:
+        fmt = CLEAR_AND_RETURN_FORMATS.get(opcode)
+    elif prefix == 0x8:
+        mnemonic = BITWISE_FORMATS.get(opcode & 0xf)
+        fmt = mnemonic + ' V{x:X}, V{y:X}' if mnemonic else None
+    elif prefix == 0xE:
+        fmt = KEY_FORMATS.get(opcode & 0xff)
+    elif prefix == 0xF:
+        fmt = MISC_FORMATS.get(opcode & 0xff)
+    else:
+        fmt = FORMATS.get(prefix)
+
+    if fmt is None:
+        return 'DW 0x{:04X}'.format(opcode)
+
+    return fmt.format(nnn=opcode & 0xfff, kk=opcode & 0xff, n=opcode & 0xf,
+                      x=(opcode >> 8) & 0xf, y=(opcode >> 4) & 0xf)
+
+
+def disassemble_range(mem, start, end, mark=None):
+    """
+    Returns the listing of the memory range (2 bytes aligned to the start).
+    The line of the mark address is prefixed with the arrow.
+    """
+    lines = []
+    start = max(start, 0)
+    end = min(end, len(mem._mem) - 2)
+    for addr in range(start, end + 1, 2):
+        opcode = mem.fetch_word(addr)
+        lines.append('{} {:03X}: {:04X}  {}'.format(
+            '>' if addr == mark else ' ', addr, opcode, disassemble(opcode)))
+    return lines
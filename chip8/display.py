@@ -4,6 +4,8 @@
 # Copyright (C) 2018 Mateusz Furga
 # This software is released under the MIT license.
 
+import ctypes
+
 import pygame
 
 FONTS = (
@@ -37,6 +39,8 @@ KEY_MAP = {
     0xE: pygame.K_e,   0xF: pygame.K_f
 }
 
+KEY_INDEX = dict((key, index) for index, key in KEY_MAP.items())
+
 HEIGHT = 32
 WIDTH  = 64
 COLORS = (
@@ -62,13 +66,27 @@ class Display(object):
                 +-----------------------+
     """
 
-    def __init__(self, vm, width=WIDTH, height=HEIGHT, scale=1):
+    def __init__(self, vm, width=WIDTH, height=HEIGHT, scale=1, headless=False, clip=False,
+                 pixels=None):
         self.vm = vm
         self.width = width
         self.height = height
         self.scale = scale
 
-        self.init_display()
+        # Whether the sprites are clipped at the screen edges or wrap around.
+        self.clip = clip
+
+        # One byte per pixel, the source of truth for the screen content.
+        self.pixels = bytearray(width * height) if pixels is None else pixels
+        self.dirty = False
+
+        # The canvas is the surface updated directly by the drawing
+        # instructions (None when headless or when presenting is deferred).
+        self.surface = None
+        self.canvas = None
+
+        if not headless:
+            self.init_display()
 
     def init_display(self):
         """
@@ -81,6 +99,15 @@ class Display(object):
             (self.width * self.scale, self.height * self.scale),
             0, 8
         )
+        self.canvas = self.surface
+        self.presented = bytearray(self.width * self.height)
+
+    def defer_presentation(self):
+        """
+        Stops drawing on the screen in the drawing instructions. The pixels
+        are then presented using the present method (e.g. from other thread).
+        """
+        self.canvas = None
 
     def load_fonts(self):
         """Loads font data into memory in the range of 0x0 to 0x49."""
@@ -88,43 +115,130 @@ class Display(object):
 
     def load_sound(self, fname):
         """Loads sound effects using the pygame API."""
+        if self.surface is None:
+            return
         pygame.mixer.init()
         pygame.mixer.music.load(fname)
 
+    def play_sound(self):
+        """Plays the loaded sound effect once."""
+        if self.surface is not None:
+            pygame.mixer.music.play(0)
+
     def set_pixel(self, point, color):
         """Sets the pixel to on or off at the given point (X, Y)."""
-        pygame.draw.rect(
-            self.surface, COLORS[color],
-            (point[0] * self.scale, point[1] * self.scale,
-                self.scale, self.scale)
-        )
+        self.pixels[point[1] * self.width + point[0]] = color
+        if self.canvas is not None:
+            pygame.draw.rect(
+                self.canvas, COLORS[color],
+                (point[0] * self.scale, point[1] * self.scale,
+                    self.scale, self.scale)
+            )
 
     def get_pixel(self, point):
         """Gets the value of the pixel at the given point (X, Y)."""
-        color = self.surface.get_at(
-            (point[0] * self.scale, point[1] * self.scale)
-        )
-        color = 1 if color == COLORS[1] else 0
-        return color
+        return self.pixels[point[1] * self.width + point[0]]
 
     def draw_sprite(self, point, data):
         """Displays the bytes of data as sprites on the screen at coordinates (X, Y)."""
-        self.vm.v[0xf] = 0
+        if self.clip:
+            return self.draw_clipped_sprite(point, data)
+        collision = 0
 
         for iy, y in enumerate(data):
             coord_y = (point[1] + iy) % self.height
 
-            for ix, x in enumerate('{:08b}'.format(y)):
+            for ix in range(8):
+                if not y & (0x80 >> ix):
+                    continue
                 coord_x = (point[0] + ix) % self.width
-                color = int(x)
                 current_color = self.get_pixel((coord_x, coord_y))
-                if color == 1 and current_color == 1:
-                    self.vm.v[0xf] |= 1
-                self.set_pixel((coord_x, coord_y), color ^ current_color)
+                collision |= current_color
+                self.set_pixel((coord_x, coord_y), current_color ^ 1)
 
-        pygame.display.flip()
+        self.vm.v[0xf] = collision
+        self.dirty = True
+        self.refresh()
+
+    def draw_clipped_sprite(self, point, data):
+        """
+        Displays the bytes of data as sprites on the screen at coordinates (X, Y).
+        The coordinates wrap around but the sprite is clipped at the screen edges.
+        """
+        collision = 0
+        start_x = point[0] % self.width
+        start_y = point[1] % self.height
+        columns = range(min(8, self.width - start_x))
+
+        for iy, y in enumerate(data[:self.height - start_y]):
+            coord_y = start_y + iy
+
+            for ix in columns:
+                if not y & (0x80 >> ix):
+                    continue
+                coord_x = start_x + ix
+                current_color = self.get_pixel((coord_x, coord_y))
+                collision |= current_color
+                self.set_pixel((coord_x, coord_y), current_color ^ 1)
+
+        self.vm.v[0xf] = collision
+        self.dirty = True
+        self.refresh()
 
     def clear_display(self):
         """Fills all the pixels on the screen in the same color (default black)."""
-        self.surface.fill(COLORS[0])
+        ctypes.memset(ctypes.addressof(ctypes.c_char.from_buffer(self.pixels)), 0, len(self.pixels))
+        self.dirty = True
+        if self.canvas is not None:
+            self.canvas.fill(COLORS[0])
+        self.refresh()
+
+    def refresh(self):
+        """Presents the screen content."""
+        if self.canvas is not None:
+            self.flip()
+
+    def flip(self):
+        """Flips the screen (overlays are drawn by the methods swapped onto the instance)."""
         pygame.display.flip()
+
+    def redraw(self):
+        """Redraws the whole screen from the pixels (e.g. after the state is restored)."""
+        if self.canvas is None:
+            return
+        self.canvas.fill(COLORS[0])
+        for index, color in enumerate(self.pixels):
+            if color:
+                y, x = divmod(index, self.width)
+                pygame.draw.rect(
+                    self.canvas, COLORS[color],
+                    (x * self.scale, y * self.scale, self.scale, self.scale)
+                )
+        self.flip()
+
+    def repaint(self):
+        """Redraws the whole screen (e.g. after an overlay was removed)."""
+        if self.canvas is not None:
+            self.redraw()
+        elif self.surface is not None:
+            pixels = bytearray(self.presented)
+            self.presented[:] = bytearray(len(pixels))
+            self.surface.fill(COLORS[0])
+            self.present(pixels)
+
+    def present(self, pixels):
+        """Redraws the pixels which differ from the presented ones & flips the screen."""
+        width, presented = self.width, self.presented
+        for y in range(self.height):
+            row = y * width
+            if pixels[row:row + width] == presented[row:row + width]:
+                continue
+            for x in range(width):
+                color = pixels[row + x]
+                if color != presented[row + x]:
+                    pygame.draw.rect(
+                        self.surface, COLORS[color],
+                        (x * self.scale, y * self.scale, self.scale, self.scale)
+                    )
+        presented[:] = pixels
+        self.flip()
@@ -0,0 +1,274 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import argparse
+import array
+import collections
+import functools
+import hashlib
+import multiprocessing
+import struct
+import time
+import zlib
+
+from .chip8 import CYCLES_PER_FRAME, Chip8
+from .quirks import DEFAULT_PROFILE, PROFILES, profile_for_filename
+from .state import MachineState
+
+# The inputs held for a frame: no key & each of the 16 keys.
+INPUTS = [0] + [1 << key for key in range(0x10)]
+
+CHUNK_SIZE = 64  # Frontier states per worker task
+
+try:
+    array.array('Q')
+    HASH_TYPECODE = 'Q'
+except ValueError:
+    HASH_TYPECODE = 'L'  # Python 2 (8 bytes on the 64-bit Unix)
+
+# states - number of the visited (distinct) states,
+# depth  - number of the expanded BFS levels,
+# errors - number of the expansions which have failed (e.g. an invalid opcode),
+# path   - the inputs reaching the goal (None when not found).
+ExploreResult = collections.namedtuple('ExploreResult', 'states depth errors path')
+
+
+def state_hash(block):
+    """Returns the nonzero 64-bit hash of the machine state block."""
+    return struct.unpack('<Q', hashlib.md5(block).digest()[:8])[0] or 1
+
+
+class HashSet(object):
+    """
+    Set of the nonzero 64-bit hashes.
+
+    Open addressing with linear probing in one flat array (8 bytes per slot,
+    at most half full), instead of the Python set of the int objects.
+    """
+
+    def __init__(self, capacity=1024):
+        self.table = array.array(HASH_TYPECODE, [0]) * capacity
+        self.mask = capacity - 1
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, value):
+        table, mask = self.table, self.mask
+        slot = value & mask
+        while table[slot]:
+            if table[slot] == value:
+                return True
+            slot = (slot + 1) & mask
+        return False
+
+    def add(self, value):
+        """Adds the hash, returns False if it was already in the set."""
+        table, mask = self.table, self.mask
+        slot = value & mask
+        while table[slot]:
+            if table[slot] == value:
+                return False
+            slot = (slot + 1) & mask
+        table[slot] = value
+        self.count += 1
+        if self.count * 2 > len(table):
+            self._grow()
+        return True
+
+    @property
+    def memory_size(self):
+        """Returns the bytes used by the table."""
+        return len(self.table) * self.table.itemsize
+
+    def _grow(self):
+        old = self.table
+        self.table = array.array(HASH_TYPECODE, [0]) * (len(old) * 2)
+        self.mask = len(self.table) - 1
+        self.count = 0
+        for value in old:
+            if value:
+                self.add(value)
+
+
+# The VM of the worker process
+_worker = None
+
+
+def _init_worker(quirks, cycles_per_frame, goal_pc, goal):
+    global _worker
+    vm = Chip8(None, headless=True, quirks=PROFILES[quirks], state=MachineState())
+    vm.cycles_per_frame = cycles_per_frame
+    _worker = (vm, goal_pc, goal)
+
+
+def _expand(item):
+    """
+    Emulates one frame of the state with each of the inputs.
+    Returns the parent index, the number of the errors & the distinct
+    children (input index, hash, compressed state, goal reached).
+    """
+    vm, goal_pc, goal = _worker
+    index, parent_hash, compressed = item
+    parent = zlib.decompress(compressed)
+    children, seen, errors = [], set(), 0
+
+    for input_index, keys in enumerate(INPUTS):
+        vm.state.block[:] = parent
+        vm.load_registers()
+        vm.keys = keys
+        vm.frame_cycles = 0
+        vm.random.seed(parent_hash ^ keys)
+        try:
+            result = vm.run_until(pc=goal_pc, cycles=vm.cycles_per_frame)
+        except Exception:
+            errors += 1
+            continue
+
+        block = bytes(vm.state.block)
+        child_hash = state_hash(block)
+        if child_hash == parent_hash or child_hash in seen:
+            continue
+        seen.add(child_hash)
+        reached = result.reason == 'pc' or (goal is not None and goal(vm))
+        children.append((input_index, child_hash, zlib.compress(block, 1), reached))
+    return index, errors, children
+
+
+class Explorer(object):
+    """
+    Breadth-first explorer of the program states.
+
+    Every state is expanded by emulating one frame with each of the INPUTS
+    held (the random generator is seeded by the state hash & the input,
+    so the expansion is deterministic). The visited states are deduplicated
+    by their 64-bit hashes kept in the HashSet; only the frontier states are
+    kept (compressed), together with the parent index & the input of every
+    visited state to rebuild the path to the goal. The frontier of every
+    level is expanded by the worker processes.
+    """
+
+    def __init__(self, data, quirks=DEFAULT_PROFILE, cycles_per_frame=CYCLES_PER_FRAME,
+                 processes=None, seed=0):
+        self.data = data
+        self.quirks = quirks
+        self.cycles_per_frame = cycles_per_frame
+        self.processes = processes
+        self.seed = seed
+
+        self.visited = HashSet()
+        self.parents = array.array('i')
+        self.inputs = bytearray()
+
+    def path(self, index):
+        """Returns the inputs leading from the initial state to the state."""
+        path = []
+        while self.parents[index] >= 0:
+            path.append(INPUTS[self.inputs[index]])
+            index = self.parents[index]
+        return path[::-1]
+
+    def explore(self, max_depth=None, max_states=None, goal_pc=None, goal=None):
+        """
+        Explores the states until the goal is reached (the PC hits goal_pc or
+        the goal called with the VM at the end of the frame returns True; it
+        has to be picklable for the worker processes), the frontier is empty or
+        one of the limits is exceeded. Returns the ExploreResult.
+        """
+        vm = Chip8(self.data, headless=True, quirks=PROFILES[self.quirks], seed=self.seed)
+        root = bytes(vm.state.block)
+        root_hash = state_hash(root)
+        self.visited.add(root_hash)
+        self.parents.append(-1)
+        self.inputs.append(0)
+
+        frontier = [(0, root_hash, zlib.compress(root, 1))]
+        initargs = (self.quirks, self.cycles_per_frame, goal_pc, goal)
+        pool = None
+        if self.processes == 1:
+            _init_worker(*initargs)
+            imap = map
+        else:
+            pool = multiprocessing.Pool(self.processes, _init_worker, initargs)
+            imap = functools.partial(pool.imap, chunksize=CHUNK_SIZE)
+
+        depth, errors = 0, 0
+        try:
+            while frontier and (max_depth is None or depth < max_depth):
+                next_frontier = []
+                for parent, failed, children in imap(_expand, frontier):
+                    errors += failed
+                    for input_index, child_hash, child, reached in children:
+                        if not self.visited.add(child_hash):
+                            continue
+                        self.parents.append(parent)
+                        self.inputs.append(input_index)
+                        if reached:
+                            return ExploreResult(len(self.visited), depth + 1, errors,
+                                                 self.path(len(self.parents) - 1))
+                        next_frontier.append((len(self.parents) - 1, child_hash, child))
+                        if max_states is not None and len(self.visited) >= max_states:
+                            return ExploreResult(len(self.visited), depth + 1, errors, None)
+                frontier = next_frontier
+                depth += 1
+        finally:
+            if pool is not None:
+                # Not terminated: the SIGTERM handler of pygame (inherited
+                # by the workers) hangs in the forked process.
+                pool.close()
+                pool.join()
+        return ExploreResult(len(self.visited), depth, errors, None)
+
+
+def format_path(path):
+    """Formats the inputs (- for no key)."""
+    return ' '.join('{:X}'.format(keys.bit_length() - 1) if keys else '-' for keys in path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        'python -m chip8.explorer',
+        description='CHIP-8 state-space explorer',
+        formatter_class=lambda prog: argparse.HelpFormatter(
+            prog, max_help_position=100, width=150))
+
+    parser.add_argument('program', help='CHIP-8 ROM')
+
+    parser.add_argument('-d', '--depth', type=int,
+                        help='Specify the maximum depth (frames)')
+
+    parser.add_argument('-n', '--max-states', type=int,
+                        help='Specify the maximum number of the visited states')
+
+    parser.add_argument('--pc', type=lambda value: int(value, 16), metavar='ADDR',
+                        help='Search for the inputs reaching the address (hex)')
+
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='Specify number of the worker processes (default=CPU count)')
+
+    parser.add_argument('-c', '--cycles-per-frame', type=int, default=CYCLES_PER_FRAME,
+                        help='Specify cycles per frame (default={})'.format(CYCLES_PER_FRAME))
+
+    parser.add_argument('-q', '--quirks', choices=sorted(PROFILES),
+                        help='Specify the quirk profile (default=chosen by the ROM extension)')
+
+    args = parser.parse_args()
+    with open(args.program, 'rb') as f:
+        data = bytearray(f.read())
+
+    explorer = Explorer(data, args.quirks or profile_for_filename(args.program),
+                        args.cycles_per_frame, args.jobs)
+    start = time.time()
+    result = explorer.explore(args.depth, args.max_states, args.pc)
+    elapsed = time.time() - start
+
+    print('{} states, depth {}, {} errors in {:.1f}s ({:.0f} states/s, {}B visited set)'.format(
+        result.states, result.depth, result.errors, elapsed, result.states / max(elapsed, 1e-6),
+        explorer.visited.memory_size))
+    if args.pc is not None:
+        print('Reached {:03X}: {}'.format(args.pc, format_path(result.path))
+              if result.path is not None else 'Not reached {:03X}'.format(args.pc))
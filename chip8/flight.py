@@ -0,0 +1,121 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import array
+import time
+
+from .disassembler import disassemble, disassemble_range
+from .swap import Swaps
+
+FLIGHT_RECORDER_SIZE = 4096  # Recorded instructions
+CRASH_DUMP = 'chip8-crash.txt'
+
+LISTING_BEFORE = 16  # Bytes of the code listed around the PC
+LISTING_AFTER  = 8
+
+
+class FlightRecorder(object):
+    """
+    Ring buffer of the recently executed instructions.
+
+    The PC & opcode and the I & VF of every instruction are packed into two
+    preallocated arrays before it's executed, the slot is counted in the
+    closure of the recording lookup (no allocations & no attribute updates
+    per instruction). When the VM fails the ring is written out with
+    the machine state & the code around the PC.
+    """
+
+    def __init__(self, vm, size=FLIGHT_RECORDER_SIZE):
+        self.vm = vm
+        self.size = size
+        self.code = array.array('L', [0]) * size       # PC after the fetch << 16 | opcode
+        self.registers = array.array('L', [0]) * size  # I << 8 | VF
+        self._recorded_cycles = [0]  # Recorded instructions so far (shared with the lookup)
+        self._swaps = Swaps()
+
+    @property
+    def cycles(self):
+        """Returns the number of the recorded instructions."""
+        return self._recorded_cycles[0]
+
+    def attach(self):
+        """Installs the recording instruction lookup."""
+        self._swaps.swap(self.vm.opcode, 'instruction_lookup', self._recorded)
+
+    def _recorded(self, lookup):
+        vm, v, code, registers, size = self.vm, self.vm.v, self.code, self.registers, self.size
+        recorded_cycles = self._recorded_cycles
+
+        def recorded_lookup(opcode):
+            cycle = recorded_cycles[0]
+            recorded_cycles[0] = cycle + 1
+            slot = cycle % size
+            code[slot] = vm.pc << 16 | opcode
+            registers[slot] = vm.i << 8 | v[0xf]
+            return lookup(opcode)
+        return recorded_lookup
+
+    def detach(self):
+        """Restores the original instruction lookup."""
+        self._swaps.restore_all()
+
+    def records(self):
+        """Returns the recorded (cycle, pc, opcode, I, VF) tuples, the oldest first."""
+        records = []
+        for cycle in range(max(self.cycles - self.size, 0), self.cycles):
+            code, registers = self.code[cycle % self.size], self.registers[cycle % self.size]
+            records.append((cycle, (code >> 16) - 2, code & 0xffff, registers >> 8, registers & 0xff))
+        return records
+
+    def format_dump(self, error=None):
+        """Returns the crash report: the error, machine state, code listing & the ring."""
+        vm = self.vm
+        records = self.records()
+        pc = records[-1][1] if records else vm.pc
+
+        lines = ['CHIP-8 crash dump ({})'.format(time.strftime('%Y-%m-%d %H:%M:%S'))]
+        if error is not None:
+            lines.append('Error: {}: {}'.format(type(error).__name__, error))
+        lines.append('Faulting instruction: {:03X} after {} instructions'.format(pc, self.cycles))
+
+        lines.append('')
+        lines.append('Registers:')
+        lines.append('  ' + ' '.join('V{:X}={:02X}'.format(r, vm.v[r]) for r in range(0x10)))
+        lines.append('  I={:03X} PC={:03X} SP={:X} DT={:02X} ST={:02X} keys={:04X}'.format(
+            vm.i, vm.pc, vm.sp, vm.dt, vm.st, vm.keys))
+        lines.append('  stack=[{}]'.format(
+            ' '.join('{:03X}'.format(vm.stack[i]) for i in range(min(vm.sp, len(vm.stack))))))
+
+        lines.append('')
+        lines.append('Code:')
+        lines.extend('  ' + line for line in disassemble_range(
+            vm.mem, pc - LISTING_BEFORE, pc + LISTING_AFTER, pc))
+
+        lines.append('')
+        lines.append('Last {} instructions:'.format(len(records)))
+        for cycle, addr, opcode, i, vf in records:
+            lines.append('  {:>10} {:03X}: {:04X}  {:<20} I={:03X} VF={:02X}'.format(
+                cycle, addr, opcode, disassemble(opcode), i, vf))
+
+        lines.append('')
+        lines.append('Memory:')
+        memory = vm.mem.fetch_many(0, len(vm.mem._mem))
+        for addr in range(0, len(memory), 0x20):
+            lines.append('  {:03X}: {}'.format(addr, ''.join(
+                '{:02X}'.format(b) for b in memory[addr:addr + 0x20])))
+
+        lines.append('')
+        lines.append('Screen:')
+        display = vm.display
+        for y in range(display.height):
+            lines.append('  ' + ''.join('#' if display.get_pixel((x, y)) else '.'
+                                        for x in range(display.width)))
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, fname, error=None):
+        """Writes the crash report into the file."""
+        with open(fname, 'w') as f:
+            f.write(self.format_dump(error))
@@ -0,0 +1,206 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import argparse
+import math
+
+import pygame
+
+from .chip8 import CYCLES_PER_FRAME, Chip8
+from .display import COLORS, KEY_INDEX
+from .halt import idle_loop
+from .quirks import PROFILES, profile_for_filename
+
+GRID_SCALE = 4
+FRAME_RATE = 60
+BORDER     = 2
+
+BORDER_COLORS = {
+    'normal': pygame.Color(48, 48, 48, 255),
+    'focus':  pygame.Color(255, 200, 0, 255),
+    'error':  pygame.Color(200, 0, 0, 255)
+}
+
+PALETTE = [(c.r, c.g, c.b) for c in COLORS]
+
+
+class Tile(object):
+    """Tile of the grid showing one VM."""
+
+    def __init__(self, vm, rect):
+        self.vm = vm
+        self.rect = rect
+        self.error = None
+        self.dirty = True  # The tile has to be redrawn
+
+    @property
+    def screen(self):
+        """Returns the rectangle of the screen inside the border."""
+        return self.rect.inflate(-2 * BORDER, -2 * BORDER)
+
+
+class GridDisplay(object):
+    """
+    Many VMs shown in the tiles of one window.
+
+    Every VM is a headless core emulating one frame per refresh. Only the
+    tiles whose framebuffer (or border) has changed are redrawn, and all
+    the redrawn rectangles are presented with a single display update.
+    The keypad input goes to the VM of the focused tile (selected by
+    a click or cycled with Tab). A failed VM stops and its tile is marked.
+    """
+
+    def __init__(self, vms, columns=None, scale=GRID_SCALE, frame_rate=FRAME_RATE):
+        self.columns = columns or int(math.ceil(math.sqrt(len(vms))))
+        self.rows = int(math.ceil(len(vms) / float(self.columns)))
+        self.frame_rate = frame_rate
+
+        display = vms[0].display
+        self.tile_size = (display.width * scale + 2 * BORDER,
+                          display.height * scale + 2 * BORDER)
+        self.tiles = []
+        for index, vm in enumerate(vms):
+            y, x = divmod(index, self.columns)
+            self.tiles.append(Tile(vm, pygame.Rect(
+                x * self.tile_size[0], y * self.tile_size[1], *self.tile_size)))
+
+        self.focus = 0
+        self.surface = None
+        self.frames = 0
+
+    def init_display(self):
+        """Opens the window."""
+        pygame.display.init()
+        pygame.display.set_caption('CHIP-8 Grid')
+        self.surface = pygame.display.set_mode(
+            (self.columns * self.tile_size[0], self.rows * self.tile_size[1]), 0, 32)
+        self.surface.fill(BORDER_COLORS['normal'])
+
+    def set_focus(self, index):
+        """Moves the keyboard focus to the tile (the keys of the old one are released)."""
+        old = self.tiles[self.focus]
+        old.vm.keys = 0
+        old.dirty = True
+        self.focus = index % len(self.tiles)
+        self.tiles[self.focus].dirty = True
+
+    def emulate(self):
+        """Emulates one frame of every running VM (the idle ones are skipped)."""
+        for tile in self.tiles:
+            vm = tile.vm
+            if tile.error is not None or idle_loop(vm) is not None:
+                continue
+            try:
+                vm.run_until(frame=vm.frame + 1)
+            except Exception as e:
+                tile.error = e
+                tile.dirty = True
+            if vm.display.dirty:
+                vm.display.dirty = False
+                tile.dirty = True
+        self.frames += 1
+
+    def present(self):
+        """Redraws the changed tiles with one display update. Returns their number."""
+        rects = []
+        for index, tile in enumerate(self.tiles):
+            if not tile.dirty:
+                continue
+            tile.dirty = False
+
+            display = tile.vm.display
+            frame = pygame.image.fromstring(bytes(bytearray(display.pixels)),
+                                            (display.width, display.height), 'P')
+            frame.set_palette(PALETTE)
+            screen = tile.screen
+            kind = 'error' if tile.error is not None else 'focus' if index == self.focus else 'normal'
+            self.surface.fill(BORDER_COLORS[kind], tile.rect)
+            self.surface.blit(pygame.transform.scale(frame, screen.size), screen.topleft)
+            rects.append(tile.rect)
+
+        if rects:
+            pygame.display.update(rects)
+        return len(rects)
+
+    def handle_events(self):
+        """
+        Routes the keypad input to the focused VM & handles the focus changes.
+        Returns False when the user wants to quit.
+        """
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            if event.type == pygame.KEYDOWN and not self._key_down(event.key):
+                return False
+            if event.type == pygame.KEYUP and event.key in KEY_INDEX:
+                self.tiles[self.focus].vm.keys &= ~(1 << KEY_INDEX[event.key])
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                self._click(event.pos)
+        return True
+
+    def _key_down(self, key):
+        """Handles the key press. Returns False on Escape."""
+        if key == pygame.K_ESCAPE:
+            return False
+        if key == pygame.K_TAB:
+            self.set_focus(self.focus + 1)
+        elif key in KEY_INDEX:
+            self.tiles[self.focus].vm.keys |= 1 << KEY_INDEX[key]
+        return True
+
+    def _click(self, pos):
+        """Focuses the clicked tile."""
+        for index, tile in enumerate(self.tiles):
+            if tile.rect.collidepoint(pos):
+                self.set_focus(index)
+
+    def run(self):
+        """Runs all the VMs until the user quits."""
+        if self.surface is None:
+            self.init_display()
+        clock = pygame.time.Clock()
+        while self.handle_events():
+            self.emulate()
+            self.present()
+            clock.tick(self.frame_rate)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        'python -m chip8.grid',
+        description='CHIP-8 grid of many VMs in one window',
+        formatter_class=lambda prog: argparse.HelpFormatter(
+            prog, max_help_position=100, width=150))
+
+    parser.add_argument('programs', nargs='+', help='CHIP-8 ROMs')
+
+    parser.add_argument('-n', '--copies', type=int, default=1,
+                        help='Specify number of the VMs per ROM (default=1)')
+
+    parser.add_argument('--columns', type=int,
+                        help='Specify number of the columns (default=square grid)')
+
+    parser.add_argument('-s', '--scale', type=int, default=GRID_SCALE,
+                        help='Specify scale of the tiles (default={})'.format(GRID_SCALE))
+
+    parser.add_argument('-c', '--cycles-per-frame', type=int, default=CYCLES_PER_FRAME,
+                        help='Specify cycles per frame (default={})'.format(CYCLES_PER_FRAME))
+
+    parser.add_argument('-q', '--quirks', choices=sorted(PROFILES),
+                        help='Specify the quirk profile (default=chosen by the ROM extension)')
+
+    args = parser.parse_args()
+
+    vms = []
+    for fname in args.programs:
+        with open(fname, 'rb') as f:
+            image = Chip8.memory_image(bytearray(f.read()))
+        quirks = PROFILES[args.quirks or profile_for_filename(fname)]
+        for _ in range(args.copies):
+            vm = Chip8(None, 1, headless=True, quirks=quirks, pages=image)
+            vm.cycles_per_frame = args.cycles_per_frame
+            vms.append(vm)
+    GridDisplay(vms, args.columns, args.scale).run()
@@ -0,0 +1,65 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+from .memory import MEMORY_SIZE
+
+HALTED  = 'halted'   # Loops forever whatever the input
+WAITING = 'waiting'  # Loops until the keypad state changes
+
+MAX_IDLE_LOOP = 16  # Longest loop (instructions) checked
+
+
+def idle_loop(vm):
+    """
+    Checks whether the VM spins in a loop without any side effects, e.g.
+    the final JMP to its own address or a key polling loop. The loop from
+    the PC is followed with the current registers & keypad state; it must
+    return to the PC executing only the jumps, skips & the waiting LDK, and
+    the timers must be zero (so nothing changes until the input does).
+    Returns HALTED, WAITING (the loop checks the keys) or None.
+    """
+    if vm.dt or vm.st:
+        return None
+
+    mem, v, keys = vm.mem, vm.v, vm.keys
+    start = pc = vm.pc
+    waits = False
+
+    for _ in range(MAX_IDLE_LOOP):
+        if pc + 1 >= MEMORY_SIZE:
+            return None
+        step = _follow(mem.fetch_word(pc), pc, v, keys)
+        if step is None:
+            return None
+        pc, checks_keys = step
+        waits = waits or checks_keys
+
+        if pc == start:
+            return WAITING if waits else HALTED
+    return None
+
+
+def _follow(opcode, pc, v, keys):
+    """
+    Returns the next PC of the jump, skip or waiting LDK instruction & whether
+    it checks the keys (None for the other instructions).
+    """
+    prefix, x, y, kk = opcode >> 12, (opcode >> 8) & 0xf, (opcode >> 4) & 0xf, opcode & 0xff
+
+    if prefix == 0x1:
+        return opcode & 0xfff, False
+    if prefix in (0x3, 0x4):  # SE / SNE Vx, byte
+        skips = (v[x] == kk) == (prefix == 0x3)
+        return pc + (4 if skips else 2), False
+    if prefix in (0x5, 0x9) and opcode & 0xf == 0:  # SE / SNE Vx, Vy
+        skips = (v[x] == v[y]) == (prefix == 0x5)
+        return pc + (4 if skips else 2), False
+    if prefix == 0xE and kk in (0x9E, 0xA1):
+        pressed = bool(keys >> (v[x] & 0xf) & 1)
+        return pc + (4 if pressed == (kk == 0x9E) else 2), True
+    if prefix == 0xF and kk == 0x0A and not keys:
+        return pc, True
+    return None
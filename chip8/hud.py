@@ -0,0 +1,225 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import collections
+import math
+import time
+
+import pygame
+
+from .metrics import Metrics
+from .swap import Swaps
+
+HUD_INTERVAL = 0.5  # Seconds between the updates of the numbers
+HUD_SCALE    = 2    # Size of the glyph pixels
+HUD_PADDING  = 2    # Glyph pixels around the text
+
+HUD_COLORS = (
+    pygame.Color(0, 0, 0, 255),     # Background
+    pygame.Color(0, 255, 0, 255)    # Text
+)
+
+# 3x5 glyphs of the HUD text (one row per value, the high bit is the left pixel).
+HUD_FONT = {
+    ' ': (0, 0, 0, 0, 0), '.': (0, 0, 0, 0, 2), '/': (1, 1, 2, 4, 4), '-': (0, 0, 7, 0, 0),
+    '0': (7, 5, 5, 5, 7), '1': (2, 6, 2, 2, 7), '2': (7, 1, 7, 4, 7), '3': (7, 1, 7, 1, 7),
+    '4': (5, 5, 7, 1, 1), '5': (7, 4, 7, 1, 7), '6': (7, 4, 7, 5, 7), '7': (7, 1, 1, 1, 1),
+    '8': (7, 5, 7, 5, 7), '9': (7, 5, 7, 1, 7),
+    'A': (2, 5, 7, 5, 5), 'B': (6, 5, 6, 5, 6), 'C': (3, 4, 4, 4, 3), 'D': (6, 5, 5, 5, 6),
+    'E': (7, 4, 6, 4, 7), 'F': (7, 4, 6, 4, 4), 'G': (3, 4, 5, 5, 3), 'H': (5, 5, 7, 5, 5),
+    'I': (7, 2, 2, 2, 7), 'J': (1, 1, 1, 5, 2), 'K': (5, 5, 6, 5, 5), 'L': (4, 4, 4, 4, 7),
+    'M': (5, 7, 7, 5, 5), 'N': (6, 5, 5, 5, 5), 'O': (2, 5, 5, 5, 2), 'P': (6, 5, 6, 4, 4),
+    'Q': (2, 5, 5, 6, 3), 'R': (6, 5, 6, 5, 5), 'S': (3, 4, 2, 1, 6), 'T': (7, 2, 2, 2, 2),
+    'U': (5, 5, 5, 5, 7), 'V': (5, 5, 5, 5, 2), 'W': (5, 5, 7, 7, 5), 'X': (5, 5, 2, 5, 5),
+    'Y': (5, 5, 2, 2, 2), 'Z': (7, 1, 2, 4, 7)
+}
+
+GLYPH_WIDTH  = 4  # Including the spacing
+GLYPH_HEIGHT = 6
+
+# The rows of the HUD: the label & the format of the value.
+HUD_ROWS = (
+    ('IPS',    '{:.0f}'),
+    ('CYC/F',  '{:.0f}'),
+    ('EMU MS', '{:.2f}'),
+    ('PRS MS', '{:.2f}'),
+    ('DRW/F',  '{:.1f}'),
+    ('JIT MS', '{:.2f}')
+)
+VALUE_COLUMN = 7  # Characters of the label column
+VALUE_WIDTH  = 9  # Characters of the value column
+
+# ips             - emulated instructions per second,
+# cycles          - instructions per emulated frame,
+# emulate/present - seconds spent emulating / presenting per frame,
+# draws           - DRW instructions per frame,
+# jitter          - standard deviation of the intervals between the frames (seconds).
+HudSample = collections.namedtuple('HudSample', 'ips cycles emulate present draws jitter')
+
+
+class Hud(object):
+    """
+    Performance overlay drawn over the screen.
+
+    The numbers are the averages of the metrics since the previous update
+    (every HUD_INTERVAL seconds) and the frame pacing jitter measured by
+    the frame listener. The glyphs & the labels are rendered once, an update
+    only composites the digits of the values into the panel, which is then
+    blitted before every flip of the screen by the method swapped onto the
+    display. The metrics created by the HUD itself, the frame listener &
+    the flip are attached only while it's shown, so the hidden HUD doesn't
+    change the emulation.
+    """
+
+    def __init__(self, vm, metrics=None):
+        self.vm = vm
+        self.owned = metrics is None  # The metrics are attached by the HUD
+        self.metrics = Metrics() if metrics is None else metrics
+        self.engine = type(vm.opcode).__name__.upper()
+        self.visible = False
+
+        self.glyphs = None
+        self.panel = None
+        self._next_update = 0.0
+        self._last = None       # (time, instructions, frames, draws, emulate, present)
+        self._frame_time = None
+        self._intervals = (0, 0.0, 0.0)  # Count, sum & sum of the squares
+        self._swaps = Swaps()
+
+    def toggle(self):
+        """Shows or hides the HUD."""
+        if self.visible:
+            self.hide()
+        else:
+            self.show()
+
+    def show(self):
+        """Attaches the HUD & draws it at the next flip."""
+        if self.glyphs is None:
+            self._render_labels()
+        if self.owned:
+            self.metrics.attach(self.vm)
+        self._last = self._totals()
+        self._frame_time = None
+        self._intervals = (0, 0.0, 0.0)
+        self._next_update = 0.0
+
+        vm = self.vm
+        vm.frame_listeners = vm.frame_listeners + [self._frame]
+        self._swaps.swap(vm.display, 'flip', self._overlaid)
+        self.visible = True
+
+    def hide(self):
+        """Detaches the HUD & repaints the screen under it."""
+        vm, display = self.vm, self.vm.display
+        vm.frame_listeners = [listener for listener in vm.frame_listeners
+                              if listener != self._frame]
+        self._swaps.restore(display, 'flip')
+        if self.owned:
+            self.metrics.detach()
+        self.visible = False
+        display.repaint()
+
+    def _overlaid(self, flip):
+        display = self.vm.display
+
+        def overlaid_flip():
+            if time.time() >= self._next_update:
+                self.update()
+            if display.surface is not None:
+                display.surface.blit(self.panel, (0, 0))
+            flip()
+        return overlaid_flip
+
+    def _frame(self):
+        """Frame listener measuring the intervals between the frames."""
+        now = time.time()
+        if self._frame_time is not None:
+            interval = now - self._frame_time
+            count, total, squares = self._intervals
+            self._intervals = (count + 1, total + interval, squares + interval * interval)
+        self._frame_time = now
+
+    def _totals(self):
+        metrics = self.metrics
+        return (time.time(), metrics.instructions, metrics.frames, metrics.draws,
+                metrics.frame_emulate.sum, metrics.frame_present.sum)
+
+    def sample(self):
+        """Returns the HudSample since the previous one."""
+        totals = self._totals()
+        elapsed, instructions, frames, draws, emulate, present = [
+            now - then for now, then in zip(totals, self._last)]
+        self._last = totals
+
+        count, total, squares = self._intervals
+        self._intervals = (0, 0.0, 0.0)
+        jitter = 0.0
+        if count > 1:
+            mean = total / count
+            jitter = math.sqrt(max(squares / count - mean * mean, 0.0))
+
+        per_frame = 1.0 / frames if frames else 0.0
+        return HudSample(instructions / elapsed if elapsed > 0 else 0.0,
+                         instructions * per_frame, emulate * per_frame, present * per_frame,
+                         draws * per_frame, jitter)
+
+    def update(self):
+        """Samples the metrics & composites the values into the panel."""
+        self._next_update = time.time() + HUD_INTERVAL
+        sample = self.sample()
+        values = (sample.ips, sample.cycles, sample.emulate * 1000, sample.present * 1000,
+                  sample.draws, sample.jitter * 1000)
+
+        for row, ((_, fmt), value) in enumerate(zip(HUD_ROWS, values)):
+            text = fmt.format(value)[:VALUE_WIDTH]
+            x, y = self._position(VALUE_COLUMN, row)
+            self.panel.fill(HUD_COLORS[0], (x, y, VALUE_WIDTH * GLYPH_WIDTH * HUD_SCALE,
+                                            GLYPH_HEIGHT * HUD_SCALE))
+            self._blit_text(text, x, y)
+
+    def _position(self, column, row):
+        return ((HUD_PADDING + column * GLYPH_WIDTH) * HUD_SCALE,
+                (HUD_PADDING + row * GLYPH_HEIGHT) * HUD_SCALE)
+
+    def _blit_text(self, text, x, y):
+        for char in text:
+            self.panel.blit(self.glyphs.get(char, self.glyphs[' ']), (x, y))
+            x += GLYPH_WIDTH * HUD_SCALE
+
+    def _render_labels(self):
+        """Renders the glyphs & the panel with the labels and the engine name."""
+        target = self.vm.display.surface
+        self.glyphs = {}
+        for char, rows in HUD_FONT.items():
+            glyph = self._surface((3 * HUD_SCALE, 5 * HUD_SCALE), target)
+            glyph.fill(HUD_COLORS[0])
+            for y, bits in enumerate(rows):
+                for x in range(3):
+                    if bits & (4 >> x):
+                        glyph.fill(HUD_COLORS[1], (x * HUD_SCALE, y * HUD_SCALE,
+                                                   HUD_SCALE, HUD_SCALE))
+            self.glyphs[char] = glyph
+
+        rows = len(HUD_ROWS) + 1
+        width = max(VALUE_COLUMN + VALUE_WIDTH, VALUE_COLUMN + len(self.engine))
+        self.panel = self._surface(((2 * HUD_PADDING + width * GLYPH_WIDTH) * HUD_SCALE,
+                                    (2 * HUD_PADDING + rows * GLYPH_HEIGHT) * HUD_SCALE), target)
+        self.panel.fill(HUD_COLORS[0])
+        for row, (label, _) in enumerate(HUD_ROWS):
+            self._blit_text(label, *self._position(0, row))
+        self._blit_text('ENG', *self._position(0, len(HUD_ROWS)))
+        self._blit_text(self.engine, *self._position(VALUE_COLUMN, len(HUD_ROWS)))
+
+    @staticmethod
+    def _surface(size, target):
+        """Returns the surface in the format of the target (if any)."""
+        if target is None:
+            return pygame.Surface(size)
+        surface = pygame.Surface(size, 0, target)
+        if target.get_bitsize() == 8:
+            surface.set_palette(target.get_palette())  # Not always copied
+        return surface
@@ -0,0 +1,265 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import argparse
+import random
+import threading
+import time
+
+import pygame
+
+from .chip8 import CYCLES_PER_FRAME, Chip8
+from .display import KEY_MAP
+from .quirks import PROFILES
+from .swap import Swaps
+from .threaded import ThreadedRunner
+
+# The stages of the event: the keypad state updated by the input handling,
+# the key read by SKP / SKNP / LDK, the framebuffer changed by DRW / CLS
+# & the change presented on the screen.
+STAGES = ('poll', 'observe', 'draw', 'present')
+
+PERCENTILES = (50, 95, 99)
+
+EVENTS   = 100  # Injected key presses
+INTERVAL = 250  # Mean time between the presses (ms)
+HOLD     = 100  # Time the key is held (ms)
+
+# Indices of the event record
+KEY, INJECTED = 0, 1
+POLL, OBSERVE, DRAW, PRESENT = range(2, 6)
+
+
+def percentile(values, p):
+    """Returns the nearest-rank percentile of the sorted values."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(p / 100.0 * len(values))) - 1))]
+
+
+class LatencyProbe(object):
+    """
+    Input-to-photon latency probe.
+
+    The key presses are injected as the pygame events & each one is followed
+    through the input handling, the next instruction reading the key, the next
+    drawing instruction changing the framebuffer and the next flip of the
+    screen showing the change (with the deferred presentation, the present
+    of the first published framebuffer containing the change). The probing
+    methods are swapped onto the instances by attach. An event which didn't
+    reach a stage before the next one was injected is counted as missed for
+    the stage.
+    """
+
+    def __init__(self, vm):
+        self.vm = vm
+        self.events = []      # [key, injected, poll, observe, draw, present]
+        self._pending = None  # The followed event
+        self._targets = []    # The published framebuffers containing the change
+        self._flips = 0
+        self._flip_time = None
+        self._buffers = None  # The frame buffers of the deferred presentation
+        self._swaps = Swaps()
+
+    def inject(self, key, pressed=True):
+        """Posts the key event (the pressed ones are followed)."""
+        if pressed:
+            event = [key, time.time(), None, None, None, None]
+            self.events.append(event)
+            self._pending, self._targets = event, []
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN if pressed else pygame.KEYUP,
+                                             key=KEY_MAP[key]))
+
+    def latencies(self, stage):
+        """Returns the sorted latencies (seconds since the injection) of the stage."""
+        index = POLL + STAGES.index(stage)
+        return sorted(event[index] - event[INJECTED] for event in self.events
+                      if event[index] is not None)
+
+    def report(self):
+        """Returns the lines of the latency distributions of the stages."""
+        lines = []
+        for stage in STAGES:
+            values = self.latencies(stage)
+            lines.append('{:<8} {:>5} events {:>4} missed  {}  max {:7.2f}ms'.format(
+                stage, len(values), len(self.events) - len(values),
+                '  '.join('p{} {:7.2f}ms'.format(p, percentile(values, p) * 1000)
+                          for p in PERCENTILES),
+                values[-1] * 1000 if values else 0.0))
+        return lines
+
+    # Instrumentation
+
+    def attach(self, buffers=None):
+        """
+        Swaps the probing input, instruction, drawing & flip methods onto
+        the instances (with the present & the publish of the frame buffers
+        of the deferred presentation).
+        """
+        vm, display = self.vm, self.vm.display
+        self._swaps.swap(vm, 'handle_events', self._polled)
+        self._swaps.swap(vm.opcode, 'instruction_lookup', self._observed)
+        self._swaps.swap(display, 'draw_sprite', self._drawn)
+        self._swaps.swap(display, 'clear_display', self._drawn)
+        self._swaps.swap(display, 'flip', self._flipped)
+        if buffers is not None:
+            self._buffers = buffers
+            self._swaps.swap(buffers, 'publish', self._published)
+            self._swaps.swap(display, 'present', self._presented)
+
+    def detach(self):
+        """Restores the original methods."""
+        self._swaps.restore_all()
+
+    def _polled(self, method):
+        vm = self.vm
+
+        def handle_events():
+            running = method()
+            event = self._pending
+            if event is not None and event[POLL] is None and vm.keys >> event[KEY] & 1:
+                event[POLL] = time.time()
+            return running
+        return handle_events
+
+    def _observed(self, method):
+        def instruction_lookup(opcode):
+            event = self._pending
+            if event is not None and event[POLL] is not None and event[OBSERVE] is None:
+                self._observe(event, opcode)
+            return method(opcode)
+        return instruction_lookup
+
+    def _observe(self, event, opcode):
+        """Notes the instruction reading the key of the event (LDK reads any key)."""
+        kind = opcode & 0xF0FF
+        key = self.vm.v[(opcode >> 8) & 0xf] & 0xf
+        if kind == 0xF00A or (kind in (0xE09E, 0xE0A1) and key == event[KEY]):
+            event[OBSERVE] = time.time()
+
+    def _drawn(self, method):
+        display = self.vm.display
+
+        def draw(*args):
+            event = self._pending
+            if event is None or event[OBSERVE] is None or event[DRAW] is not None:
+                return method(*args)
+            before, flips, start = bytearray(display.pixels), self._flips, time.time()
+            result = method(*args)
+            if display.pixels != before:
+                event[DRAW] = start
+                # Drawn directly on the screen & flipped by the instruction
+                if display.canvas is not None and self._flips != flips:
+                    event[PRESENT] = self._flip_time
+            return result
+        return draw
+
+    def _flipped(self, method):
+        display = self.vm.display
+
+        def flip():
+            method()
+            self._flips += 1
+            self._flip_time = time.time()
+            event = self._pending
+            drawn = event is not None and event[DRAW] is not None and event[PRESENT] is None
+            if drawn and display.canvas is not None:
+                event[PRESENT] = self._flip_time
+        return flip
+
+    def _published(self, method):
+        def publish(pixels):
+            method(pixels)
+            event = self._pending
+            if event is not None and event[DRAW] is not None and event[PRESENT] is None:
+                self._targets.append(self._buffers.front)
+        return publish
+
+    def _presented(self, method):
+        def present(pixels):
+            method(pixels)
+            event = self._pending
+            if event is None or event[PRESENT] is not None:
+                return
+            if any(pixels is target for target in self._targets):
+                event[PRESENT] = time.time()
+                self._targets = []
+        return present
+
+
+def inject_events(probe, key, events=EVENTS, interval=INTERVAL, hold=HOLD):
+    """
+    Presses & releases the key at the random intervals (uniform around
+    the mean, so the presses aren't in phase with the frames), then quits.
+    """
+    for _ in range(events):
+        time.sleep(random.uniform(0.5, 1.5) * interval / 1000.0)
+        probe.inject(key)
+        time.sleep(hold / 1000.0)
+        probe.inject(key, pressed=False)
+    pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+
+def measure(vm, key, events=EVENTS, interval=INTERVAL, hold=HOLD, delay=1,
+            cycles_per_frame=CYCLES_PER_FRAME, threaded=False):
+    """Runs the VM while the key presses are injected. Returns the LatencyProbe."""
+    probe = LatencyProbe(vm)
+    runner = ThreadedRunner(vm, cycles_per_frame) if threaded else None
+    probe.attach(runner.buffers if threaded else None)
+    injector = threading.Thread(target=inject_events, args=(probe, key, events, interval, hold))
+    injector.daemon = True
+    injector.start()
+    try:
+        if threaded:
+            runner.run()
+        else:
+            vm.run(delay, cycles_per_frame)
+    finally:
+        injector.join()
+        probe.detach()
+    return probe
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        'python -m chip8.latency',
+        description='CHIP-8 input-to-photon latency measurement',
+        formatter_class=lambda prog: argparse.HelpFormatter(
+            prog, max_help_position=100, width=150))
+
+    parser.add_argument('program', help='CHIP-8 ROM')
+
+    parser.add_argument('-k', '--key', type=lambda value: int(value, 16), default=5,
+                        help='Specify the pressed key (hex, default=5)')
+
+    parser.add_argument('-n', '--events', type=int, default=EVENTS,
+                        help='Specify number of the key presses (default={})'.format(EVENTS))
+
+    parser.add_argument('--interval', type=int, default=INTERVAL,
+                        help='Specify mean time between the presses (default={}ms)'.format(INTERVAL))
+
+    parser.add_argument('--hold', type=int, default=HOLD,
+                        help='Specify time the key is held (default={}ms)'.format(HOLD))
+
+    parser.add_argument('-d', '--delay', type=int, default=1,
+                        help='Specify delay for every instruction (default=1ms)')
+
+    parser.add_argument('-c', '--cycles-per-frame', type=int, default=CYCLES_PER_FRAME,
+                        help='Specify cycles per frame (default={})'.format(CYCLES_PER_FRAME))
+
+    parser.add_argument('--threaded', action='store_true', default=False,
+                        help='Run the emulation on a worker thread')
+
+    parser.add_argument('-q', '--quirks', choices=sorted(PROFILES),
+                        help='Specify the quirk profile (default=chosen by the ROM extension)')
+
+    args = parser.parse_args()
+
+    vm = Chip8.load_program_from_file(args.program, 10, args.quirks)
+    probe = measure(vm, args.key, args.events, args.interval, args.hold, args.delay,
+                    args.cycles_per_frame, args.threaded)
+    for line in probe.report():
+        print(line)
@@ -0,0 +1,234 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import argparse
+import collections
+import sys
+import zlib
+
+from .chip8 import Chip8
+from .disassembler import disassemble
+from .memo import MemoOpcode
+from .opcode import Opcode
+from .quirks import DEFAULT_PROFILE, PROFILES
+
+# Execution engines which can be compared against each other.
+ENGINES = {
+    'opcode': Opcode,
+    'memo':   MemoOpcode
+}
+
+TRAIL_LENGTH = 16
+DIFF_LIMIT   = 16
+
+GRANULARITIES = ('instruction', 'block')
+
+Divergence = collections.namedtuple('Divergence', 'cycle trail diff')
+
+try:
+    _view = buffer  # zlib accepts only read-only buffers on Python 2
+except NameError:
+    _view = memoryview
+
+
+def state_digest(vm):
+    """Returns the cheap to compare digest of the full machine state."""
+    return zlib.crc32(_view(vm.state.block))
+
+
+def _register_diff(vm_a, vm_b):
+    """Returns the differences between the registers & the stacks."""
+    diff = []
+    for name in ('pc', 'i', 'sp', 'dt', 'st'):
+        a, b = getattr(vm_a, name), getattr(vm_b, name)
+        if a != b:
+            diff.append('{}: {:03X} != {:03X}'.format(name.upper(), a, b))
+
+    for r in range(0x10):
+        if vm_a.v[r] != vm_b.v[r]:
+            diff.append('V{:X}: {:02X} != {:02X}'.format(r, vm_a.v[r], vm_b.v[r]))
+
+    stack_a, stack_b = vm_a.stack[:], vm_b.stack[:]
+    for slot in range(len(stack_a)):
+        if stack_a[slot] != stack_b[slot]:
+            diff.append('stack[{:X}]: {:03X} != {:03X}'.format(slot, stack_a[slot], stack_b[slot]))
+    return diff
+
+
+def state_diff(vm_a, vm_b, limit=DIFF_LIMIT):
+    """Returns the list of human readable differences between the states."""
+    diff = _register_diff(vm_a, vm_b)
+
+    mem_a, mem_b = vm_a.mem._mem, vm_b.mem._mem
+    changed = [addr for addr in range(len(mem_a)) if mem_a[addr] != mem_b[addr]]
+    for addr in changed[:limit]:
+        diff.append('[{:03X}]: {:02X} != {:02X}'.format(addr, mem_a[addr], mem_b[addr]))
+    if len(changed) > limit:
+        diff.append('... {} more memory differences'.format(len(changed) - limit))
+
+    width = vm_a.display.width
+    pixels_a, pixels_b = vm_a.display.pixels, vm_b.display.pixels
+    changed = [p for p in range(len(pixels_a)) if pixels_a[p] != pixels_b[p]]
+    for p in changed[:limit]:
+        diff.append('pixel ({}, {}): {} != {}'.format(
+            p % width, p // width, pixels_a[p], pixels_b[p]))
+    if len(changed) > limit:
+        diff.append('... {} more pixel differences'.format(len(changed) - limit))
+    return diff
+
+
+def format_divergence(divergence):
+    """Formats the divergence report."""
+    lines = ['Divergence after cycle {}:'.format(divergence.cycle)]
+    for pc, opcode in divergence.trail:
+        lines.append('  {:03X}: {:04X}  {}'.format(pc, opcode, disassemble(opcode)))
+    lines.append('State diff (A != B):')
+    lines.extend('  ' + line for line in divergence.diff)
+    return '\n'.join(lines)
+
+
+class Lockstep(object):
+    """
+    Differential execution harness.
+
+    Runs two VMs with the same program, random seed and input stream
+    in lockstep and compares the digests of their states after every
+    instruction ('instruction' granularity) or whenever the control flow
+    leaves the straight line code ('block' granularity).
+    """
+
+    def __init__(self, vm_a, vm_b, granularity='instruction', trail=TRAIL_LENGTH):
+        if granularity not in GRANULARITIES:
+            raise ValueError('Unknown granularity: {}'.format(granularity))
+        self.vm_a = vm_a
+        self.vm_b = vm_b
+        self.granularity = granularity
+        self.trail = collections.deque(maxlen=trail)
+        self.cycles = 0
+
+    @classmethod
+    def from_program(cls, data, engine_a=Opcode, engine_b=Opcode, seed=0, quirks=None, **kwargs):
+        """Creates the harness for two headless VMs running the same program."""
+        vm_a = Chip8(data, headless=True, engine=engine_a, seed=seed, quirks=quirks)
+        vm_b = Chip8(data, headless=True, engine=engine_b, seed=seed, quirks=quirks)
+        return cls(vm_a, vm_b, **kwargs)
+
+    def _cycle(self, vm):
+        """
+        Executes a single instruction, returns the raised error (if any)
+        & the number of the cycles it took (more for the memoized calls).
+        """
+        start = vm.frame_cycles
+        try:
+            vm.cycle()
+        except Exception as e:
+            return '{}: {}'.format(type(e).__name__, e), 1
+        return None, 1 + vm.frame_cycles - start
+
+    def _step(self):
+        """
+        Executes an instruction on both VMs. When it took more cycles on one
+        of them, the other one executes the instructions until both have
+        executed the same number of cycles. Returns the raised errors.
+        """
+        error_a, cycles_a = self._cycle(self.vm_a)
+        error_b, cycles_b = self._cycle(self.vm_b)
+        while error_a is None and error_b is None and cycles_a != cycles_b:
+            if cycles_a < cycles_b:
+                error_a, cycles = self._cycle(self.vm_a)
+                cycles_a += cycles
+            else:
+                error_b, cycles = self._cycle(self.vm_b)
+                cycles_b += cycles
+        return error_a, error_b
+
+    def run(self, cycles, inputs=None):
+        """
+        Executes at most the given number of cycles.
+        The inputs maps the cycle number to the keypad mask set before it.
+        Returns the Divergence or None if the VMs stayed in sync.
+        """
+        inputs = inputs or {}
+        vm_a, vm_b = self.vm_a, self.vm_b
+        block = self.granularity == 'block'
+
+        for _ in range(cycles):
+            if self.cycles in inputs:
+                vm_a.keys = vm_b.keys = inputs[self.cycles]
+
+            pc_a, pc_b = vm_a.pc, vm_b.pc
+            self.trail.append((pc_a, vm_a.mem.fetch_word(pc_a)))
+
+            error_a, error_b = self._step()
+            self.cycles += 1
+
+            if error_a is not None or error_b is not None:
+                if error_a != error_b:
+                    return self._divergence(['error: {} != {}'.format(error_a, error_b)])
+                return None
+
+            if block and vm_a.pc == pc_a + 2 and vm_b.pc == pc_b + 2:
+                continue
+            if state_digest(vm_a) != state_digest(vm_b):
+                return self._divergence(state_diff(vm_a, vm_b))
+
+        if state_digest(vm_a) != state_digest(vm_b):
+            return self._divergence(state_diff(vm_a, vm_b))
+        return None
+
+    def _divergence(self, diff):
+        return Divergence(self.cycles, list(self.trail), diff)
+
+
+def _keys(value):
+    cycle, mask = value.split('=')
+    return int(cycle), int(mask, 16)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        'python -m chip8.lockstep',
+        description='CHIP-8 lockstep differential execution',
+        formatter_class=lambda prog: argparse.HelpFormatter(
+            prog, max_help_position=100, width=150))
+
+    parser.add_argument('program', help='CHIP-8 ROM')
+
+    parser.add_argument('-a', '--engine-a', choices=sorted(ENGINES), default='opcode',
+                        help='Specify the first engine (default=opcode)')
+
+    parser.add_argument('-b', '--engine-b', choices=sorted(ENGINES), default='opcode',
+                        help='Specify the second engine (default=opcode)')
+
+    parser.add_argument('-n', '--cycles', type=int, default=1000000,
+                        help='Specify the number of cycles to compare (default=1000000)')
+
+    parser.add_argument('-g', '--granularity', choices=GRANULARITIES, default='instruction',
+                        help='Specify when the states are compared (default=instruction)')
+
+    parser.add_argument('-r', '--seed', type=int, default=0,
+                        help='Specify the random seed (default=0)')
+
+    parser.add_argument('-q', '--quirks', choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help='Specify the quirk profile (default={})'.format(DEFAULT_PROFILE))
+
+    parser.add_argument('-k', '--keys', type=_keys, action='append', default=[],
+                        metavar='CYCLE=MASK',
+                        help='Set the keypad mask (hex) before the cycle, can be repeated')
+
+    args = parser.parse_args()
+    with open(args.program, 'rb') as f:
+        data = bytearray(f.read())
+
+    harness = Lockstep.from_program(
+        data, ENGINES[args.engine_a], ENGINES[args.engine_b], args.seed,
+        PROFILES[args.quirks], granularity=args.granularity)
+    divergence = harness.run(args.cycles, dict(args.keys))
+
+    if divergence is not None:
+        print(format_divergence(divergence))
+        sys.exit(1)
+    print('No divergence in {} cycles.'.format(harness.cycles))
@@ -0,0 +1,127 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import collections
+
+from .analysis import pure_subroutine
+from .opcode import Opcode, StackOverflowException
+from .state import STACK_DEPTH
+
+MEMO_CACHE_SIZE = 4096  # Cached calls of all the subroutines (LRU)
+MAX_BODY_CYCLES = 1024  # The longer calls are left to execute normally
+
+
+class MemoOpcode(Opcode):
+    """
+    CHIP-8 instructions class memoizing the pure subroutines.
+
+    A CALL target is checked by the static analysis (pure_subroutine) when
+    it's called first. The effect of the pure subroutine call (the registers
+    and I after RET & the executed cycles) is cached keyed by the target and
+    the values of the registers & I the body touches. On a hit the effect is
+    applied and the timers are advanced by the skipped cycles, without
+    executing the body.
+
+    The body image is kept with its analysis and compared on every call,
+    so a write into the body (self-modifying code, a restored snapshot)
+    drops the cached calls of the subroutine. The cycles of the body (executed
+    on a miss or skipped on a hit) are added to the frame_cycles of the VM,
+    so the runners end the frame as if the call was executed normally.
+    """
+
+    def __init__(self, vm, cache_size=MEMO_CACHE_SIZE):
+        super(MemoOpcode, self).__init__(vm)
+        self.opcodes[0x2] = self.CALL_MEMO
+
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.subroutines = {}  # Target: (Effects, body image) or None when impure
+        self.hits = 0
+        self.misses = 0
+
+    def _subroutine(self, target):
+        """Returns the Effects of the pure subroutine (None if impure)."""
+        mem = self.vm.mem
+        subroutine = self.subroutines.get(target, False)
+        if subroutine:
+            effects, image = subroutine
+            if mem.fetch_many(effects.start, effects.end - effects.start) == image:
+                return effects
+            self.invalidate(target)
+        elif subroutine is None:
+            return None
+
+        effects = pure_subroutine(mem._mem, target)
+        if effects is None:
+            self.subroutines[target] = None
+            return None
+        self.subroutines[target] = (effects, mem.fetch_many(effects.start,
+                                                            effects.end - effects.start))
+        return effects
+
+    def invalidate(self, target):
+        """Drops the analysis & the cached calls of the subroutine."""
+        self.subroutines.pop(target, None)
+        for key in [key for key in self.cache if key[0] == target]:
+            del self.cache[key]
+
+    def advance_timers(self, cycles):
+        """Decrements the timers as if the cycles were executed."""
+        vm = self.vm
+        vm.dt = max(vm.dt - cycles, 0)
+        if vm.st > 0:
+            if vm.st <= cycles:
+                vm.display.play_sound()
+            vm.st = max(vm.st - cycles, 0)
+
+    def CALL_MEMO(self):
+        """
+        2nnn - CALL addr (memoized)
+        Call subroutine at nnn, replay the cached effect if it is pure.
+        """
+        vm = self.vm
+        target = self.opcode & 0xfff
+        effects = self._subroutine(target)
+        if effects is None:
+            return self.CALL()
+        if vm.sp == STACK_DEPTH:
+            raise StackOverflowException(vm.pc - 2)
+
+        v = vm.v
+        key = (target, tuple(v[r] for r in effects.registers),
+               vm.i if effects.index else None)
+        cached = self.cache.pop(key, None)
+        if cached is not None:
+            self.cache[key] = cached
+            values, i, cycles = cached
+            for r, value in zip(effects.registers, values):
+                v[r] = value
+            if effects.index:
+                vm.i = i
+            self.advance_timers(cycles)
+            vm.frame_cycles += cycles
+            self.hits += 1
+            return True
+
+        # Executes the body until its RET and caches the effect
+        self.misses += 1
+        sp = vm.sp
+        self.CALL()
+        cycles = 0
+        while vm.sp > sp:
+            if cycles == MAX_BODY_CYCLES:
+                self.subroutines[target] = None
+                vm.frame_cycles += cycles
+                return True
+            vm.cycle()
+            cycles += 1
+        vm.frame_cycles += cycles
+
+        self.cache[key] = (tuple(v[r] for r in effects.registers),
+                           vm.i if effects.index else None, cycles)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return True
@@ -4,6 +4,11 @@
 # Copyright (C) 2018 Mateusz Furga
 # This software is released under the MIT license.
 
+MEMORY_SIZE = 0x1000
+PAGE_SHIFT  = 8
+PAGE_SIZE   = 1 << PAGE_SHIFT
+PAGE_MASK   = PAGE_SIZE - 1
+
 
 class Memory(object):
     """
@@ -18,9 +23,12 @@ class Memory(object):
     and should not be used by programs.
     """
 
-    def __init__(self):
-        """Allocates 4KB (4096 bytes) for program memory."""
-        self._mem = bytearray(0x1000)
+    def __init__(self, data=None):
+        """
+        Allocates 4KB (4096 bytes) for program memory or uses the given
+        4KB buffer (e.g. the view onto the machine state block).
+        """
+        self._mem = bytearray(0x1000) if data is None else data
 
     def store_byte(self, addr, data):
         """Stores 1 byte of data at the given address."""
@@ -61,4 +69,117 @@ class Memory(object):
         """Fetched many bytes of data from the given address."""
         if addr < 0 or addr + lenght - 1 >= len(self._mem):
             raise ValueError  # TODO: Make custom exception
+        return bytearray(self._mem[addr:addr + lenght])
+
+
+def split_pages(data):
+    """Returns the tuple of the pages of the memory image."""
+    return tuple(bytearray(data[addr:addr + PAGE_SIZE]) for addr in range(0, len(data), PAGE_SIZE))
+
+
+class PagedMemory(Memory):
+    """
+    Copy-on-write paged memory.
+
+    The memory is a list of the PAGE_SIZE pages, which are shared with other
+    instances (e.g. the fonts & the ROM image of many VMs, or a snapshot)
+    until the first write into the page copies it. The shared pages are never
+    written. The pages written since the dirty flags were cleared are marked,
+    so the changes can be found without comparing the whole memory.
+    """
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.owned = bytearray(len(self.pages))  # The page is private (writable)
+        self.dirty = bytearray(len(self.pages))
+
+    @property
+    def _mem(self):
+        """Returns the flat copy of the memory (read-only)."""
+        return bytearray().join(self.pages)
+
+    def _writable(self, page):
+        """Returns the page to be written (copied first if it's shared)."""
+        if not self.owned[page]:
+            self.pages[page] = bytearray(self.pages[page])
+            self.owned[page] = 1
+        self.dirty[page] = 1
+        return self.pages[page]
+
+    def store_byte(self, addr, data):
+        """Stores 1 byte of data at the given address."""
+        if addr < 0 or addr >= MEMORY_SIZE:
+            raise ValueError  # TODO: Make custom exception
+        self._writable(addr >> PAGE_SHIFT)[addr & PAGE_MASK] = data & 0xff
+        return True
+
+    def fetch_byte(self, addr):
+        """Fetches 1 byte of data from the given address."""
+        if addr < 0 or addr >= MEMORY_SIZE:
+            raise ValueError  # TODO: Make custom exception
+        return self.pages[addr >> PAGE_SHIFT][addr & PAGE_MASK]
+
+    def store_word(self, addr, data):
+        """Stores word (2 bytes) of data at the given address."""
+        if addr < 0 or addr + 1 >= MEMORY_SIZE:
+            raise ValueError  # TODO: Make custom exception
+        self.store_byte(addr, data >> 8)
+        self.store_byte(addr + 1, data)
+        return True
+
+    def fetch_word(self, addr):
+        """Fetches word (2 bytes) of data from the given address."""
+        if addr < 0 or addr + 1 >= MEMORY_SIZE:
+            raise ValueError  # TODO: Make custom exception
+        page, offset = self.pages[addr >> PAGE_SHIFT], addr & PAGE_MASK
+        if offset != PAGE_MASK:
+            return page[offset] << 8 | page[offset + 1]
+        return page[offset] << 8 | self.pages[(addr >> PAGE_SHIFT) + 1][0]
+
+    def store_many(self, addr, data):
+        """Stores many bytes of data at the given address."""
+        if addr < 0 or addr + len(data) - 1 >= MEMORY_SIZE:
+            raise ValueError  # TODO: Make custom exception
+        data = bytearray(byte & 0xff for byte in data)
+        start = 0
+        while start < len(data):
+            offset = (addr + start) & PAGE_MASK
+            count = min(PAGE_SIZE - offset, len(data) - start)
+            self._writable((addr + start) >> PAGE_SHIFT)[offset:offset + count] = \
+                data[start:start + count]
+            start += count
+        return True
+
+    def fetch_many(self, addr, lenght):
+        """Fetched many bytes of data from the given address."""
+        if addr < 0 or addr + lenght - 1 >= MEMORY_SIZE:
+            raise ValueError  # TODO: Make custom exception
+        page, offset = addr >> PAGE_SHIFT, addr & PAGE_MASK
+        if offset + lenght <= PAGE_SIZE:
+            return bytearray(self.pages[page][offset:offset + lenght])
         return self._mem[addr:addr + lenght]
+
+    def copy(self):
+        """
+        Returns the copy sharing all the pages. The private pages become
+        shared, so they're copied at the next write of either memory.
+        """
+        self.owned = bytearray(len(self.pages))
+        return PagedMemory(self.pages)
+
+    def load(self, other):
+        """Shares the pages of the other memory (the replaced pages are marked dirty)."""
+        for page, (old, new) in enumerate(zip(self.pages, other.pages)):
+            if old is not new:
+                self.pages[page] = new
+                self.dirty[page] = 1
+        self.owned = bytearray(len(self.pages))
+        other.owned = bytearray(len(other.pages))
+
+    def dirty_pages(self):
+        """Returns the indices of the pages written since the flags were cleared."""
+        return [page for page, dirty in enumerate(self.dirty) if dirty]
+
+    def clear_dirty(self):
+        """Clears the dirty flags."""
+        self.dirty = bytearray(len(self.pages))
@@ -0,0 +1,268 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import bisect
+import os
+import threading
+import time
+
+from .swap import Swaps
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+METRICS_INTERVAL = 10.0  # Seconds between the metrics file updates
+
+# Upper bounds of the histogram buckets (seconds).
+TIME_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.0167,
+                0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+COUNTERS = (
+    ('instructions', 'Emulated instructions.'),
+    ('frames',       'Emulated frames.'),
+    ('presents',     'Presented frames.'),
+    ('draws',        'Executed DRW instructions.'),
+    ('clears',       'Executed CLS instructions.'),
+    ('collisions',   'DRW instructions with a sprite collision.'),
+    ('dropped',      'Frames dropped by the emulation or presentation.')
+)
+
+HISTOGRAMS = (
+    ('frame_emulate', 'Time spent emulating a frame.'),
+    ('frame_present', 'Time spent presenting a frame.'),
+    ('input_latency', 'Time from a keypad change to the next present.')
+)
+
+
+class Histogram(object):
+    """Histogram with the fixed buckets (the quantiles are estimated from the buckets)."""
+
+    def __init__(self, bounds=TIME_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Returns the estimated quantile (linear interpolation within the bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                return lower + (self.bounds[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+
+class Metrics(object):
+    """
+    Operational metrics of the VM.
+
+    The runners report the emulated & dropped frames. The DRW / CLS calls,
+    the presents and the keypad changes are counted by the instrumented display
+    and VM methods swapped onto the instances by attach, so the counters cost
+    nothing when the metrics aren't enabled.
+    """
+
+    def __init__(self):
+        for name, _ in COUNTERS:
+            setattr(self, name, 0)
+        for name, _ in HISTOGRAMS:
+            setattr(self, name, Histogram())
+
+        self.started = time.time()
+        self._input_time = None
+        self._swaps = Swaps()
+
+    # Reporting
+
+    def frame(self, cycles, seconds):
+        """Reports the emulated frame."""
+        self.frames += 1
+        self.instructions += cycles
+        self.frame_emulate.observe(seconds)
+
+    def drop(self, frames=1):
+        """Reports the dropped frames."""
+        self.dropped += frames
+
+    def present(self, seconds):
+        """Reports the presented frame."""
+        self.presents += 1
+        self.frame_present.observe(seconds)
+        if self._input_time is not None:
+            self.input_latency.observe(time.time() - self._input_time)
+            self._input_time = None
+
+    def input(self):
+        """Reports the keypad change."""
+        if self._input_time is None:
+            self._input_time = time.time()
+
+    def instructions_per_second(self):
+        """
+        Returns the average instructions per second since the start (the rate
+        over a window is computed by the scraper from the instructions counter).
+        """
+        elapsed = time.time() - self.started
+        return self.instructions / elapsed if elapsed > 0 else 0.0
+
+    # Instrumentation
+
+    def attach(self, vm):
+        """Swaps the counting display & VM methods onto the instances."""
+        display = vm.display
+        self._swaps.swap(display, 'draw_sprite', self._counted_draw(vm))
+        self._swaps.swap(display, 'clear_display', self._counted_clear)
+        if display.canvas is not None:
+            self._swaps.swap(display, 'refresh', self._timed)
+        if display.surface is not None:
+            self._swaps.swap(display, 'present', self._timed)
+        self._swaps.swap(vm, 'handle_events', self._input_events(vm))
+
+    def _counted_draw(self, vm):
+        def wrapper(method):
+            def draw_sprite(point, data):
+                method(point, data)
+                self.draws += 1
+                self.collisions += vm.v[0xf]
+            return draw_sprite
+        return wrapper
+
+    def _counted_clear(self, method):
+        def clear_display():
+            method()
+            self.clears += 1
+        return clear_display
+
+    def _timed(self, method):
+        def present(*args):
+            start = time.time()
+            method(*args)
+            self.present(time.time() - start)
+        return present
+
+    def _input_events(self, vm):
+        def wrapper(method):
+            def handle_events():
+                keys = vm.keys
+                running = method()
+                if vm.keys != keys:
+                    self.input()
+                return running
+            return handle_events
+        return wrapper
+
+    def detach(self):
+        """Restores the original methods."""
+        self._swaps.restore_all()
+
+
+def format_prometheus(metrics):
+    """Returns the metrics in the Prometheus text exposition format."""
+    lines = []
+
+    def metric(name, kind, description, samples):
+        lines.append('# HELP chip8_{} {}'.format(name, description))
+        lines.append('# TYPE chip8_{} {}'.format(name, kind))
+        for suffix, value in samples:
+            lines.append('chip8_{}{} {}'.format(name, suffix, value))
+
+    for name, description in COUNTERS:
+        metric(name + '_total', 'counter', description, [('', getattr(metrics, name))])
+
+    metric('instructions_per_second', 'gauge', 'Emulated instructions per second since the start.',
+           [('', '{:.1f}'.format(metrics.instructions_per_second()))])
+    metric('uptime_seconds', 'gauge', 'Time since the start.',
+           [('', '{:.3f}'.format(time.time() - metrics.started))])
+
+    for name, description in HISTOGRAMS:
+        histogram = getattr(metrics, name)
+        samples, cumulative = [], 0
+        for bound, count in zip(histogram.bounds + ('+Inf',), histogram.counts):
+            cumulative += count
+            samples.append(('_bucket{{le="{}"}}'.format(bound), cumulative))
+        samples.append(('_sum', '{:.6f}'.format(histogram.sum)))
+        samples.append(('_count', histogram.count))
+        metric(name + '_seconds', 'histogram', description, samples)
+
+        metric(name + '_quantile_seconds', 'gauge', description[:-1] + ' (estimated quantiles).',
+               [('{{quantile="{}"}}'.format(q), '{:.6f}'.format(histogram.quantile(q)))
+                for q in QUANTILES])
+
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer(object):
+    """Serves the metrics over HTTP (GET /metrics) on a background thread."""
+
+    def __init__(self, metrics, port, host='127.0.0.1'):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = format_prometheus(metrics).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._thread.join()
+
+
+class MetricsFileWriter(object):
+    """Periodically writes the metrics into the file (replaced atomically)."""
+
+    def __init__(self, metrics, fname, interval=METRICS_INTERVAL):
+        self.metrics = metrics
+        self.fname = fname
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._worker)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self):
+        temporary = self.fname + '.tmp'
+        with open(temporary, 'w') as f:
+            f.write(format_prometheus(self.metrics))
+        os.rename(temporary, self.fname)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.write()
+
+    def _worker(self):
+        while not self._stop.wait(self.interval):
+            self.write()
@@ -0,0 +1,328 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import argparse
+import array
+import random
+import socket
+import struct
+import time
+import zlib
+
+from .chip8 import CYCLES_PER_FRAME, Chip8
+from .quirks import PROFILES
+from .threaded import FRAME_RATE, MAX_FRAME_LAG
+
+NETPLAY_PORT    = 7008
+ROLLBACK_WINDOW = 8     # Frames emulated ahead of the confirmed remote input
+HELLO_TIMEOUT   = 30.0  # Seconds waiting for the peer
+SETTLE_TIMEOUT  = 5.0   # Seconds waiting for the inputs of the last frames
+RESEND_INTERVAL = 0.1   # Seconds between the handshake packets
+
+# Packets: the handshake (the boot state digest, the random generator probe
+# & the cycles per frame), the keypad masks of the consecutive frames
+# (the first frame, the number of the remote frames received & the count)
+# and the quit.
+HELLO  = struct.Struct('>4sIIH')
+INPUTS = struct.Struct('>4sIIB')
+HELLO_MAGIC, INPUTS_MAGIC, BYE_MAGIC = b'C8HI', b'C8IN', b'C8BY'
+MAX_INPUTS = 255  # Masks in the packet
+PACKET_SIZE = INPUTS.size + 2 * MAX_INPUTS
+
+
+class NetplayException(Exception):
+    def __init__(self, message):
+        super(NetplayException, self).__init__('Netplay failed: {}.'.format(message))
+
+
+def boot_digest(vm):
+    """Returns the digest of the machine state & the random generator (the peers must agree)."""
+    probe = random.Random()
+    probe.setstate(vm.random.getstate())
+    state = bytes(bytearray(vm.mem._mem)) + bytes(vm.state.block)
+    return zlib.crc32(state) & 0xffffffff, probe.getrandbits(32)
+
+
+class NetplaySession(object):
+    """
+    Two-player rollback netplay over UDP.
+
+    Both peers run the same program from the same state & seed and exchange
+    the keypad masks of their frames; the program sees both keypads (OR-ed).
+    The frames are emulated without waiting for the remote input, which is
+    predicted to stay as it was. When the received input differs from
+    the prediction, the snapshot taken before the first mispredicted frame
+    is restored and the frames up to the current one are emulated again with
+    the display detached (no drawing, no flips, no sound), followed by one
+    redraw. The snapshots are the state block copies into the ring allocated
+    upfront. A peer doesn't run more than window frames ahead of the remote
+    input it has received, which bounds the rollback (and the snapshot ring).
+    Every packet repeats the local masks the peer hasn't acknowledged yet,
+    so a lost packet is covered by the next one.
+    """
+
+    def __init__(self, vm, sock, peer, cycles_per_frame=CYCLES_PER_FRAME, window=ROLLBACK_WINDOW):
+        self.vm = vm
+        self.sock = sock
+        self.peer = (socket.gethostbyname(peer[0]), peer[1])
+        self.cycles_per_frame = cycles_per_frame
+        self.window = window
+        sock.setblocking(False)
+
+        self.frame = 0                  # Next emulated frame
+        self.local = array.array('H')   # Local masks by the frame
+        self.remote = array.array('H')  # Received remote masks by the frame
+        self.used = array.array('H')    # Remote masks the frames were emulated with
+        self.acked = 0                  # Local frames received by the peer
+        self.quit = False               # The peer has left
+        self._rollback = None           # First mispredicted frame
+
+        self.snapshots = [vm.snapshot() for _ in range(window + 1)]
+        self.random_states = [None] * (window + 1)
+
+        self.rollbacks = 0
+        self.resimulated = 0
+        self.max_rollback = 0.0  # Seconds
+
+    # Protocol
+
+    def _send(self, packet):
+        try:
+            self.sock.sendto(packet, self.peer)
+        except socket.error:
+            pass  # The peer isn't listening yet
+
+    def _receive(self):
+        """Yields the pending packets from the peer."""
+        while True:
+            try:
+                packet, address = self.sock.recvfrom(PACKET_SIZE)
+            except socket.error:
+                return
+            if address == self.peer:
+                yield packet
+
+    def handshake(self, timeout=HELLO_TIMEOUT):
+        """Waits for the peer & checks that both run the same machine."""
+        state, probe = boot_digest(self.vm)
+        hello = HELLO.pack(HELLO_MAGIC, state, probe, self.cycles_per_frame)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self._send(hello)
+            for packet in self._receive():
+                if packet[:4] == INPUTS_MAGIC:
+                    self._inputs(packet)  # The peer has started already
+                    return
+                if packet[:4] != HELLO_MAGIC or len(packet) != HELLO.size:
+                    continue
+                _, remote_state, remote_probe, cycles_per_frame = HELLO.unpack(packet)
+                if (remote_state, remote_probe) != (state, probe):
+                    raise NetplayException('the peer runs another program, state or seed')
+                if cycles_per_frame != self.cycles_per_frame:
+                    raise NetplayException('the peer runs {} cycles per frame'.format(
+                        cycles_per_frame))
+                self._send(hello)
+                return
+            time.sleep(RESEND_INTERVAL)
+        raise NetplayException('no answer from {}:{}'.format(*self.peer))
+
+    def _inputs(self, packet):
+        """Stores the received remote masks & notes the first mispredicted frame."""
+        if len(packet) < INPUTS.size:
+            return
+        _, first, acked, count = INPUTS.unpack_from(packet)
+        if len(packet) != INPUTS.size + 2 * count:
+            return
+        masks = struct.unpack_from('>{}H'.format(count), packet, INPUTS.size)
+        self.acked = max(self.acked, acked)
+        if first > len(self.remote):
+            return  # A gap (the packets were reordered), the next packet repeats it
+        for frame in range(len(self.remote), first + count):
+            mask = masks[frame - first]
+            self.remote.append(mask)
+            if frame < self.frame and self.used[frame] != mask:
+                self._rollback = frame if self._rollback is None else min(self._rollback, frame)
+
+    def poll(self):
+        """Handles the pending packets from the peer."""
+        for packet in self._receive():
+            if packet[:4] == INPUTS_MAGIC:
+                self._inputs(packet)
+            elif packet[:4] == BYE_MAGIC:
+                self.quit = True
+
+    def send(self):
+        """Sends the local masks the peer hasn't received yet."""
+        first = self.acked
+        masks = self.local[first:first + MAX_INPUTS]
+        header = INPUTS.pack(INPUTS_MAGIC, first, len(self.remote), len(masks))
+        self._send(header + struct.pack('>{}H'.format(len(masks)), *masks))
+
+    def close(self):
+        """Tells the peer that the session has ended."""
+        self._send(BYE_MAGIC)
+
+    # Emulation
+
+    def _save(self, frame):
+        slot = frame % len(self.snapshots)
+        self.snapshots[slot].load(self.vm.state)
+        self.random_states[slot] = self.vm.random.getstate()
+
+    def _load(self, frame):
+        slot = frame % len(self.snapshots)
+        self.vm.state.load(self.snapshots[slot])
+        self.vm.load_registers()
+        self.vm.random.setstate(self.random_states[slot])
+        self.vm.frame = frame
+
+    def _remote_keys(self, frame):
+        """Returns the received remote mask of the frame (or the predicted one)."""
+        if frame < len(self.remote):
+            return self.remote[frame]
+        return self.remote[-1] if self.remote else 0
+
+    def _emulate(self, keys):
+        vm, cycle = self.vm, self.vm.cycle
+        vm.keys = keys
+        for _ in range(self.cycles_per_frame):
+            cycle()
+        vm.end_frame()
+
+    def _resimulate(self):
+        """Rolls back to the first mispredicted frame & emulates the frames again headless."""
+        start, self._rollback = self._rollback, None
+        began = time.time()
+        display = self.vm.display
+        canvas, surface = display.canvas, display.surface
+        self._load(start)
+        display.canvas = display.surface = None
+        try:
+            for frame in range(start, self.frame):
+                if frame > start:
+                    self._save(frame)
+                self.used[frame] = self._remote_keys(frame)
+                self._emulate(self.local[frame] | self.used[frame])
+        finally:
+            display.canvas, display.surface = canvas, surface
+        display.dirty = True
+        display.redraw()
+
+        self.rollbacks += 1
+        self.resimulated += self.frame - start
+        self.max_rollback = max(self.max_rollback, time.time() - began)
+
+    def advance(self, keys):
+        """
+        Emulates the next frame with the local keypad mask. Returns False
+        (and emulates nothing) while the session is window frames ahead of
+        the remote input.
+        """
+        self.poll()
+        if self._rollback is not None:
+            self._resimulate()
+        if self.frame - len(self.remote) >= self.window:
+            self.send()
+            return False
+
+        self.local.append(keys)
+        self._save(self.frame)
+        self.used.append(self._remote_keys(self.frame))
+        self._emulate(keys | self.used[self.frame])
+        self.frame += 1
+        self.send()
+        return True
+
+    def settle(self, timeout=SETTLE_TIMEOUT):
+        """
+        Exchanges the inputs of the emulated frames until both peers have
+        all of them & corrects the last frames. Returns False on the timeout.
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.poll()
+            self.send()
+            if len(self.remote) >= self.frame and self.acked >= self.frame:
+                if self._rollback is not None:
+                    self._resimulate()
+                return True
+            time.sleep(0.001)
+        return False
+
+    def run(self, frame_rate=FRAME_RATE):
+        """Plays with the local keyboard until either of the players quits."""
+        vm = self.vm
+        period = 1.0 / frame_rate
+        deadline = time.time()
+        keys = 0
+        try:
+            while not self.quit:
+                vm.keys = keys  # Only the local keys are updated by the input handling
+                if not vm.handle_events():
+                    break
+                keys = vm.keys
+                self.advance(keys)
+
+                deadline += period
+                delay = deadline - time.time()
+                if delay > 0:
+                    vm.sleep(delay)
+                elif -delay > MAX_FRAME_LAG * period:
+                    deadline = time.time()
+        finally:
+            self.close()
+
+    def report(self):
+        """Returns the line with the rollback statistics."""
+        return '{} frames, {} rollbacks, {} frames emulated again, max rollback {:.2f}ms'.format(
+            self.frame, self.rollbacks, self.resimulated, self.max_rollback * 1000)
+
+
+def address(value):
+    """Parses the HOST:PORT address."""
+    host, _, port = value.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        'python -m chip8.netplay',
+        description='CHIP-8 two-player rollback netplay',
+        formatter_class=lambda prog: argparse.HelpFormatter(
+            prog, max_help_position=100, width=150))
+
+    parser.add_argument('program', help='CHIP-8 ROM')
+
+    parser.add_argument('peer', type=address, help='Specify the peer address (HOST:PORT)')
+
+    parser.add_argument('-p', '--port', type=int, default=NETPLAY_PORT,
+                        help='Specify the local UDP port (default={})'.format(NETPLAY_PORT))
+
+    parser.add_argument('-s', '--scale', type=int, default=10,
+                        help='Specify scale for width & height (default=10)')
+
+    parser.add_argument('-c', '--cycles-per-frame', type=int, default=CYCLES_PER_FRAME,
+                        help='Specify cycles per frame (default={})'.format(CYCLES_PER_FRAME))
+
+    parser.add_argument('-w', '--window', type=int, default=ROLLBACK_WINDOW,
+                        help='Specify frames emulated ahead of the remote input (default={})'.format(
+                            ROLLBACK_WINDOW))
+
+    parser.add_argument('-q', '--quirks', choices=sorted(PROFILES),
+                        help='Specify the quirk profile (default=chosen by the ROM extension)')
+
+    parser.add_argument('-r', '--seed', type=int, default=0,
+                        help='Specify the random seed, the same for both peers (default=0)')
+
+    args = parser.parse_args()
+
+    vm = Chip8.load_program_from_file(args.program, args.scale, args.quirks, seed=args.seed)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('', args.port))
+    session = NetplaySession(vm, sock, args.peer, args.cycles_per_frame, args.window)
+    session.handshake()
+    session.run()
+    print(session.report())
@@ -4,10 +4,8 @@
 # Copyright (C) 2018 Mateusz Furga
 # This software is released under the MIT license.
 
-import pygame
-import random
-
-from display import KEY_MAP
+from .display import KEY_MAP
+from .state import STACK_DEPTH
 
 
 class InvalidOpcodeException(Exception):
@@ -16,6 +14,18 @@ class InvalidOpcodeException(Exception):
             '{:04X} opcode not found.'.format(opcode))
 
 
+class StackOverflowException(Exception):
+    def __init__(self, pc):
+        super(StackOverflowException, self).__init__(
+            'Stack overflow at {:03X}.'.format(pc))
+
+
+class StackUnderflowException(Exception):
+    def __init__(self, pc):
+        super(StackUnderflowException, self).__init__(
+            'Stack underflow at {:03X}.'.format(pc))
+
+
 class Opcode(object):
     """
     CHIP-8 instuctions class.
@@ -57,6 +67,24 @@ class Opcode(object):
             0x33: self.LDB,  0x55: self.LDIR, 0x65: self.LDRI
         }
 
+        self.apply_quirks(vm.quirks)
+
+    def apply_quirks(self, quirks):
+        """
+        Replaces the instructions in the dispatch tables with their variant
+        specific versions, so the quirks cost nothing during the execution.
+        """
+        if quirks.shift_vy:
+            self.bitwise_instruction_set.update({0x6: self.SHR_VY, 0xE: self.SHL_VY})
+        if quirks.vf_reset:
+            self.bitwise_instruction_set.update({
+                0x1: self.OR_VF_RESET, 0x2: self.AND_VF_RESET, 0x3: self.XOR_VF_RESET
+            })
+        if quirks.load_store_i:
+            self.misc_instruction_set.update({0x55: self.LDIR_I, 0x65: self.LDRI_I})
+        if quirks.jump_vx:
+            self.opcodes[0xB] = self.JMPR_VX
+
     def instruction_lookup(self, opcode):
         """Performs instruction using the most significant nibble."""
         self.opcode = opcode
@@ -89,7 +117,7 @@ class Opcode(object):
             self.vm.dt -= 1
         if self.vm.st > 0:
             self.vm.st -= 1
-            pygame.mixer.music.play(0) if self.vm.st == 0 else None
+            self.vm.display.play_sound() if self.vm.st == 0 else None
 
     def CLS(self):
         """
@@ -107,8 +135,10 @@ class Opcode(object):
         The interpreter sets the program counter to the address
         at the top of the stack, then subtracts 1 from the stack pointer.
         """
-        self.vm.sp -= 2
-        self.vm.pc = self.vm.mem.fetch_word(self.vm.sp)
+        if self.vm.sp == 0:
+            raise StackUnderflowException(self.vm.pc - 2)
+        self.vm.sp -= 1
+        self.vm.pc = self.vm.stack[self.vm.sp]
         return True
 
     def JMP(self):
@@ -129,8 +159,10 @@ class Opcode(object):
         The interpreter increments the stack pointer, then puts the current
         PC on the top of the stack. The PC is then set to nnn.
         """
-        self.vm.mem.store_word(self.vm.sp, self.vm.pc)
-        self.vm.sp += 2
+        if self.vm.sp == STACK_DEPTH:
+            raise StackOverflowException(self.vm.pc - 2)
+        self.vm.stack[self.vm.sp] = self.vm.pc
+        self.vm.sp += 1
         self.vm.pc = self.opcode & 0xfff
         return True
 
@@ -380,7 +412,7 @@ class Opcode(object):
         ANDed with the value kk. The results are stored in Vx.
         """
         vx = (self.opcode >> 8) & 0xf
-        self.vm.v[vx] = random.randint(0, 0xff) & self.opcode & 0xff
+        self.vm.v[vx] = self.vm.random.randint(0, 0xff) & self.opcode & 0xff
         return True
 
     def DRW(self):
@@ -414,14 +446,14 @@ class Opcode(object):
         is currently in the down position, PC is increased by 2.
         """
         vx = (self.opcode >> 8) & 0xf
-        key = pygame.key.get_pressed()
+        pressed = self.vm.keys >> (self.vm.v[vx] & 0xf) & 1
 
         if self.opcode & 0xff == 0x9E:
-            if key[KEY_MAP[self.vm.v[vx]]]:
+            if pressed:
                 self.vm.pc += 2
 
         elif self.opcode & 0xff == 0xA1:
-            if not key[KEY_MAP[self.vm.v[vx]]]:
+            if not pressed:
                 self.vm.pc += 2
         return True
 
@@ -442,16 +474,19 @@ class Opcode(object):
         Wait for a key press, store the value of the key in Vx.
 
         All execution stops until a key is pressed, then the value of that
-        key is stored in Vx.
+        key is stored in Vx. The instruction is repeated as long as no key is
+        pressed, so the keypad state can still be updated in the meantime.
         """
         vx = (self.opcode >> 8) & 0xf
 
-        while True:
-            event = pygame.event.wait()
-            if event.type == pygame.KEYDOWN:
-                if event.key in KEY_MAP.values():
-                    self.vm.v[vx] = KEY_MAP.values().index(event.key)
-                    break
+        if not self.vm.keys:
+            self.vm.pc -= 2
+            return True
+
+        for key in sorted(KEY_MAP):
+            if self.vm.keys >> key & 1:
+                self.vm.v[vx] = key
+                break
         return True
 
     def LDDT(self):
@@ -509,8 +544,8 @@ class Opcode(object):
         and the ones digit at location I+2.
         """
         vx = (self.opcode >> 8) & 0xf
-        self.vm.mem.store_byte(self.vm.i, self.vm.v[vx] / 100)
-        self.vm.mem.store_byte(self.vm.i + 1, (self.vm.v[vx] / 10) % 10)
+        self.vm.mem.store_byte(self.vm.i, self.vm.v[vx] // 100)
+        self.vm.mem.store_byte(self.vm.i + 1, (self.vm.v[vx] // 10) % 10)
         self.vm.mem.store_byte(self.vm.i + 2, self.vm.v[vx] % 10)
         return True
 
@@ -539,3 +574,91 @@ class Opcode(object):
         for i, v in enumerate(data):
             self.vm.v[i] = v
         return True
+
+    def SHR_VY(self):
+        """
+        8xy6 - SHR Vx, Vy (shift_vy quirk)
+        Set Vx = Vy SHR 1.
+
+        If the least-significant bit of Vy is 1, then VF is set to 1,
+        otherwise 0. Then Vy divided by 2 is stored in Vx.
+        """
+        vx = (self.opcode >> 8) & 0xf
+        vy = (self.opcode >> 4) & 0xf
+
+        flag = self.vm.v[vy] & 0b1
+        self.vm.v[vx] = self.vm.v[vy] >> 1
+        self.vm.v[0xf] = flag
+        return True
+
+    def SHL_VY(self):
+        """
+        8xyE - SHL Vx, Vy (shift_vy quirk)
+        Set Vx = Vy SHL 1.
+
+        If the most-significant bit of Vy is 1, then VF is set to 1,
+        otherwise to 0. Then Vy multiplied by 2 is stored in Vx.
+        """
+        vx = (self.opcode >> 8) & 0xf
+        vy = (self.opcode >> 4) & 0xf
+
+        flag = self.vm.v[vy] >> 7
+        self.vm.v[vx] = (self.vm.v[vy] << 1) & 0xff
+        self.vm.v[0xf] = flag
+        return True
+
+    def OR_VF_RESET(self):
+        """
+        8xy1 - OR Vx, Vy (vf_reset quirk)
+        Set Vx = Vx OR Vy, set VF = 0.
+        """
+        self.OR()
+        self.vm.v[0xf] = 0
+        return True
+
+    def AND_VF_RESET(self):
+        """
+        8xy2 - AND Vx, Vy (vf_reset quirk)
+        Set Vx = Vx AND Vy, set VF = 0.
+        """
+        self.AND()
+        self.vm.v[0xf] = 0
+        return True
+
+    def XOR_VF_RESET(self):
+        """
+        8xy3 - XOR Vx, Vy (vf_reset quirk)
+        Set Vx = Vx XOR Vy, set VF = 0.
+        """
+        self.XOR()
+        self.vm.v[0xf] = 0
+        return True
+
+    def JMPR_VX(self):
+        """
+        Bxnn - JP Vx, addr (jump_vx quirk)
+        Jump to location xnn + Vx.
+        """
+        vx = (self.opcode >> 8) & 0xf
+        self.vm.pc = (self.vm.v[vx] + self.opcode) & 0xfff
+        return True
+
+    def LDIR_I(self):
+        """
+        Fx55 - LD [I], Vx (load_store_i quirk)
+        Store registers V0 through Vx in memory starting at location I,
+        set I = I + x + 1.
+        """
+        self.LDIR()
+        self.vm.i = (self.vm.i + ((self.opcode >> 8) & 0xf) + 1) & 0xffff
+        return True
+
+    def LDRI_I(self):
+        """
+        Fx65 - LD Vx, [I] (load_store_i quirk)
+        Read registers V0 through Vx from memory starting at location I,
+        set I = I + x + 1.
+        """
+        self.LDRI()
+        self.vm.i = (self.vm.i + ((self.opcode >> 8) & 0xf) + 1) & 0xffff
+        return True
@@ -0,0 +1,75 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import collections
+
+from .catalog import rom_hash
+from .chip8 import Chip8
+from .quirks import DEFAULT_PROFILE, PROFILES, profile_for_filename
+
+POOL_SIZE = 8  # Prepared ROMs
+
+# The program, its quirks, memory image & boot state.
+Cartridge = collections.namedtuple('Cartridge', 'data quirks image state')
+
+
+class RomPool(object):
+    """
+    ROMs prepared for the fast switching of the running VM.
+
+    Preparing a ROM (e.g. the ones next to the selected one in a menu) reads
+    it and builds its memory image & boot state upfront, so launching it is
+    the in-place reset of the running VM (a single copy of the state block),
+    which keeps its window, mixer & engine. The least recently used ROMs
+    are dropped when the pool is full.
+    """
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self.cartridges = collections.OrderedDict()  # (ROM hash, quirk profile): Cartridge
+
+    def __len__(self):
+        return len(self.cartridges)
+
+    def __contains__(self, key):
+        return key in self.cartridges
+
+    def _touch(self, key):
+        """Marks the ROM as the most recently used one."""
+        self.cartridges[key] = self.cartridges.pop(key)
+        return self.cartridges[key]
+
+    def prepare(self, data, quirks=DEFAULT_PROFILE):
+        """
+        Prepares the ROM with the quirk profile. Returns the key of the
+        cartridge (the ROM hash & the profile).
+        """
+        data = bytearray(data)
+        key = (rom_hash(data), quirks)
+        if key in self.cartridges:
+            self._touch(key)
+            return key
+
+        image = Chip8.memory_image(data)
+        self.cartridges[key] = Cartridge(data, PROFILES[quirks], image, Chip8.boot_state(image))
+        while len(self.cartridges) > self.size:
+            self.cartridges.popitem(last=False)
+        return key
+
+    def prepare_file(self, fname, quirks=None):
+        """
+        Prepares the ROM file (the quirk profile defaults to the one matching
+        the file extension). Returns the key of the cartridge.
+        """
+        with open(fname, 'rb') as f:
+            data = f.read()
+        return self.prepare(data, quirks or profile_for_filename(fname))
+
+    def launch(self, vm, key):
+        """Switches the VM to the prepared ROM."""
+        cartridge = self._touch(key)
+        state = Chip8.boot_state(cartridge.image, paged=True) if vm.state.paged else cartridge.state
+        vm.load_rom(cartridge.data, cartridge.quirks, state)
@@ -0,0 +1,47 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import collections
+import os
+
+# Behaviour differences between the CHIP-8 variants.
+#
+# shift_vy     - 8xy6/8xyE shift Vy (instead of Vx) and store the result in Vx,
+# load_store_i - Fx55/Fx65 leave I incremented by x + 1,
+# jump_vx      - Bxnn jumps to xnn + Vx (instead of nnn + V0),
+# vf_reset     - 8xy1/8xy2/8xy3 reset VF to 0,
+# clip_sprites - sprites are clipped at the screen edges instead of wrapping.
+Quirks = collections.namedtuple(
+    'Quirks', 'shift_vy load_store_i jump_vx vf_reset clip_sprites')
+
+PROFILES = {
+    # The original behaviour of this interpreter.
+    'chip8':  Quirks(shift_vy=False, load_store_i=False, jump_vx=False,
+                     vf_reset=False, clip_sprites=False),
+
+    'vip':    Quirks(shift_vy=True, load_store_i=True, jump_vx=False,
+                     vf_reset=True, clip_sprites=True),
+
+    'schip':  Quirks(shift_vy=False, load_store_i=False, jump_vx=True,
+                     vf_reset=False, clip_sprites=True),
+
+    'xochip': Quirks(shift_vy=True, load_store_i=True, jump_vx=False,
+                     vf_reset=False, clip_sprites=False)
+}
+
+DEFAULT_PROFILE = 'chip8'
+
+# ROM file extensions used for the variant specific programs.
+EXTENSION_PROFILES = {
+    '.sc8': 'schip',
+    '.xo8': 'xochip'
+}
+
+
+def profile_for_filename(fname):
+    """Returns the name of the quirk profile for the ROM file name."""
+    extension = os.path.splitext(fname)[1].lower()
+    return EXTENSION_PROFILES.get(extension, DEFAULT_PROFILE)
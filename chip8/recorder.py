@@ -0,0 +1,333 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import collections
+import os
+import struct
+import threading
+import zlib
+
+from .halt import idle_loop
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+FRAME_RATE   = 60
+RECORD_SCALE = 4
+
+REPLAY_MAGIC = 'chip8-replay 1'
+
+# Frame pixels (0/1) to the 8-bit luma.
+LUMA = bytearray([0, 255]) + bytearray(254)
+
+Replay = collections.namedtuple('Replay', 'rom quirks seed cycles_per_frame inputs frames')
+
+
+class ReplayFormatException(Exception):
+    def __init__(self, message):
+        super(ReplayFormatException, self).__init__(
+            'Invalid replay file: {}.'.format(message))
+
+
+def scale_rows(pixels, width, height, scale):
+    """Returns the rows of the nearest neighbour scaled frame (the 8-bit luma)."""
+    pixels = pixels.translate(LUMA)
+    rows = []
+    for y in range(height):
+        row = bytearray(width * scale)
+        for offset in range(scale):
+            row[offset::scale] = pixels[y * width:(y + 1) * width]
+        rows.extend([row] * scale)
+    return rows
+
+
+def lzw_compress(indices, min_code_size):
+    """Returns the GIF LZW compressed colour indices."""
+    clear = 1 << min_code_size
+    out = bytearray()
+    bits = [0, 0]  # Bit buffer & its length
+
+    def emit(code, size):
+        bits[0] |= code << bits[1]
+        bits[1] += size
+        while bits[1] >= 8:
+            out.append(bits[0] & 0xff)
+            bits[0] >>= 8
+            bits[1] -= 8
+
+    table, code_size, next_code = {}, min_code_size + 1, clear + 2
+    emit(clear, code_size)
+    prefix = indices[0]
+
+    for index in indices[1:]:
+        key = prefix << 8 | index
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+
+        emit(prefix, code_size)
+        if next_code < 0x1000:
+            table[key] = next_code
+            if next_code == 1 << code_size:
+                code_size += 1
+            next_code += 1
+        else:
+            emit(clear, code_size)
+            table, code_size, next_code = {}, min_code_size + 1, clear + 2
+        prefix = index
+
+    emit(prefix, code_size)
+    emit(clear + 1, code_size)
+    if bits[1]:
+        out.append(bits[0] & 0xff)
+    return out
+
+
+class GifEncoder(object):
+    """Animated GIF encoder (2 colour palette, LZW compressed frames)."""
+
+    MIN_CODE_SIZE = 2
+
+    def __init__(self, f, width, height, frame_rate):
+        self.f = f
+        self.width, self.height = width, height
+        self.frame_rate = frame_rate
+        self.time = 0  # Frames written so far
+
+        f.write(b'GIF89a' + struct.pack('<HHBBB', width, height, 0x80, 0, 0))
+        f.write(b'\x00\x00\x00\xff\xff\xff')
+        f.write(b'\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00')  # Loop forever
+
+    def write(self, rows, frames):
+        # The delays are in centiseconds, rounded without accumulating the error
+        start = self.time * 100 // self.frame_rate
+        self.time += frames
+        delay = min(self.time * 100 // self.frame_rate - start, 0xffff)
+
+        self.f.write(b'\x21\xf9\x04\x00' + struct.pack('<H', delay) + b'\x00\x00')
+        self.f.write(b'\x2c' + struct.pack('<HHHHB', 0, 0, self.width, self.height, 0))
+        self.f.write(bytearray([self.MIN_CODE_SIZE]))
+
+        data = lzw_compress(bytearray(1 if p else 0 for row in rows for p in row),
+                            self.MIN_CODE_SIZE)
+        for offset in range(0, len(data), 255):
+            block = data[offset:offset + 255]
+            self.f.write(bytearray([len(block)]) + block)
+        self.f.write(b'\x00')
+
+    def close(self):
+        self.f.write(b'\x3b')
+
+
+class ApngEncoder(object):
+    """Animated PNG encoder (8-bit grayscale, the frame count is patched on close)."""
+
+    def __init__(self, f, width, height, frame_rate):
+        self.f = f
+        self.width, self.height = width, height
+        self.frame_rate = frame_rate
+        self.frames = 0
+        self.sequence = 0
+
+        f.write(b'\x89PNG\r\n\x1a\n')
+        self.chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+        self._actl = f.tell()
+        self.chunk(b'acTL', struct.pack('>II', 0, 0))
+
+    def chunk(self, kind, data):
+        self.f.write(struct.pack('>I', len(data)) + kind + data)
+        self.f.write(struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    def write(self, rows, frames):
+        self.chunk(b'fcTL', struct.pack('>IIIIIHHBB', self.sequence, self.width, self.height,
+                                        0, 0, min(frames, 0xffff), self.frame_rate, 0, 0))
+        self.sequence += 1
+
+        data = zlib.compress(b''.join(b'\x00' + bytes(row) for row in rows))
+        if self.frames == 0:
+            self.chunk(b'IDAT', data)
+        else:
+            self.chunk(b'fdAT', struct.pack('>I', self.sequence) + data)
+            self.sequence += 1
+        self.frames += 1
+
+    def close(self):
+        self.chunk(b'IEND', b'')
+        self.f.seek(self._actl)
+        self.chunk(b'acTL', struct.pack('>II', self.frames, 0))
+
+
+class Y4mEncoder(object):
+    """YUV4MPEG2 (monochrome) encoder, the repeated frames are written out."""
+
+    def __init__(self, f, width, height, frame_rate):
+        self.f = f
+        f.write('YUV4MPEG2 W{} H{} F{}:1 Ip A1:1 Cmono\n'.format(
+            width, height, frame_rate).encode('ascii'))
+
+    def write(self, rows, frames):
+        frame = b'FRAME\n' + b''.join(bytes(row) for row in rows)
+        for _ in range(frames):
+            self.f.write(frame)
+
+    def close(self):
+        pass
+
+
+ENCODERS = {
+    '.gif':  GifEncoder,
+    '.apng': ApngEncoder,
+    '.png':  ApngEncoder,
+    '.y4m':  Y4mEncoder
+}
+
+
+class Recorder(object):
+    """
+    Records the emulated frames into the video file.
+
+    At the end of every frame the framebuffer is copied and compared with
+    the previous one; the identical frames only extend the duration of the
+    previous frame. The distinct frames are scaled & encoded by the background
+    thread through the unbounded queue, so the emulation never waits for
+    the encoder.
+    """
+
+    def __init__(self, vm, fname, scale=RECORD_SCALE, frame_rate=FRAME_RATE):
+        extension = os.path.splitext(fname)[1].lower()
+        if extension not in ENCODERS:
+            raise ValueError('Unsupported video format: {}'.format(extension))
+
+        self.vm = vm
+        self.scale = scale
+        self.width, self.height = vm.display.width, vm.display.height
+
+        self._file = open(fname, 'wb')
+        self._encoder = ENCODERS[extension](
+            self._file, self.width * scale, self.height * scale, frame_rate)
+        self._last = None
+        self._frames = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def attach(self):
+        self.vm.frame_listeners.append(self.capture)
+
+    def detach(self):
+        self.vm.frame_listeners.remove(self.capture)
+
+    def capture(self):
+        """Frame listener, copies the framebuffer (unless unchanged)."""
+        pixels = bytearray(self.vm.display.pixels)
+        if pixels == self._last:
+            self._frames += 1
+            return
+        if self._last is not None:
+            self._queue.put((self._last, self._frames))
+        self._last, self._frames = pixels, 1
+
+    def close(self):
+        """Encodes the pending frames and waits for the encoder to finish."""
+        if self._last is not None:
+            self._queue.put((self._last, self._frames))
+            self._last = None
+        self._queue.put(None)
+        self._thread.join()
+        self._encoder.close()
+        self._file.close()
+
+    def _worker(self):
+        """Scales and encodes the frames in the background."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            pixels, frames = item
+            self._encoder.write(scale_rows(pixels, self.width, self.height, self.scale), frames)
+
+
+class InputRecorder(object):
+    """
+    Records the keypad input for the offline replay.
+
+    The keypad mask is sampled at the end of every frame and stored when it
+    has changed. Together with the ROM hash, quirk profile, random seed and
+    cycles per frame it's enough to replay the session deterministically.
+    """
+
+    def __init__(self, vm, fname, rom, quirks, seed, cycles_per_frame):
+        self.vm = vm
+        self.frame = 0
+        self._keys = 0
+        self._file = open(fname, 'w')
+        self._file.write('{}\nrom {}\nquirks {}\nseed {}\ncycles-per-frame {}\n'.format(
+            REPLAY_MAGIC, rom, quirks, seed, cycles_per_frame))
+
+    def attach(self):
+        self.vm.frame_listeners.append(self.capture)
+
+    def detach(self):
+        self.vm.frame_listeners.remove(self.capture)
+
+    def capture(self):
+        """Frame listener, stores the keypad mask used during the frame."""
+        if self.vm.keys != self._keys:
+            self._keys = self.vm.keys
+            self._file.write('{} {:04X}\n'.format(self.frame, self._keys))
+        self.frame += 1
+
+    def close(self):
+        self._file.write('end {}\n'.format(self.frame))
+        self._file.close()
+
+
+def load_replay(fname):
+    """Reads the replay file."""
+    with open(fname) as f:
+        lines = f.read().splitlines()
+    if not lines or lines[0] != REPLAY_MAGIC:
+        raise ReplayFormatException('bad magic')
+
+    settings, inputs, frames = {}, {}, None
+    try:
+        for line in lines[1:]:
+            key, value = line.split()
+            if key == 'end':
+                frames = int(value)
+            elif key.isdigit():
+                inputs[int(key)] = int(value, 16)
+            else:
+                settings[key] = value
+        return Replay(settings['rom'], settings['quirks'], int(settings['seed']),
+                      int(settings['cycles-per-frame']), inputs, frames)
+    except (KeyError, ValueError) as e:
+        raise ReplayFormatException('bad line ({})'.format(e))
+
+
+def play_replay(vm, replay):
+    """
+    Runs the VM through the replay as fast as possible. Stops early when
+    the program halts after the last input.
+    Returns the number of the emulated frames.
+    """
+    if replay.frames is None:
+        raise ReplayFormatException('missing end')
+    inputs = replay.inputs
+    last_input = max(inputs) if inputs else -1
+    vm.cycles_per_frame = replay.cycles_per_frame
+    for frame in range(replay.frames):
+        if frame in inputs:
+            vm.keys = inputs[frame]
+        elif frame > last_input and idle_loop(vm) is not None:
+            return frame
+        vm.run_until(frame=vm.frame + 1)
+    return replay.frames
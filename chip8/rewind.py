@@ -0,0 +1,174 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import struct
+
+from .state import MachineState
+
+FRAME_RATE        = 60
+REWIND_SECONDS    = 10
+KEYFRAME_INTERVAL = 60   # Frames per keyframe
+DELTA_BUDGET      = 256  # Average delta bytes per frame
+
+# The state block is compared by regions, then by pages within the changed regions.
+REGION_SIZE = 512
+PAGE_SIZE   = 64
+
+SPAN = struct.Struct('<HH')  # offset, length
+
+
+def xor(a, b):
+    return bytearray(x ^ y for x, y in zip(a, b))
+
+
+def encode_delta(old, new, out, offset, limit):
+    """
+    Writes the XOR spans of the changed bytes of the blocks into the out
+    buffer (the unchanged pages & the unchanged bytes at the page edges are
+    skipped). Returns the end offset or None if the delta exceeds the limit.
+    """
+    size = len(new)
+    for region in range(0, size, REGION_SIZE):
+        region_end = min(region + REGION_SIZE, size)
+        if old[region:region_end] == new[region:region_end]:
+            continue
+
+        for page in range(region, region_end, PAGE_SIZE):
+            page_end = min(page + PAGE_SIZE, region_end)
+            if old[page:page_end] == new[page:page_end]:
+                continue
+
+            first, last = page, page_end - 1
+            while old[first] == new[first]:
+                first += 1
+            while old[last] == new[last]:
+                last -= 1
+            length = last - first + 1
+
+            if offset + SPAN.size + length > limit:
+                return None
+            SPAN.pack_into(out, offset, first, length)
+            offset += SPAN.size
+            out[offset:offset + length] = xor(old[first:last + 1], new[first:last + 1])
+            offset += length
+    return offset
+
+
+def apply_delta(block, data, offset, end):
+    """XORs the delta spans of the data[offset:end] into the block."""
+    while offset < end:
+        first, length = SPAN.unpack_from(data, offset)
+        offset += SPAN.size
+        block[first:first + length] = xor(block[first:first + length],
+                                          data[offset:offset + length])
+        offset += length
+
+
+class Rewind(object):
+    """
+    Rewind buffer of the recent machine states.
+
+    The frames are kept in the ring of the groups: every group starts with
+    a full keyframe followed by up to keyframe_interval - 1 XOR deltas between
+    the consecutive frames, stored in the group's fixed delta arena (a group
+    which runs out of its arena ends early). All the buffers are allocated
+    upfront, so the memory use is fixed; the oldest group is overwritten
+    when the ring is full.
+
+    Stepping back XORs the newest delta into the current state. The random
+    generator state isn't a part of the machine state, so it isn't rewound.
+    """
+
+    def __init__(self, vm, seconds=REWIND_SECONDS, frame_rate=FRAME_RATE,
+                 keyframe_interval=KEYFRAME_INTERVAL, delta_budget=DELTA_BUDGET):
+        if vm.state.paged:
+            raise ValueError('The paged memory is not in the state block')
+        self.vm = vm
+        self.block = vm.state.block
+        self.keyframe_interval = keyframe_interval
+        self.groups = -(-seconds * frame_rate // keyframe_interval) + 1
+
+        size = len(self.block)
+        self.arena_size = keyframe_interval * delta_budget
+        self.keyframes = [bytearray(size) for _ in range(self.groups)]
+        self.arenas = [bytearray(self.arena_size) for _ in range(self.groups)]
+        self.ends = [[0] * keyframe_interval for _ in range(self.groups)]
+        self.lengths = [0] * self.groups
+
+        self.newest = -1
+        self.count = 0   # Groups in the ring
+        self.frames = 0  # Frames in the ring
+
+        # The newest captured state
+        self.current = MachineState(bytearray(size))
+
+    @property
+    def memory_size(self):
+        """Returns the bytes used by the buffers."""
+        return self.groups * (len(self.block) + self.arena_size) + len(self.block)
+
+    def attach(self):
+        self.vm.frame_listeners.append(self.capture)
+
+    def detach(self):
+        self.vm.frame_listeners.remove(self.capture)
+
+    def _start_group(self):
+        self.newest = (self.newest + 1) % self.groups
+        if self.count == self.groups:
+            self.frames -= self.lengths[self.newest]
+        else:
+            self.count += 1
+        self.keyframes[self.newest][:] = self.block
+        self.lengths[self.newest] = 1
+        self.frames += 1
+
+    def capture(self):
+        """Frame listener, stores the current state as the newest frame."""
+        self.vm.store_registers()
+        group, current = self.newest, self.current.block
+        length = self.lengths[group] if self.count else 0
+
+        if 0 < length < self.keyframe_interval:
+            ends = self.ends[group]
+            end = encode_delta(current, self.block, self.arenas[group],
+                               ends[length - 1], self.arena_size)
+            if end is not None:
+                ends[length] = end
+                self.lengths[group] += 1
+                self.frames += 1
+                current[:] = self.block
+                return
+
+        self._start_group()
+        current[:] = self.block
+
+    def step_back(self):
+        """
+        Restores the previous frame (the newest one is dropped).
+        Returns False when there is no older frame.
+        """
+        if self.frames < 2:
+            return False
+
+        group, current = self.newest, self.current.block
+        length = self.lengths[group]
+        if length > 1:
+            ends = self.ends[group]
+            apply_delta(current, self.arenas[group], ends[length - 2], ends[length - 1])
+            self.lengths[group] -= 1
+        else:
+            # The previous group's last frame is rebuilt from its keyframe
+            self.count -= 1
+            group = self.newest = (group - 1) % self.groups
+            ends = self.ends[group]
+            current[:] = self.keyframes[group]
+            for index in range(1, self.lengths[group]):
+                apply_delta(current, self.arenas[group], ends[index - 1], ends[index])
+
+        self.frames -= 1
+        self.vm.restore(self.current)
+        return True
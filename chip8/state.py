@@ -0,0 +1,90 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import ctypes
+
+from .memory import PagedMemory
+
+MEMORY_SIZE      = 0x1000
+REGISTERS_COUNT  = 0x10
+STACK_DEPTH      = 0x10
+FRAMEBUFFER_SIZE = 64 * 32  # One byte per pixel
+
+# Fields of the state other than the memory.
+REGISTER_FIELDS = [
+    ('v',           ctypes.c_ubyte * REGISTERS_COUNT),
+    ('stack',       ctypes.c_uint16 * STACK_DEPTH),
+    ('i',           ctypes.c_uint16),
+    ('pc',          ctypes.c_uint16),
+    ('sp',          ctypes.c_uint8),
+    ('dt',          ctypes.c_uint8),
+    ('st',          ctypes.c_uint8),
+    ('framebuffer', ctypes.c_ubyte * FRAMEBUFFER_SIZE)
+]
+
+
+class Layout(ctypes.Structure):
+    """Layout of the machine state block."""
+    _fields_ = [('memory', ctypes.c_ubyte * MEMORY_SIZE)] + REGISTER_FIELDS
+
+
+class PagedLayout(ctypes.Structure):
+    """Layout of the paged machine state block (the memory is kept in the pages)."""
+    _fields_ = REGISTER_FIELDS
+
+
+STATE_SIZE = ctypes.sizeof(Layout)
+PAGED_STATE_SIZE = ctypes.sizeof(PagedLayout)
+
+# The memoryview items are the integers on Python 3 only (strings on Python 2).
+INTEGER_VIEWS = isinstance(memoryview(bytearray(1))[0], int)
+
+
+def byte_view(block, offset, size):
+    """
+    Returns the view onto the bytes of the block (the memoryview, on Python 2
+    the ctypes array which is slower to index).
+    """
+    if INTEGER_VIEWS:
+        return memoryview(block)[offset:offset + size]
+    return (ctypes.c_ubyte * size).from_buffer(block, offset)
+
+
+class MachineState(object):
+    """
+    CHIP-8 machine state.
+
+    All the emulated state (memory, registers, stack & framebuffer) lives in
+    one contiguous bytearray. The attributes are views onto the block (the byte
+    views are the memoryviews, the registers & the stack the ctypes fields),
+    so copying & restoring the whole state is a single memcpy. The paged
+    state keeps the memory in the PagedMemory instead, whose copy shares
+    the pages, so only the registers & the framebuffer are copied.
+    """
+    __slots__ = ('block', 'registers', 'memory', 'v', 'stack', 'framebuffer')
+
+    def __init__(self, block=None, memory=None):
+        layout = Layout if memory is None else PagedLayout
+        self.block = bytearray(ctypes.sizeof(layout)) if block is None else block
+        self.registers = layout.from_buffer(self.block)
+        self.memory = byte_view(self.block, 0, MEMORY_SIZE) if memory is None else memory
+        self.v = byte_view(self.block, layout.v.offset, REGISTERS_COUNT)
+        self.stack = self.registers.stack
+        self.framebuffer = byte_view(self.block, layout.framebuffer.offset, FRAMEBUFFER_SIZE)
+
+    @property
+    def paged(self):
+        return isinstance(self.memory, PagedMemory)
+
+    def copy(self):
+        """Returns the copy of the state."""
+        return MachineState(bytearray(self.block), self.memory.copy() if self.paged else None)
+
+    def load(self, other):
+        """Overwrites the state with the other one (the views stay valid)."""
+        self.block[:] = other.block
+        if self.paged:
+            self.memory.load(other.memory)
@@ -0,0 +1,66 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import collections
+
+# The wrappers swapped onto the instances by all the instrumentation:
+# (id(obj), name): the entries [swaps, wrapper, previous] from the bottom,
+# previous being the instance attribute the wrapper replaced (None when
+# the class attribute was used).
+_STACKS = {}
+
+
+def _put(obj, name, value):
+    """Sets the instance attribute (deletes it for None, exposing the class attribute)."""
+    if value is not None:
+        setattr(obj, name, value)
+    elif name in obj.__dict__:
+        delattr(obj, name)
+
+
+class Swaps(object):
+    """
+    Methods swapped onto the instances by the instrumentation.
+
+    swap replaces the method with its wrapper (the wrapper function is called
+    with the current method & returns the replacing one), restore puts back
+    the method the wrapper replaced. The wrappers of one method are kept in
+    the stack shared by all the instrumentation, so restoring the wrapper
+    from the middle (e.g. the metrics detached before the timeline attached
+    after them) builds the wrappers above it again over the method below,
+    instead of dropping them.
+    """
+
+    def __init__(self):
+        self._swapped = collections.OrderedDict()  # (id(obj), name): obj
+
+    def swap(self, obj, name, wrapper):
+        """Swaps the wrapper of the method onto the instance (once per method)."""
+        key = (id(obj), name)
+        if key in self._swapped:
+            return
+        _STACKS.setdefault(key, []).append([self, wrapper, obj.__dict__.get(name)])
+        setattr(obj, name, wrapper(getattr(obj, name)))
+        self._swapped[key] = obj
+
+    def restore(self, obj, name):
+        """Restores the method replaced by the wrapper swapped by swap."""
+        key = (id(obj), name)
+        if self._swapped.pop(key, None) is None:
+            return
+        stack = _STACKS[key]
+        index = [entry[0] for entry in stack].index(self)
+        _put(obj, name, stack.pop(index)[2])
+        for entry in stack[index:]:
+            entry[2] = obj.__dict__.get(name)
+            setattr(obj, name, entry[1](getattr(obj, name)))
+        if not stack:
+            del _STACKS[key]
+
+    def restore_all(self):
+        """Restores all the swapped methods (the last swapped first)."""
+        for key, obj in reversed(list(self._swapped.items())):
+            self.restore(obj, key[1])
@@ -0,0 +1,226 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import os
+import select
+import sys
+import time
+
+from .halt import idle_loop
+
+try:
+    import termios
+    import tty
+except ImportError:
+    termios = tty = None
+
+FRAME_RATE = 60
+
+# Frames the key stays pressed after its last character (the terminals don't report key releases).
+KEY_HOLD_FRAMES = 6
+
+# Characters of the CHIP-8 keys (the same layout as the pygame frontend).
+KEY_CHARS = dict((c, int(c, 16)) for c in '0123456789abcdef')
+QUIT_CHARS = ('q', '\x1b')
+
+HALF_BLOCKS = (u' ', u'\u2580', u'\u2584', u'\u2588')  # Top & bottom pixel bits
+BRAILLE_BASE = 0x2800
+
+# Braille dot bits of the 2x4 cell pixels (x, y).
+BRAILLE_DOTS = {
+    (0, 0): 0x01, (0, 1): 0x02, (0, 2): 0x04, (0, 3): 0x40,
+    (1, 0): 0x08, (1, 1): 0x10, (1, 2): 0x20, (1, 3): 0x80
+}
+
+# Unchanged cells rewritten instead of moving the cursor (the escape is longer).
+MAX_CELL_GAP = 2
+
+
+def half_block_cells(pixels, width, height):
+    """Returns the rows of the half-block cell codes (1x2 pixels per cell)."""
+    rows = []
+    for y in range(0, height, 2):
+        top = pixels[y * width:(y + 1) * width]
+        bottom = pixels[(y + 1) * width:(y + 2) * width]
+        rows.append(bytearray(t | b << 1 for t, b in zip(top, bottom)))
+    return rows
+
+
+def braille_cells(pixels, width, height):
+    """Returns the rows of the braille cell codes (2x4 pixels per cell)."""
+    rows = []
+    for y in range(0, height, 4):
+        row = bytearray(width // 2)
+        for (dx, dy), bit in BRAILLE_DOTS.items():
+            line = pixels[(y + dy) * width + dx:(y + dy + 1) * width:2]
+            for x, pixel in enumerate(line):
+                if pixel:
+                    row[x] |= bit
+        rows.append(row)
+    return rows
+
+
+try:
+    unichr
+except NameError:
+    unichr = chr
+
+# Cell rows function, cell character & cell height of the modes.
+CELLS = {
+    'half':    (half_block_cells, lambda code: HALF_BLOCKS[code], 2),
+    'braille': (braille_cells, lambda code: unichr(BRAILLE_BASE + code), 4)
+}
+
+
+class TerminalRenderer(object):
+    """
+    Renders the framebuffer with the Unicode cells.
+
+    Only the cells that have changed since the previous frame are written,
+    using the cursor addressing escapes, so a typical frame is a few hundred
+    bytes instead of the whole screen.
+    """
+
+    def __init__(self, width, height, mode='half'):
+        self.width, self.height = width, height
+        self._cells, self._char, cell_height = CELLS[mode]
+        self.rows = height // cell_height
+        self._previous = None
+
+    def render(self, pixels):
+        """Returns the escape sequences updating the screen to the pixels."""
+        rows = self._cells(pixels, self.width, self.height)
+        previous = self._previous or [bytearray(b'\xff' * len(row)) for row in rows]
+        self._previous = rows
+
+        output = []
+        for y, (row, old) in enumerate(zip(rows, previous)):
+            if row == old:
+                continue
+            x, length = 0, len(row)
+            while x < length:
+                if row[x] == old[x]:
+                    x += 1
+                    continue
+                start = end = x
+                while x < length and x - end <= MAX_CELL_GAP + 1:
+                    if row[x] != old[x]:
+                        end = x
+                    x += 1
+                output.append(u'\x1b[{};{}H'.format(y + 1, start + 1))
+                output.append(u''.join(self._char(code) for code in row[start:end + 1]))
+        return u''.join(output)
+
+
+class TerminalKeypad(object):
+    """
+    Keypad reading the characters from the (raw) terminal input.
+
+    The terminals report only the key presses, so every key stays pressed
+    for KEY_HOLD_FRAMES frames after its last (auto-repeated) character.
+    """
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.quit = False
+        self._held = {}
+
+    def poll(self):
+        """Reads the pending input, returns the keypad mask for the next frame."""
+        while select.select([self.fd], [], [], 0)[0]:
+            data = os.read(self.fd, 64)
+            if not data:
+                break
+            for char in data.decode('latin-1').lower():
+                if char in QUIT_CHARS:
+                    self.quit = True
+                elif char in KEY_CHARS:
+                    self._held[KEY_CHARS[char]] = KEY_HOLD_FRAMES
+
+        mask = 0
+        for key, frames in list(self._held.items()):
+            mask |= 1 << key
+            if frames > 1:
+                self._held[key] = frames - 1
+            else:
+                del self._held[key]
+        return mask
+
+
+class TerminalRunner(object):
+    """Runs the headless VM with the terminal frontend."""
+
+    def __init__(self, vm, cycles_per_frame, mode='half', frame_rate=FRAME_RATE,
+                 stdin=None, stdout=None, metrics=None):
+        self.vm = vm
+        self.metrics = metrics
+        self.cycles_per_frame = vm.cycles_per_frame = cycles_per_frame  # Frames of run_until
+        self.frame_rate = frame_rate
+        self.renderer = TerminalRenderer(vm.display.width, vm.display.height, mode)
+
+        self.stdin = sys.stdin if stdin is None else stdin
+        stdout = sys.stdout if stdout is None else stdout
+        self.stdout = getattr(stdout, 'buffer', stdout)
+        self.keypad = TerminalKeypad(self.stdin.fileno())
+        self.bytes_written = 0
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        self.bytes_written += len(data)
+        self.stdout.write(data)
+        self.stdout.flush()
+
+    def frame(self):
+        """Emulates & renders a single frame (nothing while the program is idle)."""
+        vm, display, metrics = self.vm, self.vm.display, self.metrics
+        keys = self.keypad.poll()
+        if metrics is not None and keys != vm.keys:
+            metrics.input()
+        vm.keys = keys
+        if idle_loop(vm) is not None:
+            return
+
+        start = time.time()
+        result = vm.run_until(frame=vm.frame + 1)
+        if metrics is not None:
+            metrics.frame(result.cycles, time.time() - start)
+
+        if display.dirty:
+            display.dirty = False
+            start = time.time()
+            update = self.renderer.render(display.pixels)
+            if update:
+                self.write(update)
+            if metrics is not None:
+                metrics.present(time.time() - start)
+
+    def run(self):
+        """Executes the program until the user quits (q or Esc)."""
+        fd = self.stdin.fileno()
+        attributes = None
+        if termios is not None and os.isatty(fd):
+            attributes = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+
+        self.write(u'\x1b[2J\x1b[?25l')
+        self.vm.display.dirty = True
+        period = 1.0 / self.frame_rate
+        deadline = time.time()
+        try:
+            while not self.keypad.quit:
+                self.frame()
+                deadline += period
+                delay = deadline - time.time()
+                if delay > 0:
+                    self.vm.sleep(delay)
+                else:
+                    deadline = time.time()
+                    if self.metrics is not None and -delay > period:
+                        self.metrics.drop(int(-delay / period))
+        finally:
+            self.write(u'\x1b[{};1H\x1b[?25h\n'.format(self.renderer.rows + 1))
+            if attributes is not None:
+                termios.tcsetattr(fd, termios.TCSADRAIN, attributes)
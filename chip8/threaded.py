@@ -0,0 +1,151 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import threading
+import time
+
+import pygame
+
+from .halt import idle_loop
+
+FRAME_RATE   = 60  # Emulated frames per second
+REFRESH_RATE = 60  # Presented frames per second
+
+# The emulation is resynchronized instead of catching up when it falls
+# behind by more than this number of frames (e.g. after a debugger pause).
+MAX_FRAME_LAG = 5
+
+
+class FrameBuffers(object):
+    """
+    Double buffered framebuffer.
+
+    The emulation thread draws into the back buffer (the VM display pixels)
+    and publishes its copy as the front buffer. The swap is a single reference
+    assignment which is atomic, so neither of the threads ever waits for
+    the other one. The published buffer is never modified afterwards.
+    """
+
+    def __init__(self, size):
+        self.front = bytearray(size)
+        self.sequence = 0
+
+    def publish(self, pixels):
+        """Publishes the copy of the pixels as the front buffer."""
+        self.front = bytearray(pixels)
+        self.sequence += 1
+
+
+class ThreadedRunner(object):
+    """
+    Runs the emulation core on a worker thread.
+
+    The worker executes cycles_per_frame cycles every 1/FRAME_RATE seconds
+    (calling the VM frame listeners after each frame) and publishes
+    the framebuffer whenever it has changed. The main thread handles
+    the input (the keypad mask is written only by the main thread with a single
+    assignment) and presents the front buffer at the display refresh rate,
+    so a stalled present doesn't slow down the emulation and vice versa.
+    While the rewind key is held the worker steps the rewind buffer back
+    instead of emulating, while the program spins in an idle loop it just
+    sleeps until the next frame.
+    """
+
+    def __init__(self, vm, cycles_per_frame, frame_rate=FRAME_RATE, refresh_rate=REFRESH_RATE,
+                 metrics=None, rewind=None):
+        self.vm = vm
+        self.metrics = metrics
+        self.rewind = rewind
+        self.cycles_per_frame = vm.cycles_per_frame = cycles_per_frame  # Frames of run_until
+        self.frame_rate = frame_rate
+        self.refresh_rate = refresh_rate
+
+        self.buffers = FrameBuffers(len(vm.display.pixels))
+        self.running = False
+        self.error = None
+        self.frames = 0
+        self._thread = None
+
+    def start(self):
+        """Starts the emulation thread."""
+        self.vm.display.defer_presentation()
+        self.running = True
+        self._thread = threading.Thread(target=self._emulate)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops the emulation thread and re-raises its error (if any)."""
+        self.running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.error is not None:
+            raise self.error
+
+    def _emulate(self):
+        """Emulation thread body."""
+        period = 1.0 / self.frame_rate
+        deadline = time.time()
+
+        try:
+            while self.running:
+                self._frame()
+                deadline = self._pace(deadline + period, period)
+        except Exception as e:
+            self.error = e
+            self.running = False
+
+    def _frame(self):
+        """Emulates (or rewinds) the frame & publishes the changed framebuffer."""
+        vm, display, metrics = self.vm, self.vm.display, self.metrics
+        if self.rewind is not None and vm.rewinding:
+            self.rewind.step_back()
+        elif idle_loop(vm) is None:
+            start = time.time()
+            result = vm.run_until(frame=vm.frame + 1)
+            self.frames += 1
+            if metrics is not None:
+                metrics.frame(result.cycles, time.time() - start)
+
+        if display.dirty:
+            display.dirty = False
+            self.buffers.publish(display.pixels)
+
+    def _pace(self, deadline, period):
+        """
+        Sleeps until the deadline of the next frame. Returns the deadline
+        (restarted from now when the emulation lags too far behind).
+        """
+        delay = deadline - time.time()
+        if delay > 0:
+            self.vm.sleep(delay)
+        elif -delay > MAX_FRAME_LAG * period:
+            deadline = time.time()
+            if self.metrics is not None:
+                self.metrics.drop(int(-delay / period))
+        return deadline
+
+    def run(self):
+        """Handles the input & presents the frames until the user quits."""
+        clock = pygame.time.Clock()
+        presented = -1
+
+        self.start()
+        try:
+            while self.running:
+                if not self.vm.handle_events():
+                    break
+
+                sequence = self.buffers.sequence
+                if sequence != presented:
+                    if self.metrics is not None and presented >= 0 and sequence > presented + 1:
+                        self.metrics.drop(sequence - presented - 1)
+                    presented = sequence
+                    self.vm.display.present(self.buffers.front)
+                clock.tick(self.refresh_rate)
+        finally:
+            self.stop()
@@ -0,0 +1,161 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import array
+import gc
+import json
+import os
+import threading
+import time
+
+from .metrics import Metrics
+from .swap import Swaps
+
+# The frame phases: the input handling, the emulated batch of the frame's
+# cycles, the DRW / CLS rasterization into the framebuffer, the presentation
+# of the framebuffer, the flip of the screen, the sound effect, the pacing
+# sleeps, the sleeps until the next event while the program waits for a key
+# & the garbage collections.
+PHASES = ('input', 'emulate', 'raster', 'present', 'flip', 'audio', 'sleep', 'idle', 'gc')
+INPUT, EMULATE, RASTER, PRESENT, FLIP, AUDIO, SLEEP, IDLE, GC = range(len(PHASES))
+
+TIMELINE_SIZE = 1 << 18  # Spans (about 4.5MB, minutes of the frames)
+
+
+class Timeline(object):
+    """
+    Frame phase timeline.
+
+    The traced methods swapped onto the instances by attach record the spans
+    (phase, thread, start & end) into the ring buffers allocated upfront, so
+    tracing a long session neither allocates nor writes anything until the
+    timeline is written out (the oldest spans are overwritten). The emulated
+    batches are reported by the runners through the metrics (created when not
+    given, the runners have to be passed timeline.metrics). The garbage
+    collections are recorded on Python 3 only (gc.callbacks).
+    """
+
+    def __init__(self, vm, metrics=None, size=TIMELINE_SIZE):
+        self.vm = vm
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.size = size
+        self.phases = array.array('B', [0]) * size
+        self.threads = array.array('B', [0]) * size
+        self.starts = array.array('d', [0.0]) * size
+        self.ends = array.array('d', [0.0]) * size
+        self.count = 0
+        self.origin = time.time()
+
+        self.thread_names = []   # Recording threads by the index
+        self._thread_index = {}  # Thread ident: index
+        self._lock = threading.Lock()
+        self._gc_start = None
+        self._swaps = Swaps()
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def record(self, phase, start, end):
+        """Records the span of the phase on the current thread."""
+        thread = threading.current_thread()
+        with self._lock:
+            index = self._thread_index.get(thread.ident)
+            if index is None:
+                index = self._thread_index[thread.ident] = len(self.thread_names)
+                self.thread_names.append(thread.name)
+            slot = self.count % self.size
+            self.count += 1
+            self.phases[slot] = phase
+            self.threads[slot] = index
+            self.starts[slot] = start
+            self.ends[slot] = end
+
+    def spans(self):
+        """Yields the recorded spans (phase, thread name, start, end), the oldest first."""
+        first = self.count - len(self)
+        for position in range(first, self.count):
+            slot = position % self.size
+            yield (PHASES[self.phases[slot]], self.thread_names[self.threads[slot]],
+                   self.starts[slot], self.ends[slot])
+
+    def events(self):
+        """Returns the spans as the Chrome trace events (the timestamps in microseconds)."""
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                   'args': {'name': 'chip8'}}]
+        for index, name in enumerate(self.thread_names):
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': index,
+                           'args': {'name': name}})
+        first = self.count - len(self)
+        for position in range(first, self.count):
+            slot = position % self.size
+            start = self.starts[slot]
+            events.append({'name': PHASES[self.phases[slot]], 'cat': 'frame', 'ph': 'X',
+                           'pid': pid, 'tid': self.threads[slot],
+                           'ts': round((start - self.origin) * 1e6, 1),
+                           'dur': round((self.ends[slot] - start) * 1e6, 1)})
+        return events
+
+    def write(self, fname):
+        """
+        Writes the timeline in the Chrome trace event format (opened by
+        chrome://tracing or ui.perfetto.dev).
+        """
+        with open(fname, 'w') as f:
+            json.dump({'traceEvents': self.events(), 'displayTimeUnit': 'ms',
+                       'otherData': {'spans': self.count,
+                                     'overwritten': self.count - len(self)}}, f)
+
+    # Instrumentation
+
+    def _traced(self, phase):
+        def wrapper(method):
+            def traced(*args):
+                start = time.time()
+                result = method(*args)
+                self.record(phase, start, time.time())
+                return result
+            return traced
+        return wrapper
+
+    def _collected(self, phase, info):
+        if phase == 'start':
+            self._gc_start = time.time()
+        elif self._gc_start is not None:
+            self.record(GC, self._gc_start, time.time())
+            self._gc_start = None
+
+    def attach(self):
+        """
+        Swaps the traced input, sleeping, drawing, presentation & sound
+        methods (and the emulated frame reporting) onto the instances.
+        """
+        vm, display = self.vm, self.vm.display
+
+        def reported(method):
+            def frame(cycles, seconds):
+                method(cycles, seconds)
+                end = time.time()
+                self.record(EMULATE, end - seconds, end)
+            return frame
+
+        self._swaps.swap(vm, 'handle_events', self._traced(INPUT))
+        self._swaps.swap(vm, 'sleep', self._traced(SLEEP))
+        self._swaps.swap(vm, 'wait_event', self._traced(IDLE))
+        self._swaps.swap(display, 'draw_sprite', self._traced(RASTER))
+        self._swaps.swap(display, 'clear_display', self._traced(RASTER))
+        self._swaps.swap(display, 'present', self._traced(PRESENT))
+        self._swaps.swap(display, 'flip', self._traced(FLIP))
+        self._swaps.swap(display, 'play_sound', self._traced(AUDIO))
+        self._swaps.swap(self.metrics, 'frame', reported)
+        if hasattr(gc, 'callbacks'):
+            gc.callbacks.append(self._collected)
+
+    def detach(self):
+        """Restores the original methods."""
+        if hasattr(gc, 'callbacks') and self._collected in gc.callbacks:
+            gc.callbacks.remove(self._collected)
+        self._swaps.restore_all()
@@ -0,0 +1,329 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import argparse
+import collections
+import struct
+import threading
+import zlib
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from .swap import Swaps
+
+# File layout
+TRACE_MAGIC   = b'C8TR'
+TRACE_VERSION = 1
+
+HEADER       = struct.Struct('<4sBBH')  # magic, version, codec, record size
+CHUNK_HEADER = struct.Struct('<II')     # stored size, raw size
+
+# kind, count, cycle, pc/addr, opcode, I, SP, changed registers mask, V0-VF/data
+RECORD = struct.Struct('<BBIHHHHH16s')
+
+RECORD_INSTRUCTION = 0
+RECORD_MEMORY      = 1
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+CODECS = {'none': CODEC_NONE, 'zlib': CODEC_ZLIB, 'zstd': CODEC_ZSTD}
+
+CHUNK_RECORDS = 4096
+QUEUE_CHUNKS  = 16
+
+Record = collections.namedtuple(
+    'Record', 'kind count cycle pc opcode i sp mask data')
+
+
+class TraceFormatException(Exception):
+    def __init__(self, message):
+        super(TraceFormatException, self).__init__(
+            'Invalid trace file: {}.'.format(message))
+
+
+def _compressor(codec):
+    """Returns the chunk compression function for the given codec."""
+    if codec == CODEC_NONE:
+        return bytes
+    if codec == CODEC_ZLIB:
+        return lambda data: zlib.compress(bytes(data), 1)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError('zstd codec requires the zstandard package')
+        return zstandard.ZstdCompressor(level=1).compress
+    raise ValueError('Unknown trace codec: {}'.format(codec))
+
+
+def _decompressor(codec):
+    """Returns the chunk decompression function for the given codec."""
+    if codec == CODEC_NONE:
+        return lambda data, size: data
+    if codec == CODEC_ZLIB:
+        return lambda data, size: zlib.decompress(data)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise TraceFormatException('zstd codec requires the zstandard package')
+        decompressor = zstandard.ZstdDecompressor()
+        return lambda data, size: decompressor.decompress(data, max_output_size=size)
+    raise TraceFormatException('unknown codec {}'.format(codec))
+
+
+class TraceWriter(object):
+    """
+    Buffered binary trace writer.
+
+    Records are packed into fixed-width (32 bytes) structures and appended
+    to an in-memory chunk. Full chunks are handed over to a background thread
+    which compresses them and writes them out, so the emulation thread only
+    pays for a single struct.pack_into call per record.
+
+    File format:
+        header: magic (4s), version (B), codec (B), record size (H)
+        chunks: stored size (I), raw size (I), payload
+    """
+
+    def __init__(self, fname, codec='zlib', chunk_records=CHUNK_RECORDS):
+        self.codec = CODECS[codec]
+        self._compress = _compressor(self.codec)
+        self._chunk_size = chunk_records * RECORD.size
+
+        self._file = open(fname, 'wb')
+        self._file.write(HEADER.pack(
+            TRACE_MAGIC, TRACE_VERSION, self.codec, RECORD.size))
+
+        self._chunk = bytearray(self._chunk_size)
+        self._offset = 0
+
+        self._queue = queue.Queue(QUEUE_CHUNKS)
+        self._thread = threading.Thread(target=self._worker)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, kind, count, cycle, pc, opcode, i, sp, mask, data):
+        """Appends a single record to the current chunk."""
+        RECORD.pack_into(self._chunk, self._offset,
+                         kind, count, cycle & 0xffffffff, pc & 0xffff,
+                         opcode, i & 0xffff, sp & 0xffff, mask, data)
+        self._offset += RECORD.size
+        if self._offset == self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Hands over the current chunk to the background writer."""
+        if self._offset:
+            self._queue.put(bytes(self._chunk[:self._offset]))
+            self._offset = 0
+
+    def close(self):
+        """Flushes pending records and waits for the writer to finish."""
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+    def _worker(self):
+        """Compresses and writes out the chunks in the background."""
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            payload = self._compress(chunk)
+            self._file.write(CHUNK_HEADER.pack(len(payload), len(chunk)))
+            self._file.write(payload)
+
+
+class TraceReader(object):
+    """Streams the records of a trace file chunk by chunk."""
+
+    def __init__(self, fname):
+        self.fname = fname
+
+    def __iter__(self):
+        with open(self.fname, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise TraceFormatException('truncated header')
+
+            magic, version, codec, size = HEADER.unpack(header)
+            if magic != TRACE_MAGIC or version != TRACE_VERSION:
+                raise TraceFormatException('bad magic or version')
+            if size != RECORD.size:
+                raise TraceFormatException('record size mismatch')
+            decompress = _decompressor(codec)
+
+            while True:
+                chunk_header = f.read(CHUNK_HEADER.size)
+                if not chunk_header:
+                    break
+                stored, raw = CHUNK_HEADER.unpack(chunk_header)
+                chunk = decompress(f.read(stored), raw)
+                for offset in range(0, len(chunk), RECORD.size):
+                    yield Record._make(RECORD.unpack_from(chunk, offset))
+
+
+def filter_records(records, pc_range=None, opcode=None, opcode_mask=0xffff,
+                   register=None, memory=False):
+    """
+    Lazily filters the records.
+
+    pc_range - (start, end) inclusive range of the program counter
+               (or the written address for the memory records),
+    opcode   - opcode value compared after applying opcode_mask,
+    register - (index, value) pair matched against the register state,
+    memory   - include the memory write records.
+    """
+    for record in records:
+        if record.kind == RECORD_MEMORY:
+            if not memory or register is not None:
+                continue
+        elif register is not None and bytearray(record.data)[register[0]] != register[1]:
+            continue
+        if pc_range is not None and not pc_range[0] <= record.pc <= pc_range[1]:
+            continue
+        if opcode is not None and record.opcode & opcode_mask != opcode:
+            continue
+        yield record
+
+
+def format_record(record):
+    """Formats the record as a single human readable line."""
+    data = bytearray(record.data)
+    if record.kind == RECORD_MEMORY:
+        return '{:>10}     {:04X} [{:03X}] <- {}'.format(
+            record.cycle, record.opcode, record.pc,
+            ' '.join('{:02X}'.format(b) for b in data[:record.count]))
+
+    changed = ' '.join('V{:X}={:02X}'.format(r, data[r])
+                       for r in range(0x10) if record.mask >> r & 1)
+    return '{:>10} {:03X} {:04X} I={:03X} SP={:02X} {}'.format(
+        record.cycle, record.pc, record.opcode, record.i, record.sp, changed).rstrip()
+
+
+class Tracer(object):
+    """
+    Execution tracer.
+
+    The tracer swaps in instrumented instruction_lookup & memory store
+    methods on the VM instances, so a VM without the tracer attached
+    runs exactly the same code as before.
+    """
+
+    def __init__(self, vm, writer):
+        self.vm = vm
+        self.writer = writer
+        self.cycle = 0
+        self.opcode = 0
+        self._swaps = Swaps()
+
+    def attach(self):
+        """Installs the instrumented methods."""
+        mem = self.vm.mem
+        self._swaps.swap(self.vm.opcode, 'instruction_lookup', self._traced_lookup)
+        self._swaps.swap(mem, 'store_byte', self._traced_store(lambda data: [data & 0xff]))
+        self._swaps.swap(mem, 'store_word', self._traced_store(
+            lambda data: [(data >> 8) & 0xff, data & 0xff]))
+        self._swaps.swap(mem, 'store_many', self._traced_store(
+            lambda data: [b & 0xff for b in data]))
+
+    def _traced_lookup(self, lookup):
+        vm = self.vm
+
+        def traced_lookup(opcode):
+            self.opcode = opcode
+            pc = vm.pc - 2
+            before = bytearray(vm.v)
+            result = lookup(opcode)
+
+            after = bytearray(vm.v)
+            mask = 0
+            if before != after:
+                for r in range(0x10):
+                    if before[r] != after[r]:
+                        mask |= 1 << r
+
+            self.writer.write(RECORD_INSTRUCTION, 0, self.cycle, pc, opcode,
+                              vm.i, vm.sp, mask, bytes(after))
+            self.cycle += 1
+            return result
+        return traced_lookup
+
+    def _traced_store(self, written):
+        """Returns the wrapper recording the bytes (returned by written) of the store."""
+        def wrapper(store):
+            def traced_store(addr, data):
+                result = store(addr, data)
+                self._memory_write(addr, bytearray(written(data)))
+                return result
+            return traced_store
+        return wrapper
+
+    def detach(self):
+        """Restores the original methods."""
+        self._swaps.restore_all()
+
+    def _memory_write(self, addr, data):
+        """Records the memory write (split into 16 bytes pieces)."""
+        for offset in range(0, len(data), 0x10):
+            piece = data[offset:offset + 0x10]
+            self.writer.write(RECORD_MEMORY, len(piece), self.cycle,
+                              addr + offset, self.opcode, 0, 0, 0, bytes(piece))
+
+
+def _int(value):
+    return int(value, 16)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        'python -m chip8.tracer',
+        description='CHIP-8 execution trace query tool',
+        formatter_class=lambda prog: argparse.HelpFormatter(
+            prog, max_help_position=100, width=150))
+
+    parser.add_argument('trace', help='Trace file')
+
+    parser.add_argument('-p', '--pc', metavar='START:END',
+                        help='Filter by the program counter range (hex)')
+
+    parser.add_argument('-o', '--opcode', metavar='OPCODE[/MASK]',
+                        help='Filter by the opcode, e.g. D000/F000 (hex)')
+
+    parser.add_argument('-r', '--register', metavar='X=VALUE',
+                        help='Filter by the register value, e.g. 3=1F (hex)')
+
+    parser.add_argument('-m', '--memory', action='store_true', default=False,
+                        help='Show memory writes')
+
+    parser.add_argument('-c', '--count', action='store_true', default=False,
+                        help='Print only the number of matched records')
+
+    args = parser.parse_args()
+
+    pc_range = tuple(map(_int, args.pc.split(':'))) if args.pc else None
+    opcode, opcode_mask = None, 0xffff
+    if args.opcode:
+        parts = args.opcode.split('/')
+        opcode = _int(parts[0])
+        opcode_mask = _int(parts[1]) if len(parts) > 1 else 0xffff
+    register = tuple(map(_int, args.register.split('='))) if args.register else None
+
+    records = filter_records(TraceReader(args.trace), pc_range, opcode,
+                             opcode_mask, register, args.memory)
+    if args.count:
+        print(sum(1 for _ in records))
+    else:
+        for record in records:
+            print(format_record(record))
@@ -0,0 +1,102 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import os
+import unittest
+
+from chip8.assembler import AssemblerException, assemble
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+class TestAssembler(unittest.TestCase):
+
+    def assertAssembles(self, source, data):
+        self.assertEqual(assemble(source), bytearray(data))
+
+    def test_instructions(self):
+        """Checks the encodings against the chip8.inc macros."""
+        cases = [
+            ('cls', [0x00, 0xE0]),             ('ret', [0x00, 0xEE]),
+            ('jmp 0xabc', [0x1A, 0xBC]),       ('call 0x123', [0x21, 0x23]),
+            ('se v1, 0xff', [0x31, 0xFF]),     ('sne v15, 2', [0x4F, 0x02]),
+            ('ser v1, v2', [0x51, 0x20]),      ('ld va, 0x10', [0x6A, 0x10]),
+            ('add v3, 0x1ff', [0x73, 0xFF]),   ('ldr v1, v2', [0x81, 0x20]),
+            ('or v1, v2', [0x81, 0x21]),       ('and v1, v2', [0x81, 0x22]),
+            ('xor v1, v2', [0x81, 0x23]),      ('addr v1, v2', [0x81, 0x24]),
+            ('sub v1, v2', [0x81, 0x25]),      ('shr v1, v2', [0x81, 0x26]),
+            ('subn v1, v2', [0x81, 0x27]),     ('shl v1, v2', [0x81, 0x2E]),
+            ('sner v1, v2', [0x91, 0x20]),     ('ldi 0x500', [0xA5, 0x00]),
+            ('jmpr 0x300', [0xB3, 0x00]),      ('rnd v1, 0x0f', [0xC1, 0x0F]),
+            ('drw v1, v2, 5', [0xD1, 0x25]),   ('skp v4', [0xE4, 0x9E]),
+            ('sknp v4', [0xE4, 0xA1]),         ('ldt v5', [0xF5, 0x07]),
+            ('ldk v5', [0xF5, 0x0A]),          ('lddt v5', [0xF5, 0x15]),
+            ('ldst v5', [0xF5, 0x18]),         ('addi v5', [0xF5, 0x1E]),
+            ('ldf v5', [0xF5, 0x29]),          ('ldb v5', [0xF5, 0x33]),
+            ('ldir v5', [0xF5, 0x55]),         ('ldri v5', [0xF5, 0x65]),
+        ]
+        for source, data in cases:
+            self.assertAssembles(source, data)
+
+    def test_hello_world(self):
+        with open(os.path.join(ROOT, 'hello_world.nasm')) as f:
+            source = f.read()
+        self.assertAssembles(source, [
+            0x62, 0x78, 0xA5, 0x00, 0x63, 0x01, 0x64, 0x01, 0xF1, 0x0A,
+            0x00, 0xE0, 0xF2, 0x18, 0xF1, 0x29, 0xD3, 0x45, 0x12, 0x00
+        ])
+
+    def test_labels(self):
+        self.assertAssembles("""
+            start:  ld v1, 10
+            .loop:  add v1, -1      ; local label
+                    sne v1, 0
+                    jmp .loop
+                    call routine
+                    jmp start
+            routine:
+                    ldi sprite
+            .loop:  ret
+            sprite: db 0xff
+        """, [0x61, 0x0A, 0x71, 0xFF, 0x41, 0x00, 0x12, 0x02, 0x22, 0x0C,
+              0x12, 0x00, 0xA2, 0x10, 0x00, 0xEE, 0xFF])
+
+    def test_expressions(self):
+        self.assertAssembles("""
+            %define SPEED 3
+            HEIGHT equ 1 << 4 | 1
+                    ld v0, SPEED * (HEIGHT - 1) / 2
+                    ld v1, ~0 & 0b1010
+                    ld v2, 'A' + 1
+                    jmp $
+        """, [0x60, 0x18, 0x61, 0x0A, 0x62, 0x42, 0x12, 0x06])
+
+    def test_data(self):
+        self.assertAssembles("""
+                    db 1, 2, "a;b", 'c'
+                    dw 0x1234, end
+            end:
+        """, [0x01, 0x02, 0x61, 0x3B, 0x62, 0x63, 0x12, 0x34, 0x02, 0x0A])
+
+    def test_org(self):
+        self.assertAssembles("""
+            org 0x300
+            start:  jmp start
+                    org 0x306
+                    db 0xaa
+        """, [0x13, 0x00, 0x00, 0x00, 0x00, 0x00, 0xAA])
+
+        with self.assertRaises(AssemblerException):
+            assemble('db 1\norg 0x100')
+
+    def test_errors(self):
+        for source in ('foo v1', 'ld v1', 'jmp missing', 'ld v1, (1', 'a:\na:', 'ld v1, 1 / 0'):
+            with self.assertRaises(AssemblerException):
+                assemble(source)
+
+        with self.assertRaises(AssemblerException) as context:
+            assemble('cls\n\nld v1, @')
+        self.assertEqual(context.exception.line, 3)
@@ -0,0 +1,32 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import os
+import subprocess
+import sys
+import unittest
+
+from chip8.benchmark import measure_interpreter, measure_ips
+
+# Python 2.7 interpreter (with pygame) used for the comparison.
+PYTHON2 = os.environ.get('CHIP8_PYTHON2', 'python2.7')
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_measure_ips(self):
+        self.assertGreater(measure_ips(cycles=1000, repeat=1), 0)
+
+    @unittest.skipIf(sys.version_info < (3, 11), 'requires Python 3.11+')
+    def test_python2_comparison(self):
+        try:
+            python2 = measure_interpreter(PYTHON2)
+        except (OSError, subprocess.CalledProcessError):
+            self.skipTest('{} with pygame is not available'.format(PYTHON2))
+        python3 = measure_ips()
+
+        self.assertGreater(python3, python2, 'Python {}.{}: {:.0f} IPS, 2.7: {:.0f} IPS'.format(
+            sys.version_info[0], sys.version_info[1], python3, python2))
@@ -0,0 +1,110 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from chip8.analysis import analyze
+from chip8.assembler import assemble
+from chip8 import catalog
+from chip8.catalog import Catalog, rom_hash
+
+GAME = """
+            ldi sprite
+            call draw
+    loop:   sknp v0
+            jmp loop
+            jmp loop
+    draw:   drw v0, v1, 2
+            ret
+    sprite: db 0xff, 0x81
+"""
+
+
+class TestAnalysis(unittest.TestCase):
+
+    def test_reachable_code(self):
+        analysis = analyze(assemble(GAME))
+        self.assertEqual(analysis.code, set([0x200, 0x202, 0x204, 0x206, 0x208, 0x20a, 0x20c]))
+        self.assertEqual(analysis.data, set([0x20e, 0x20f]))
+        self.assertEqual(analysis.subroutines, set([0x20a]))
+        self.assertEqual(analysis.references, set([0x20e]))
+        self.assertEqual(analysis.platform, 'chip8')
+
+    def test_platform(self):
+        self.assertEqual(analyze(bytearray([0x00, 0xFF, 0x00, 0xFD])).platform, 'schip')
+        self.assertEqual(analyze(bytearray([0xF0, 0x00, 0x03, 0x00])).platform, 'xochip')
+        self.assertEqual(analyze(bytearray([0x00, 0xE0]), 'game.sc8').platform, 'schip')
+
+    def test_indirect_jump(self):
+        analysis = analyze(assemble('jmpr 0x204\ndb 0xff, 0xff\ncls'))
+        self.assertEqual(analysis.indirect, set([0x200]))
+        self.assertEqual(analysis.code, set([0x200, 0x204]))
+
+
+class TestCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.roms = os.path.join(self.path, 'roms')
+        os.mkdir(self.roms)
+        self.write_rom('game.ch8', assemble(GAME))
+        self.write_rom('copy.ch8', assemble(GAME))
+        self.write_rom('hires.ch8', bytearray([0x00, 0xFF, 0x12, 0x02]))
+        self.write_rom('readme.txt', bytearray(b'not a ROM'))
+        self.catalog = Catalog(os.path.join(self.path, 'catalog.db'))
+
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(self.path)
+
+    def write_rom(self, name, data):
+        with open(os.path.join(self.roms, name), 'wb') as f:
+            f.write(data)
+
+    def test_scan(self):
+        self.assertEqual(self.catalog.scan([self.roms], processes=2), 2)
+        self.assertEqual([e.name for e in self.catalog.query()], ['copy.ch8', 'game.ch8', 'hires.ch8'])
+
+        entry = self.catalog.lookup_file(os.path.join(self.roms, 'game.ch8'))
+        self.assertEqual(entry.sha256, rom_hash(assemble(GAME)))
+        self.assertEqual((entry.platform, entry.cycles_per_frame), ('chip8', 16))
+        self.assertEqual((entry.instructions, entry.subroutines), (7, 1))
+        self.assertTrue(entry.is_code(0x20c))
+        self.assertTrue(entry.is_data(0x20e))
+        self.assertFalse(entry.is_code(0x20e))
+
+        # The unchanged files aren't rescanned
+        self.assertEqual(self.catalog.scan([self.roms]), 0)
+
+    def test_version(self):
+        self.catalog.scan([self.roms], processes=1)
+        version = catalog.ANALYSIS_VERSION
+        catalog.ANALYSIS_VERSION += 1
+        try:
+            # The unchanged files of the older analysis are analyzed again
+            self.assertEqual(self.catalog.scan([self.roms], processes=1), 2)
+            self.assertEqual(self.catalog.scan([self.roms], processes=1), 0)
+        finally:
+            catalog.ANALYSIS_VERSION = version
+        versions = self.catalog.db.execute('SELECT DISTINCT version FROM roms').fetchall()
+        self.assertEqual(versions, [(version + 1,)])
+
+    def test_query(self):
+        self.catalog.scan([self.roms], processes=1)
+        hires, = self.catalog.query(platform='schip')
+        self.assertEqual((hires.name, hires.cycles_per_frame), ('hires.ch8', 30))
+        self.assertEqual(hires.quirks.jump_vx, True)
+        self.assertEqual(len(self.catalog.query(name='%game%')), 1)
+        self.assertIsNone(self.catalog.lookup('0' * 64))
+
+    def test_persistence(self):
+        self.catalog.scan([os.path.join(self.roms, 'game.ch8')])
+        self.catalog.close()
+        self.catalog = Catalog(os.path.join(self.path, 'catalog.db'))
+        self.assertEqual(self.catalog.lookup(rom_hash(assemble(GAME))).name, 'game.ch8')
@@ -0,0 +1,98 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.debugger import Debugger, parse_condition
+
+PROGRAM = """
+            ld v3, 0
+            ldi 0x300
+    loop:   add v3, 1
+            call store
+            jmp loop
+    store:  ldr v0, v3
+            ldir v0
+            ret
+"""
+
+
+class TestDebugger(unittest.TestCase):
+
+    def setUp(self):
+        self.vm = Chip8(assemble(PROGRAM), headless=True)
+        self.debugger = Debugger(self.vm)
+
+    def test_fast_path(self):
+        opcode, mem = self.vm.opcode, self.vm.mem
+        self.debugger.add_breakpoint(0x204)
+        self.debugger.add_watchpoint(0x300, 0x30f, 'rw')
+        self.assertIn('instruction_lookup', opcode.__dict__)
+        self.assertIn('store_many', mem.__dict__)
+
+        self.debugger.detach()
+        self.assertNotIn('instruction_lookup', opcode.__dict__)
+        self.assertEqual(list(mem.__dict__), ['_mem'])
+
+    def test_breakpoint(self):
+        self.debugger.add_breakpoint(0x206)
+        stop = self.debugger.cont(100)
+        self.assertEqual((stop.reason, stop.pc), ('breakpoint', 0x206))
+        self.assertEqual(self.vm.v[3], 1)
+
+        # The resumed execution doesn't stop at the same breakpoint immediately
+        stop = self.debugger.cont(100)
+        self.assertEqual((stop.reason, stop.pc), ('breakpoint', 0x206))
+        self.assertEqual(self.vm.v[3], 2)
+
+        self.debugger.remove_breakpoint(0x206)
+        self.assertEqual(self.debugger.cont(10).reason, 'limit')
+
+    def test_conditional_breakpoint(self):
+        self.debugger.add_breakpoint(0x206, parse_condition('V3 == 0x05'))
+        stop = self.debugger.cont(1000)
+        self.assertEqual((stop.reason, stop.pc), ('breakpoint', 0x206))
+        self.assertEqual(self.vm.v[3], 5)
+
+        with self.assertRaises(ValueError):
+            parse_condition('V3 = 1')
+
+    def test_watchpoint(self):
+        self.debugger.add_watchpoint(0x300)
+        stop = self.debugger.cont(100)
+        self.assertEqual(stop.reason, 'watchpoint')
+        self.assertEqual(stop.detail, ('w', 0x300))
+        self.assertEqual(stop.pc, 0x20e)
+        self.assertEqual(self.vm.mem.fetch_byte(0x300), 1)
+
+        self.debugger.remove_watchpoint(0x300)
+        self.debugger.add_watchpoint(0x301, 0x3ff, 'rw')
+        self.assertEqual(self.debugger.cont(100).reason, 'limit')
+
+    def test_step_over_and_out(self):
+        for _ in range(3):
+            self.debugger.step()
+        self.assertEqual(self.vm.pc, 0x206)
+
+        stop = self.debugger.step_over()
+        self.assertEqual((stop.reason, stop.pc, self.vm.sp), ('step', 0x208, 0))
+        self.assertEqual(self.vm.mem.fetch_byte(0x300), 1)
+
+        self.debugger.step()
+        self.debugger.step()
+        self.debugger.step()
+        self.assertEqual((self.vm.pc, self.vm.sp), (0x20a, 1))
+        stop = self.debugger.step_out()
+        self.assertEqual((stop.pc, self.vm.sp), (0x208, 0))
+
+    def test_step_over_breakpoint(self):
+        for _ in range(3):
+            self.debugger.step()
+        self.debugger.add_breakpoint(0x20c)
+        stop = self.debugger.step_over()
+        self.assertEqual((stop.reason, stop.pc), ('breakpoint', 0x20c))
@@ -0,0 +1,82 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+from chip8.assembler import assemble
+from chip8.explorer import Explorer, HashSet, format_path, state_hash
+
+# Opens after the keys 1, 2 & 3 are pressed in the separate frames
+LOCK = """
+    start:  ld v0, 1
+            sknp v0
+            jmp second
+            jmp start
+    second: ld v0, 2
+            sknp v0
+            jmp third
+            jmp second
+    third:  ld v0, 3
+            sknp v0
+            jmp open
+            jmp third
+    open:   jmp open
+"""
+
+OPEN = 0x218
+
+
+def v5_is_ten(vm):
+    return vm.v[5] == 10
+
+
+class TestHashSet(unittest.TestCase):
+    def test_add(self):
+        hashes = HashSet(4)
+        self.assertTrue(hashes.add(5))
+        self.assertFalse(hashes.add(5))
+        for value in range(6, 106):
+            self.assertTrue(hashes.add(value << 40 | 3))
+        self.assertEqual(len(hashes), 101)
+        self.assertIn(5, hashes)
+        self.assertIn(50 << 40 | 3, hashes)
+        self.assertNotIn(3, hashes)
+        self.assertLessEqual(len(hashes) * 2, len(hashes.table))
+
+    def test_state_hash(self):
+        block = bytearray(100)
+        self.assertNotEqual(state_hash(bytes(block)), 0)
+        block[99] = 1
+        self.assertNotEqual(state_hash(bytes(block)), state_hash(bytes(bytearray(100))))
+
+
+class TestExplorer(unittest.TestCase):
+    def test_goal_pc(self):
+        result = Explorer(assemble(LOCK), processes=1).explore(goal_pc=OPEN)
+        self.assertEqual(result.path, [1 << 1, 1 << 2, 1 << 3])
+        self.assertEqual(format_path(result.path), '1 2 3')
+        self.assertEqual(result.depth, 3)
+
+    def test_exhaustive(self):
+        # The stages are entered at the different loop positions
+        result = Explorer(assemble(LOCK), processes=1).explore()
+        self.assertEqual((result.states, result.depth, result.errors, result.path),
+                         (11, 5, 0, None))
+
+    def test_limits(self):
+        counter = assemble('loop: add v5, 1\njmp loop')
+        self.assertEqual(Explorer(counter, processes=1).explore(max_depth=3).states, 4)
+        self.assertEqual(Explorer(counter, processes=1).explore(max_states=2).states, 2)
+
+    def test_parallel_goal(self):
+        counter = assemble('loop: add v5, 1\nse v5, 0\njmp loop\nend: jmp end')
+        explorer = Explorer(counter, cycles_per_frame=4, processes=2)
+        result = explorer.explore(goal=v5_is_ten)
+        self.assertEqual(len(result.path), 7)  # V5 = 2, 3, 4, 6, 7, 8, 10
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.flight import FlightRecorder
+from chip8.opcode import InvalidOpcodeException
+
+# Counts to 5 in V1, then executes the invalid opcode
+CRASH = """
+    loop:   add v1, 1
+            ldi 0x300
+            se v1, 5
+            jmp loop
+            dw 0x8008
+"""
+
+# Stores V0 past the end of the memory
+OUT_OF_BOUNDS = """
+            ldi 0xfff
+            ldir v1
+"""
+
+
+def run_until_error(vm, limit=1000):
+    for _ in range(limit):
+        try:
+            vm.cycle()
+        except Exception as e:
+            return e
+    raise AssertionError('no error')
+
+
+class TestFlightRecorder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_records(self):
+        vm = Chip8(assemble(CRASH), headless=True)
+        recorder = FlightRecorder(vm, 8)
+        recorder.attach()
+        error = run_until_error(vm)
+
+        self.assertIsInstance(error, InvalidOpcodeException)
+        self.assertEqual(recorder.cycles, 4 * 4 + 3 + 1)
+        records = recorder.records()
+        self.assertEqual(len(records), 8)
+        self.assertEqual(records[-1], (19, 0x208, 0x8008, 0x300, 0))
+        self.assertEqual(records[-2], (18, 0x204, 0x3105, 0x300, 0))
+
+        recorder.detach()
+        self.assertNotIn('instruction_lookup', vm.opcode.__dict__)
+
+    def test_dump(self):
+        vm = Chip8(assemble(OUT_OF_BOUNDS), headless=True)
+        recorder = FlightRecorder(vm)
+        recorder.attach()
+        error = run_until_error(vm)
+
+        fname = os.path.join(self.tmp, 'crash.txt')
+        recorder.dump(fname, error)
+        with open(fname) as f:
+            dump = f.read()
+        self.assertIn('Error: ValueError', dump)
+        self.assertIn('Faulting instruction: 202 after 2 instructions', dump)
+        self.assertIn('> 202: F155  LDIR V1', dump)
+        self.assertIn('I=FFF PC=204', dump)
+        self.assertIn('Last 2 instructions:', dump)
+        self.assertIn('  200: AFFF', dump)
+        self.assertIn('Screen:', dump)
+
+
+if __name__ == '__main__':
+    unittest.main()
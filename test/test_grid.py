@@ -0,0 +1,82 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+import pygame
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.display import COLORS, KEY_MAP
+from chip8.grid import BORDER, BORDER_COLORS, GridDisplay
+
+# Draws the digit of the pressed key once, then waits for the next key
+KEYS = """
+    loop:   ldk v0
+            cls
+            ldf v0
+            drw v1, v1, 5
+            jmp loop
+"""
+
+
+class TestGridDisplay(unittest.TestCase):
+    def setUp(self):
+        self.vms = [Chip8(assemble(KEYS), headless=True) for _ in range(5)]
+        self.grid = GridDisplay(self.vms, scale=2)
+        self.grid.init_display()
+        pygame.event.clear()
+
+    def test_layout(self):
+        self.assertEqual((self.grid.columns, self.grid.rows), (3, 2))
+        self.assertEqual(self.grid.tiles[4].rect.topleft, (132, 68))
+        self.assertEqual(self.grid.surface.get_size(), (3 * 132, 2 * 68))
+
+    def test_only_changed_tiles(self):
+        self.grid.emulate()
+        self.assertEqual(self.grid.present(), 5)
+        self.grid.emulate()
+        self.assertEqual(self.grid.present(), 0)
+
+        self.vms[3].keys = 1 << 0xF
+        self.grid.emulate()
+        self.assertEqual(self.grid.present(), 1)
+
+        screen = self.grid.tiles[3].screen
+        self.assertEqual(self.grid.surface.get_at(screen.topleft), COLORS[1])
+        self.assertEqual(self.grid.surface.get_at(self.grid.tiles[2].screen.topleft), COLORS[0])
+
+    def test_focus(self):
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_TAB))
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=KEY_MAP[0x5]))
+        self.assertTrue(self.grid.handle_events())
+        self.assertEqual(self.grid.focus, 1)
+        self.assertEqual([vm.keys for vm in self.vms], [0, 1 << 5, 0, 0, 0])
+
+        pos = self.grid.tiles[4].rect.center
+        pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1))
+        self.assertTrue(self.grid.handle_events())
+        self.assertEqual(self.grid.focus, 4)
+        self.assertEqual(self.vms[1].keys, 0)
+
+        self.grid.present()
+        corner = self.grid.tiles[4].rect.topleft
+        self.assertEqual(self.grid.surface.get_at(corner), BORDER_COLORS['focus'])
+
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_ESCAPE))
+        self.assertFalse(self.grid.handle_events())
+
+    def test_error(self):
+        self.vms[2].mem.store_word(0x200, 0x0000)
+        self.grid.emulate()
+        self.assertIsNotNone(self.grid.tiles[2].error)
+        self.grid.present()
+        corner = self.grid.tiles[2].rect.move(BORDER - 1, BORDER - 1).topleft
+        self.assertEqual(self.grid.surface.get_at(corner), BORDER_COLORS['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.halt import HALTED, WAITING, idle_loop
+from chip8.recorder import Replay, play_replay
+
+
+def vm_at(source, **registers):
+    vm = Chip8(assemble(source), headless=True)
+    for name, value in registers.items():
+        setattr(vm, name, value)
+    return vm
+
+
+class TestIdleLoop(unittest.TestCase):
+
+    def test_self_jump(self):
+        self.assertEqual(idle_loop(vm_at('loop: jmp loop')), HALTED)
+
+    def test_timers(self):
+        self.assertIsNone(idle_loop(vm_at('loop: jmp loop', dt=3)))
+        self.assertIsNone(idle_loop(vm_at('loop: jmp loop', st=1)))
+
+    def test_register_loop(self):
+        # V0 never changes, so the SE always falls through to the JMP
+        self.assertEqual(idle_loop(vm_at('loop: se v0, 1\njmp loop\ncls')), HALTED)
+        vm = vm_at('loop: se v0, 1\njmp loop\ncls')
+        vm.v[0] = 1
+        self.assertIsNone(idle_loop(vm))
+
+    def test_key_polling(self):
+        source = 'loop: sknp v0\njmp done\njmp loop\ndone: cls'
+        vm = vm_at(source)
+        self.assertEqual(idle_loop(vm), WAITING)
+        vm.keys = 1
+        self.assertIsNone(idle_loop(vm))
+
+    def test_key_wait(self):
+        vm = vm_at('ldk v1')
+        self.assertEqual(idle_loop(vm), WAITING)
+        vm.keys = 1 << 4
+        self.assertIsNone(idle_loop(vm))
+
+    def test_side_effects(self):
+        self.assertIsNone(idle_loop(vm_at('loop: add v0, 1\njmp loop')))
+        self.assertIsNone(idle_loop(vm_at('loop: drw v0, v0, 1\njmp loop')))
+
+
+class TestRunHeadless(unittest.TestCase):
+
+    def test_halted_at(self):
+        vm = Chip8(assemble("""
+                    ld v0, 20
+            loop:   add v0, -1
+                    se v0, 0
+                    jmp loop
+            end:    jmp end
+        """), headless=True)
+        # The cycle the loop was entered at (not the end of the frame)
+        self.assertEqual(vm.run_headless(cycles_per_frame=16), 60)
+        self.assertEqual(vm.pc, 0x208)
+
+    def test_replay_stops(self):
+        vm = Chip8(assemble('ldk v1\nend: jmp end'), headless=True)
+        replay = Replay(None, 'chip8', 0, 4, {3: 1 << 5, 4: 0}, 1000)
+        self.assertEqual(play_replay(vm, replay), 5)
+        self.assertEqual(vm.v[1], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
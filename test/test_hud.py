@@ -0,0 +1,126 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+import pygame
+
+from chip8.assembler import assemble
+from chip8.chip8 import HUD_KEY, Chip8
+from chip8.display import COLORS
+from chip8.hud import HUD_COLORS, HUD_SCALE, Hud
+from chip8.memo import MemoOpcode
+from chip8.timeline import Timeline
+
+# Draws the same sprite twice & clears the screen
+PROGRAM = """
+    loop:   ldf v0
+            drw v0, v0, 5
+            drw v0, v0, 5
+            cls
+            jmp loop
+"""
+
+
+class TestHud(unittest.TestCase):
+
+    def run_frames(self, vm, metrics, frames, cycles=5):
+        for _ in range(frames):
+            for _ in range(cycles):
+                vm.cycle()
+            metrics.frame(cycles, 0.002)
+            vm.end_frame()
+
+    def test_sample(self):
+        vm = Chip8(assemble(PROGRAM), headless=True)
+        hud = Hud(vm)
+        hud.show()
+        self.run_frames(vm, hud.metrics, 4)
+
+        sample = hud.sample()
+        self.assertEqual((sample.cycles, sample.draws), (5, 2))
+        self.assertAlmostEqual(sample.emulate, 0.002)
+        self.assertEqual(sample.present, 0)
+        self.assertGreater(sample.ips, 0)
+        self.assertGreaterEqual(sample.jitter, 0)
+
+        # The next sample covers only the new frames
+        self.run_frames(vm, hud.metrics, 2, cycles=10)
+        sample = hud.sample()
+        self.assertEqual((sample.cycles, sample.draws), (10, 4))
+
+    def test_hidden_is_detached(self):
+        vm = Chip8(assemble(PROGRAM), headless=True)
+        listeners = vm.frame_listeners
+        hud = Hud(vm)
+        hud.show()
+        self.assertIn('flip', vm.display.__dict__)
+        self.assertIn('draw_sprite', vm.display.__dict__)
+
+        hud.toggle()
+        self.assertFalse(hud.visible)
+        self.assertEqual(vm.frame_listeners, listeners)
+        self.assertNotIn('flip', vm.display.__dict__)
+        self.assertNotIn('draw_sprite', vm.display.__dict__)
+
+        self.run_frames(vm, hud.metrics, 2)
+        self.assertEqual(hud.metrics.draws, 0)
+
+    def test_wrapped_flip(self):
+        vm = Chip8(assemble(PROGRAM), headless=True)
+        timeline = Timeline(vm)
+        timeline.attach()
+        traced = vm.display.flip
+        hud = Hud(vm, timeline.metrics)
+
+        # The wrapper swapped before the HUD is restored
+        hud.show()
+        hud.hide()
+        self.assertIs(vm.display.flip, traced)
+
+        timeline.detach()
+
+        # The wrapper swapped over the HUD is kept
+        hud.show()
+        timeline.attach()
+        hud.hide()
+        vm.display.flip()
+        self.assertEqual([span[0] for span in timeline.spans()], ['flip'])
+        timeline.detach()
+
+    def test_glyphs_rendered_once(self):
+        vm = Chip8(assemble(PROGRAM), headless=True, engine=MemoOpcode)
+        hud = Hud(vm)
+        hud.show()
+        glyphs = hud.glyphs
+        hud.hide()
+        hud.show()
+        hud.update()
+        self.assertIs(hud.glyphs, glyphs)
+        self.assertEqual(hud.engine, 'MEMOOPCODE')
+
+    def test_toggle_overlay(self):
+        vm = Chip8(assemble(PROGRAM))
+        vm.hud = Hud(vm)
+        pygame.event.clear()
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=HUD_KEY))
+        self.assertTrue(vm.handle_events())
+        self.assertTrue(vm.hud.visible)
+
+        # The first label pixel (I) is drawn over the screen at the flip
+        surface = vm.display.surface
+        point = (2 * HUD_SCALE, 2 * HUD_SCALE)
+        vm.display.clear_display()
+        self.assertEqual(surface.get_at(point)[:3], HUD_COLORS[1][:3])
+
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=HUD_KEY))
+        self.assertTrue(vm.handle_events())
+        self.assertFalse(vm.hud.visible)
+        self.assertEqual(surface.get_at(point), COLORS[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+import pygame
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.latency import STAGES, LatencyProbe, measure, percentile
+
+# Draws the digit when the key 5 is pressed, then waits for its release
+KEY5 = """
+    wait:   ld v0, 5
+            sknp v0
+            jmp pressed
+            jmp wait
+    pressed: cls
+            ldf v0
+            drw v1, v1, 5
+    release: sknp v0
+            jmp release
+            jmp wait
+"""
+
+
+class TestLatencyProbe(unittest.TestCase):
+
+    def setUp(self):
+        self.vm = Chip8(assemble(KEY5))
+        pygame.event.clear()
+
+    def test_percentile(self):
+        values = [0.1 * i for i in range(1, 11)]
+        self.assertAlmostEqual(percentile(values, 50), 0.5)
+        self.assertAlmostEqual(percentile(values, 99), 1.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_stages(self):
+        probe = LatencyProbe(self.vm)
+        probe.attach()
+        for _ in range(8):
+            self.vm.cycle()
+        probe.inject(5)
+        self.assertTrue(self.vm.handle_events())
+        for _ in range(8):
+            self.vm.cycle()
+
+        event = probe.events[0]
+        self.assertTrue(all(event[index] is not None for index in range(1, 6)))
+        self.assertEqual(sorted(event[1:]), event[1:])
+        self.assertEqual([len(probe.latencies(stage)) for stage in STAGES], [1, 1, 1, 1])
+
+        # The key isn't read again until it's released & pressed
+        probe.inject(5, pressed=False)
+        probe.inject(5)
+        self.assertEqual(len(probe.events), 2)
+        self.assertIsNone(probe.events[1][2])
+
+        probe.detach()
+        self.assertNotIn('flip', self.vm.display.__dict__)
+        self.assertNotIn('instruction_lookup', self.vm.opcode.__dict__)
+        self.assertNotIn('handle_events', self.vm.__dict__)
+
+    def test_measure(self):
+        # The presses are held longer than the input is polled by the threaded runner
+        for threaded, hold in ((False, 10), (True, 60)):
+            vm = Chip8(assemble(KEY5))
+            probe = measure(vm, 5, events=3, interval=2 * hold, hold=hold, delay=0,
+                            threaded=threaded)
+            self.assertEqual(len(probe.events), 3)
+            self.assertEqual(len(probe.latencies('present')), 3)
+            self.assertEqual(len(probe.report()), len(STAGES))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+from chip8.disassembler import disassemble
+from chip8.lockstep import Lockstep, format_divergence, state_diff, state_digest
+from chip8.opcode import Opcode
+
+PROGRAM = [
+    0x60, 0x00,  # LD V0, 0x00
+    0x70, 0x07,  # ADD V0, 0x07
+    0xC1, 0xFF,  # RND V1, 0xFF
+    0xA3, 0x00,  # LD I, 0x300
+    0xF0, 0x33,  # LD B, V0
+    0x40, 0x15,  # SNE V0, 0x15
+    0x12, 0x10,  # JP 0x210
+    0x12, 0x02,  # JP 0x202
+    0xE2, 0x9E,  # SKP V2
+    0x12, 0x10,  # JP 0x210
+    0x12, 0x00   # JP 0x200
+]
+
+
+class BrokenBCD(Opcode):
+    """Engine with the BCD tens & ones digits swapped."""
+
+    def LDB(self):
+        vx = (self.opcode >> 8) & 0xf
+        self.vm.mem.store_byte(self.vm.i, self.vm.v[vx] // 100)
+        self.vm.mem.store_byte(self.vm.i + 1, self.vm.v[vx] % 10)
+        self.vm.mem.store_byte(self.vm.i + 2, (self.vm.v[vx] // 10) % 10)
+        return True
+
+
+class TestLockstep(unittest.TestCase):
+
+    def test_same_engines(self):
+        harness = Lockstep.from_program(PROGRAM)
+        self.assertIsNone(harness.run(1000, {100: 0x1}))
+        self.assertEqual(harness.cycles, 1000)
+
+    def test_divergence(self):
+        harness = Lockstep.from_program(PROGRAM, Opcode, BrokenBCD)
+        divergence = harness.run(1000)
+
+        self.assertIsNotNone(divergence)
+        self.assertEqual(divergence.cycle, 5)
+        self.assertEqual(divergence.trail[-1], (0x208, 0xF033))
+        self.assertEqual(divergence.diff, ['[301]: 00 != 07', '[302]: 07 != 00'])
+        self.assertIn('LDB V0', format_divergence(divergence))
+
+    def test_block_divergence(self):
+        harness = Lockstep.from_program(PROGRAM, Opcode, BrokenBCD, granularity='block')
+        divergence = harness.run(1000)
+
+        self.assertIsNotNone(divergence)
+        # Compared after the SNE skip which ends the block
+        self.assertEqual(divergence.cycle, 6)
+        self.assertEqual(divergence.trail[-2:], [(0x208, 0xF033), (0x20A, 0x4015)])
+
+    def test_error_divergence(self):
+        harness = Lockstep.from_program([0x00, 0x00])
+        self.assertIsNone(harness.run(10))
+
+        harness.vm_b.mem.store_word(0x200, 0x00E0)
+        harness.vm_a.pc = harness.vm_b.pc = 0x200
+        divergence = harness.run(10)
+        self.assertIn('InvalidOpcodeException', divergence.diff[0])
+
+    def test_stack_diff(self):
+        harness = Lockstep.from_program(PROGRAM)
+        harness.vm_b.stack[3] = 0x2AB
+        self.assertNotEqual(state_digest(harness.vm_a), state_digest(harness.vm_b))
+        self.assertEqual(state_diff(harness.vm_a, harness.vm_b), ['stack[3]: 000 != 2AB'])
+
+    def test_disassemble(self):
+        self.assertEqual(disassemble(0x00E0), 'CLS')
+        self.assertEqual(disassemble(0x1234), 'JMP 0x234')
+        self.assertEqual(disassemble(0x6A0F), 'LD VA, 0x0F')
+        self.assertEqual(disassemble(0x8AB4), 'ADDR VA, VB')
+        self.assertEqual(disassemble(0xD125), 'DRW V1, V2, 5')
+        self.assertEqual(disassemble(0xE1A1), 'SKNP V1')
+        self.assertEqual(disassemble(0xF265), 'LDRI V2')
+        self.assertEqual(disassemble(0x800F), 'DW 0x800F')
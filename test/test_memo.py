@@ -0,0 +1,139 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+from chip8.analysis import pure_subroutine
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.lockstep import Lockstep
+from chip8.memo import MemoOpcode
+from chip8.opcode import Opcode
+from chip8.recorder import Replay, play_replay
+from chip8.threaded import ThreadedRunner
+
+# Sums V6 * 3 for V6 = 0..7, four times (V2 = V0 * V1 in the mul subroutine)
+PROGRAM = """
+            ld v0, 0xff
+            lddt v0
+    outer:  ld v6, 0
+    loop:   ldr v0, v6
+            ld v1, 3
+            call mul
+            addr v7, v2
+            add v6, 1
+            se v6, 8
+            jmp loop
+            add v8, 1
+            se v8, 4
+            jmp outer
+    halt:   jmp halt
+    mul:    ld v2, 0
+            ld v3, 0
+    mloop:  ser v3, v1
+            jmp mbody
+            ret
+    mbody:  addr v2, v0
+            add v3, 1
+            jmp mloop
+"""
+
+MUL = 0x21c
+
+
+def run_to_halt(vm, limit=10000):
+    halt = MUL - 2
+    for _ in range(limit):
+        if vm.pc == halt:
+            return
+        vm.cycle()
+    raise AssertionError('halt not reached')
+
+
+class TestPureSubroutine(unittest.TestCase):
+    def test_pure(self):
+        vm = Chip8(assemble(PROGRAM), headless=True)
+        effects = pure_subroutine(vm.mem._mem, MUL)
+        self.assertEqual(effects.registers, (0, 1, 2, 3, 0xf))
+        self.assertFalse(effects.index)
+        self.assertEqual((effects.start, effects.end), (MUL, MUL + 16))
+
+    def test_impure(self):
+        for body in ('drw v0, v1, 1\nret', 'rnd v0, 1\nret', 'ldb v0\nret', 'ldt v0\nret',
+                     'sknp v0\nret', 'call 0x200', 'loop: jmp loop'):
+            vm = Chip8(assemble(body), headless=True)
+            self.assertIsNone(pure_subroutine(vm.mem._mem, 0x200), body)
+
+    def test_index(self):
+        vm = Chip8(assemble('ldf v4\naddi v5\nret'), headless=True)
+        self.assertEqual(pure_subroutine(vm.mem._mem, 0x200).registers, (4, 5))
+        self.assertTrue(pure_subroutine(vm.mem._mem, 0x200).index)
+
+
+class TestMemoOpcode(unittest.TestCase):
+    def setUp(self):
+        self.vm = Chip8(assemble(PROGRAM), headless=True)
+        self.memo = Chip8(assemble(PROGRAM), headless=True, engine=MemoOpcode)
+
+    def test_same_state(self):
+        run_to_halt(self.vm)
+        run_to_halt(self.memo)
+        self.assertEqual(self.memo.v[7], 4 * 3 * 28 & 0xff)
+        self.assertEqual(self.memo.state.block, self.vm.state.block)
+        self.assertGreater(self.memo.opcode.hits, 0)
+        self.assertEqual(self.memo.opcode.hits + self.memo.opcode.misses, 32)
+
+    def test_frame_cycles(self):
+        # The cycles of the memoized calls count towards the frames
+        result = self.vm.run_until()
+        memo = self.memo.run_until()
+        self.assertEqual(memo.reason, 'halted')
+        self.assertGreater(self.memo.opcode.hits, 0)
+        self.assertLess(abs(memo.cycles - result.cycles), self.vm.cycles_per_frame)
+        self.assertLessEqual(abs(memo.frames - result.frames), 1)
+
+    def test_runners(self):
+        # Run, the threaded runner & the replay end the same frames
+        frames = 10
+        self.memo.handle_events = lambda: self.memo.frame < frames
+        self.memo.run(0, cycles_per_frame=30)
+
+        threaded = Chip8(assemble(PROGRAM), headless=True, engine=MemoOpcode)
+        runner = ThreadedRunner(threaded, cycles_per_frame=30)
+        for _ in range(frames):
+            runner._frame()
+        replayed = Chip8(assemble(PROGRAM), headless=True, engine=MemoOpcode)
+        play_replay(replayed, Replay(None, None, None, 30, {}, frames))
+
+        for vm in (threaded, replayed):
+            self.assertEqual(vm.state.block, self.memo.state.block)
+            self.assertEqual(vm.frame_cycles, self.memo.frame_cycles)
+        self.assertLess(self.memo.frame_cycles, 30)
+        self.assertGreater(self.memo.opcode.hits, 0)
+
+    def test_lockstep(self):
+        harness = Lockstep.from_program(assemble(PROGRAM), engine_b=MemoOpcode)
+        self.assertIsNone(harness.run(2000))
+        self.assertGreater(harness.vm_b.opcode.hits, 0)
+
+    def test_code_write_invalidates(self):
+        for vm in (self.vm, self.memo):
+            run_to_halt(vm)
+            vm.mem.store_word(MUL, 0x6201)  # ld v2, 1
+            vm.pc = 0x204
+            vm.v[8] = 0
+            run_to_halt(vm)
+        self.assertEqual(self.memo.state.block, self.vm.state.block)
+
+    def test_lru(self):
+        memo = Chip8(assemble(PROGRAM), headless=True, engine=lambda vm: MemoOpcode(vm, 4))
+        run_to_halt(memo)
+        self.assertEqual(len(memo.opcode.cache), 4)
+        self.assertIsInstance(memo.opcode, Opcode)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,7 @@
 # This software is released under the MIT license.
 
 import unittest
-from chip8.memory import Memory
+from chip8.memory import PAGE_SIZE, Memory, PagedMemory, split_pages
 
 
 class TestVMMemory(unittest.TestCase):
@@ -108,3 +108,43 @@ class TestVMMemory(unittest.TestCase):
         self.assertEqual(self.mem.fetch_many(0x0, 3), bytearray([0xaa, 0xbb, 0xcc]))
         self.assertEqual(self.mem.fetch_many(0x2, 3), bytearray([0xcc, 0x00, 0x00]))
         self.assertEqual(self.mem.fetch_many(0xffe, 2), bytearray([0x00, 0x00]))
+
+
+class TestPagedMemory(TestVMMemory):
+
+    def setUp(self):
+        self.image = split_pages(bytearray(0x1000))
+        self.mem = PagedMemory(self.image)
+
+    def test_copy_on_write(self):
+        other = PagedMemory(self.image)
+        self.mem.store_many(PAGE_SIZE - 1, [0x11, 0x22])
+        self.assertEqual(self.mem.fetch_word(PAGE_SIZE - 1), 0x1122)
+        self.assertEqual(self.mem.fetch_many(PAGE_SIZE - 2, 3), bytearray([0, 0x11, 0x22]))
+
+        # The shared pages are left untouched
+        self.assertEqual(other.fetch_word(PAGE_SIZE - 1), 0)
+        self.assertEqual(sum(map(sum, self.image)), 0)
+        self.assertEqual(self.mem.dirty_pages(), [0, 1])
+        self.assertIs(self.mem.pages[2], other.pages[2])
+
+        self.mem.clear_dirty()
+        self.mem.fetch_many(0, 0x1000)
+        self.assertEqual(self.mem.dirty_pages(), [])
+
+    def test_copy_and_load(self):
+        self.mem.store_byte(0x300, 0xaa)
+        snapshot = self.mem.copy()
+        self.assertIs(snapshot.pages[3], self.mem.pages[3])
+
+        # Both copies write into their own page
+        self.mem.store_byte(0x300, 0xbb)
+        self.assertEqual(snapshot.fetch_byte(0x300), 0xaa)
+        snapshot.store_byte(0x301, 0xcc)
+        self.assertEqual(self.mem.fetch_byte(0x301), 0)
+
+        self.mem.clear_dirty()
+        self.mem.load(snapshot)
+        self.assertEqual(self.mem.fetch_word(0x300), 0xaacc)
+        self.assertEqual(self.mem.dirty_pages(), [3])
+        self.assertEqual(self.mem._mem[0x300], 0xaa)
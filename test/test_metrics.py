@@ -0,0 +1,135 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from urllib.request import urlopen
+except ImportError:
+    from urllib2 import urlopen
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.metrics import (Histogram, Metrics, MetricsFileWriter, MetricsServer,
+                           format_prometheus)
+
+# Draws the same sprite twice (the second DRW collides) & clears the screen
+PROGRAM = """
+    loop:   ldf v0
+            drw v0, v0, 5
+            drw v0, v0, 5
+            cls
+            jmp loop
+"""
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.vm = Chip8(assemble(PROGRAM), headless=True)
+        self.metrics = Metrics()
+
+    def run_frames(self, frames, cycles=5):
+        for _ in range(frames):
+            for _ in range(cycles):
+                self.vm.cycle()
+            self.metrics.frame(cycles, 0.002)
+
+    def test_histogram(self):
+        histogram = Histogram((1.0, 2.0, 4.0))
+        self.assertEqual(histogram.quantile(0.5), 0.0)
+        for value in (0.5, 1.5, 1.5, 3.0, 10.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        self.assertEqual(histogram.count, 5)
+        self.assertAlmostEqual(histogram.quantile(0.5), 1.75)
+        self.assertAlmostEqual(histogram.quantile(0.1), 0.5)
+        self.assertEqual(histogram.quantile(0.99), 4.0)
+
+    def test_counters(self):
+        self.metrics.attach(self.vm)
+        self.run_frames(4)
+        self.assertEqual((self.metrics.frames, self.metrics.instructions), (4, 20))
+        self.assertEqual((self.metrics.draws, self.metrics.clears), (8, 4))
+        self.assertEqual(self.metrics.collisions, 4)
+
+        # The original methods are restored
+        self.metrics.detach()
+        self.assertNotIn('draw_sprite', self.vm.display.__dict__)
+        self.assertNotIn('handle_events', self.vm.__dict__)
+        self.run_frames(1)
+        self.assertEqual(self.metrics.draws, 8)
+
+    def test_clipped_sprites(self):
+        quirks = self.vm.quirks._replace(clip_sprites=True)
+        vm = Chip8(assemble(PROGRAM), headless=True, quirks=quirks)
+        self.metrics.attach(vm)
+        for _ in range(5):
+            vm.cycle()
+        self.assertEqual(self.metrics.draws, 2)
+        self.metrics.detach()
+        self.assertNotIn('draw_sprite', vm.display.__dict__)
+
+    def test_input_latency(self):
+        self.metrics.input()
+        self.metrics.input()
+        self.metrics.present(0.001)
+        self.metrics.present(0.001)
+        self.assertEqual(self.metrics.input_latency.count, 1)
+        self.assertEqual(self.metrics.frame_present.count, 2)
+
+    def test_prometheus(self):
+        self.metrics.attach(self.vm)
+        self.run_frames(2)
+        self.metrics.drop(3)
+        text = format_prometheus(self.metrics)
+
+        self.assertIn('# TYPE chip8_instructions_total counter\nchip8_instructions_total 10\n', text)
+        self.assertIn('chip8_draws_total 4\n', text)
+        self.assertIn('chip8_dropped_total 3\n', text)
+        self.assertIn('chip8_frame_emulate_seconds_bucket{le="0.0025"} 2\n', text)
+        self.assertIn('chip8_frame_emulate_seconds_bucket{le="+Inf"} 2\n', text)
+        self.assertIn('chip8_frame_emulate_seconds_count 2\n', text)
+        self.assertIn('chip8_frame_emulate_quantile_seconds{quantile="0.99"}', text)
+        self.assertIn('chip8_instructions_per_second ', text)
+
+    def test_instructions_per_second(self):
+        self.run_frames(4)
+        self.metrics.started -= 2.0
+        # The scrapes don't change each other's rate
+        for _ in range(2):
+            self.assertAlmostEqual(self.metrics.instructions_per_second(), 10.0, places=1)
+
+    def test_run_without_sleeps(self):
+        self.vm.handle_events = lambda: False  # Quits after the first frame
+        self.vm.run(2, cycles_per_frame=5, metrics=self.metrics)
+        # The 10ms of the pacing sleeps aren't reported as the emulation
+        self.assertEqual(self.metrics.frame_emulate.count, 1)
+        self.assertLess(self.metrics.frame_emulate.sum, 0.005)
+
+    def test_server(self):
+        server = MetricsServer(self.metrics, 0)
+        try:
+            self.run_frames(1)
+            response = urlopen('http://127.0.0.1:{}/metrics'.format(server.port))
+            self.assertIn(b'chip8_frames_total 1\n', response.read())
+        finally:
+            server.close()
+
+    def test_file(self):
+        path = tempfile.mkdtemp()
+        try:
+            fname = os.path.join(path, 'chip8.prom')
+            writer = MetricsFileWriter(self.metrics, fname, interval=60)
+            self.run_frames(3)
+            writer.close()
+            with open(fname) as f:
+                self.assertIn('chip8_frames_total 3\n', f.read())
+        finally:
+            shutil.rmtree(path)
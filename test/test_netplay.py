@@ -0,0 +1,181 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.lockstep import state_digest
+from chip8.netplay import NetplayException, NetplaySession
+
+# Counts the frames with the keys 1 (player 1) & C (player 2) pressed,
+# mixed with the random numbers, one loop per frame
+PROGRAM = """
+    loop:   ld v0, 1
+            sknp v0
+            add v2, 1
+            ld v0, 0xc
+            sknp v0
+            add v3, 1
+            rnd v4, 0xff
+            addr v5, v4
+            jmp loop
+"""
+CYCLES_PER_FRAME = 9
+FRAMES = 60
+WINDOW = 4
+
+
+def script(player, frame):
+    """Returns the scripted keypad mask of the player."""
+    if player == 1:
+        return 1 << 0x1 if frame // 3 % 2 == 0 else 0
+    return 1 << 0xc if frame // 5 % 2 == 1 else 0
+
+
+def udp_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    return sock
+
+
+def new_session(sock, port, seed=1):
+    vm = Chip8(assemble(PROGRAM), headless=True, seed=seed)
+    return NetplaySession(vm, sock, ('127.0.0.1', port), CYCLES_PER_FRAME, WINDOW)
+
+
+def play(session, player, frames=FRAMES):
+    """Plays the scripted frames as fast as the peer allows."""
+    while session.frame < frames:
+        if not session.advance(script(player, session.frame)):
+            time.sleep(0.001)
+    return session.settle()
+
+
+def peer(player, port):
+    """Body of the peer process: prints its port, plays & prints the state digest."""
+    sock = udp_socket()
+    print(sock.getsockname()[1])
+    sys.stdout.flush()
+    session = new_session(sock, port)
+    session.handshake(timeout=10.0)
+    play(session, player)
+    print(state_digest(session.vm))
+
+
+class TestNetplay(unittest.TestCase):
+
+    def setUp(self):
+        self.sockets = [udp_socket(), udp_socket()]
+        self.ports = [sock.getsockname()[1] for sock in self.sockets]
+
+    def tearDown(self):
+        for sock in self.sockets:
+            sock.close()
+
+    def reference(self, frames=FRAMES):
+        vm = Chip8(assemble(PROGRAM), headless=True, seed=1)
+        for frame in range(frames):
+            vm.keys = script(1, frame) | script(2, frame)
+            for _ in range(CYCLES_PER_FRAME):
+                vm.cycle()
+            vm.end_frame()
+        return vm
+
+    def test_rollback(self):
+        a = new_session(self.sockets[0], self.ports[1])
+        b = new_session(self.sockets[1], self.ports[0])
+
+        # The peers take turns emulating 3 & 4 frames, so both get ahead
+        # & predict the other's input of the last frames
+        while a.frame < FRAMES or b.frame < FRAMES:
+            for _ in range(3):
+                if a.frame < FRAMES:
+                    a.advance(script(1, a.frame))
+            for _ in range(4):
+                if b.frame < FRAMES:
+                    b.advance(script(2, b.frame))
+        settled = []
+        thread = threading.Thread(target=lambda: settled.append(b.settle(timeout=1.0)))
+        thread.start()
+        self.assertTrue(a.settle(timeout=1.0))
+        thread.join()
+        self.assertEqual(settled, [True])
+
+        reference = self.reference()
+        self.assertEqual(state_digest(a.vm), state_digest(reference))
+        self.assertEqual(state_digest(b.vm), state_digest(reference))
+        self.assertGreater(a.rollbacks, 0)
+        self.assertGreater(b.rollbacks, 0)
+        self.assertLessEqual(a.resimulated, a.rollbacks * WINDOW)
+        self.assertLess(a.max_rollback, 1.0 / 60)
+        self.assertEqual(a.vm.frame, FRAMES)
+
+    def test_window(self):
+        a = new_session(self.sockets[0], self.ports[1])
+        for frame in range(WINDOW):
+            self.assertTrue(a.advance(0))
+        self.assertFalse(a.advance(0))  # Too far ahead of the silent peer
+        self.assertEqual(a.frame, WINDOW)
+
+    def test_handshake(self):
+        a = new_session(self.sockets[0], self.ports[1])
+        b = new_session(self.sockets[1], self.ports[0])
+        thread = threading.Thread(target=b.handshake, args=(5.0,))
+        thread.start()
+        a.handshake(timeout=5.0)
+        thread.join()
+
+        # Another seed
+        a.poll()  # Drops the late hellos
+        c = new_session(self.sockets[1], self.ports[0], seed=2)
+        c.sock.sendto(b'C8HI' + b'\0' * 10, ('127.0.0.1', self.ports[0]))  # Malformed
+        errors = []
+
+        def handshake():
+            try:
+                c.handshake(timeout=1.0)
+            except NetplayException as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=handshake)
+        thread.start()
+        with self.assertRaises(NetplayException):
+            a.handshake(timeout=1.0)
+        thread.join()
+        self.assertEqual(len(errors), 1)
+
+    def test_processes(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join([root, os.path.join(root, 'test')])
+        env['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+        process = subprocess.Popen(
+            [sys.executable, '-c', 'import test_netplay; test_netplay.peer(2, {})'.format(self.ports[0])],
+            cwd=root, env=env, stdout=subprocess.PIPE, universal_newlines=True)
+        try:
+            line = process.stdout.readline()
+            while not line.strip().isdigit():  # The pygame banner
+                line = process.stdout.readline()
+            a = new_session(self.sockets[0], int(line))
+            a.handshake(timeout=10.0)
+            self.assertTrue(play(a, 1))
+            output = process.stdout.read().split()
+        finally:
+            process.wait()
+        self.assertEqual(process.returncode, 0)
+        self.assertEqual(int(output[-1]), state_digest(a.vm))
+        self.assertEqual(state_digest(a.vm), state_digest(self.reference()))
+
+
+if __name__ == '__main__':
+    unittest.main()
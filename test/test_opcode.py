@@ -5,8 +5,10 @@
 # This software is released under the MIT license.
 
 import unittest
-from chip8.opcode import InvalidOpcodeException, Opcode
+from chip8.opcode import (InvalidOpcodeException, Opcode, StackOverflowException,
+                          StackUnderflowException)
 from chip8.chip8 import Chip8
+from chip8.state import STACK_DEPTH
 
 
 class TestOpcode(unittest.TestCase):
@@ -52,18 +54,19 @@ class TestOpcode(unittest.TestCase):
         00EE - RET
         Return from a subroutine.
         """
-        # Sets stack pointer to n >= 2
+        # Checks empty stack
+        with self.assertRaises(StackUnderflowException):
+            self.vm_opcode.instruction_lookup(0x00EE)
+
+        # Sets stack pointer to n >= 1
+        self.vm_opcode.vm.stack[1] = 0x345
         self.vm_opcode.vm.sp = 2
 
         sp_addr = self.vm_opcode.vm.sp
         self.vm_opcode.instruction_lookup(0x00EE)
 
-        self.assertEqual(self.vm_opcode.vm.sp, sp_addr - 2)
-
-        self.assertEqual(
-            self.vm_opcode.vm.pc,
-            self.vm_opcode.vm.mem.fetch_word(self.vm_opcode.vm.sp)
-        )
+        self.assertEqual(self.vm_opcode.vm.sp, sp_addr - 1)
+        self.assertEqual(self.vm_opcode.vm.pc, 0x345)
 
     def test_jmp_instruction(self):
         """
@@ -87,9 +90,14 @@ class TestOpcode(unittest.TestCase):
         pc_addr = self.vm_opcode.vm.pc
         self.vm_opcode.instruction_lookup(0x2fff)
 
-        self.assertEqual(self.vm_opcode.vm.sp, sp_addr + 2)
+        self.assertEqual(self.vm_opcode.vm.sp, sp_addr + 1)
         self.assertEqual(self.vm_opcode.vm.pc, 0xfff)
-        self.assertEqual(self.vm_opcode.vm.mem.fetch_word(sp_addr), pc_addr)
+        self.assertEqual(self.vm_opcode.vm.stack[sp_addr], pc_addr)
+
+        # Checks full stack
+        self.vm_opcode.vm.sp = STACK_DEPTH
+        with self.assertRaises(StackOverflowException):
+            self.vm_opcode.instruction_lookup(0x2fff)
 
     def test_se_instruction(self):
         """
@@ -321,7 +329,7 @@ class TestOpcode(unittest.TestCase):
         Set Vx = random byte AND kk.
         """
         self.vm_opcode.instruction_lookup(0xC1FF)
-        self.assertIn(self.vm_opcode.vm.v[1], xrange(0, 0xff + 1))
+        self.assertIn(self.vm_opcode.vm.v[1], range(0, 0xff + 1))
 
     def test_drw_instruction(self):
         """
@@ -329,14 +337,43 @@ class TestOpcode(unittest.TestCase):
         Display n-byte sprite starting at memory location I at (Vx, Vy),
         set VF = collision.
         """
-        pass
+        self.vm_opcode.vm.i = 0x0
+        self.vm_opcode.vm.v[0x0] = 62
+        self.vm_opcode.vm.v[0x1] = 0
+
+        # Draws the "0" font sprite wrapped around the right edge
+        self.vm_opcode.instruction_lookup(0xD015)
+        display = self.vm_opcode.vm.display
+        self.assertEqual(display.get_pixel((62, 0)), 1)
+        self.assertEqual(display.get_pixel((1, 0)), 1)
+        self.assertEqual(display.get_pixel((62, 1)), 1)
+        self.assertEqual(display.get_pixel((63, 1)), 0)
+        self.assertEqual(self.vm_opcode.vm.v[0xf], 0)
+
+        # Draws it again, erases the pixels
+        self.vm_opcode.instruction_lookup(0xD015)
+        self.assertEqual(display.get_pixel((62, 0)), 0)
+        self.assertEqual(self.vm_opcode.vm.v[0xf], 1)
+        self.assertEqual(sum(display.pixels), 0)
 
     def test_skp_instruction(self):
         """
         Ex9E - SKP Vx or ExA1 - SKNP Vx
         Skip next instruction if key with the value of Vx is (not) pressed.
         """
-        pass
+        pc = self.vm_opcode.vm.pc
+        self.vm_opcode.vm.v[0x0] = 0xa
+
+        self.vm_opcode.instruction_lookup(0xE09E)
+        self.assertEqual(self.vm_opcode.vm.pc, pc)
+        self.vm_opcode.instruction_lookup(0xE0A1)
+        self.assertEqual(self.vm_opcode.vm.pc, pc + 2)
+
+        self.vm_opcode.vm.keys = 1 << 0xa
+        self.vm_opcode.instruction_lookup(0xE09E)
+        self.assertEqual(self.vm_opcode.vm.pc, pc + 4)
+        self.vm_opcode.instruction_lookup(0xE0A1)
+        self.assertEqual(self.vm_opcode.vm.pc, pc + 4)
 
     def test_ldt_instruction(self):
         """
@@ -356,7 +393,16 @@ class TestOpcode(unittest.TestCase):
         Fx0A - LD Vx, K
         Wait for a key press, store the value of the key in Vx.
         """
-        pass
+        # Repeats the instruction until a key is pressed
+        self.vm_opcode.vm.pc = 0x202
+        self.vm_opcode.instruction_lookup(0xF30A)
+        self.assertEqual(self.vm_opcode.vm.pc, 0x200)
+
+        self.vm_opcode.vm.pc = 0x202
+        self.vm_opcode.vm.keys = 1 << 0xc
+        self.vm_opcode.instruction_lookup(0xF30A)
+        self.assertEqual(self.vm_opcode.vm.pc, 0x202)
+        self.assertEqual(self.vm_opcode.vm.v[0x3], 0xc)
 
     def test_lddt_instruction(self):
         """
@@ -421,18 +467,18 @@ class TestOpcode(unittest.TestCase):
         Store registers V0 through Vx in memory starting at location I.
         """
         self.vm_opcode.vm.i = 0x100
-        for i in xrange(len(self.vm_opcode.vm.v)):
+        for i in range(len(self.vm_opcode.vm.v)):
             self.vm_opcode.vm.v[i] = i
 
         self.vm_opcode.instruction_lookup(0xFF55)
-        for i in xrange(len(self.vm_opcode.vm.v)):
+        for i in range(len(self.vm_opcode.vm.v)):
             self.assertEqual(self.vm_opcode.vm.mem.fetch_byte(0x100 + i), i)
 
         self.vm_opcode.vm.v[0x0] = 100
         self.vm_opcode.vm.v[0x1] = 101
         self.vm_opcode.vm.v[0x2] = 102
         self.vm_opcode.instruction_lookup(0xF255)
-        for i in xrange(len(self.vm_opcode.vm.v[:2]) + 1):
+        for i in range(len(self.vm_opcode.vm.v[:2]) + 1):
             self.assertEqual(
                 self.vm_opcode.vm.mem.fetch_byte(0x100 + i), 100 + i)
 
@@ -448,7 +494,7 @@ class TestOpcode(unittest.TestCase):
 
         self.vm_opcode.instruction_lookup(0xF265)
 
-        for i in xrange(len(self.vm_opcode.vm.v[:2]) + 1):
+        for i in range(len(self.vm_opcode.vm.v[:2]) + 1):
             self.assertEqual(
                 self.vm_opcode.vm.v[i],
                 self.vm_opcode.vm.mem.fetch_byte(0x100 + i)
@@ -0,0 +1,133 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.flight import FlightRecorder
+from chip8.metrics import Metrics
+from chip8.pool import RomPool
+from chip8.quirks import PROFILES
+
+# Draws the digit & counts in V5
+COUNTER = """
+            ld v0, 7
+            ldf v0
+            drw v1, v1, 5
+    loop:   add v5, 1
+            jmp loop
+"""
+
+# Jumps with the JMP V0 quirk: 0x300 + V0 (chip8) or 0x300 + V3 (schip)
+JUMP = """
+            ld v0, 2
+            ld v3, 4
+            jmpr 0x300
+"""
+
+
+class TestReset(unittest.TestCase):
+
+    def setUp(self):
+        self.vm = Chip8(assemble(COUNTER), headless=True, seed=1)
+        self.vm.run_until(frame=3)
+
+    def test_reset(self):
+        display, engine = self.vm.display, self.vm.opcode
+        self.assertNotEqual(self.vm.v[5], 0)
+        self.vm.keys = 1
+
+        self.vm.reset()
+        self.assertEqual((self.vm.pc, self.vm.v[5], self.vm.keys, self.vm.frame), (0x200, 0, 0, 0))
+        self.assertEqual(sum(self.vm.display.pixels), 0)
+        self.assertIs(self.vm.display, display)
+        self.assertIs(self.vm.opcode, engine)
+
+        self.vm.run_until(frame=3)
+        self.assertEqual(sum(self.vm.display.pixels), 8)  # The digit 7 has 8 pixels
+
+    def test_load_rom(self):
+        recorder = FlightRecorder(self.vm, 16)
+        recorder.attach()
+        self.vm.load_rom(assemble(JUMP), PROFILES['schip'])
+        self.assertIs(self.vm.quirks, PROFILES['schip'])
+        self.assertEqual(self.vm.mem.fetch_byte(0x0), 0xF0)  # The fonts are loaded
+
+        self.vm.step(3)
+        self.assertEqual(self.vm.pc, 0x304)
+        self.assertTrue(self.vm.display.clip)
+        self.assertEqual(recorder.cycles, 3)  # Still attached
+
+        self.vm.load_rom(assemble(JUMP), PROFILES['chip8'])
+        self.vm.step(3)
+        self.assertEqual(self.vm.pc, 0x302)
+        self.assertFalse(self.vm.display.clip)
+
+    def test_load_rom_instrumented(self):
+        metrics = Metrics()
+        metrics.attach(self.vm)
+        self.vm.load_rom(assemble(COUNTER), PROFILES['schip'])
+        self.vm.step(3)
+        self.assertEqual(metrics.draws, 1)  # The wrapper is kept
+        self.vm.load_rom(assemble(COUNTER), PROFILES['chip8'])
+        self.vm.step(3)
+        self.assertEqual(metrics.draws, 2)
+        metrics.detach()
+        self.assertNotIn('draw_sprite', self.vm.display.__dict__)
+
+    def test_no_program(self):
+        clone = self.vm.clone()
+        with self.assertRaises(ValueError):
+            clone.reset()
+
+
+class TestRomPool(unittest.TestCase):
+
+    def test_prepare_and_launch(self):
+        pool = RomPool(size=2)
+        counter = pool.prepare(assemble(COUNTER))
+        jump = pool.prepare(assemble(JUMP), 'schip')
+        self.assertEqual(pool.prepare(assemble(COUNTER)), counter)
+
+        vm = Chip8(assemble(COUNTER), headless=True)
+        pool.launch(vm, jump)
+        vm.step(3)
+        self.assertEqual(vm.pc, 0x304)
+        self.assertEqual(pool.cartridges[jump].state.registers.pc, 0x200)  # Not modified
+
+        # The least recently used ROM is dropped
+        pool.prepare(assemble('jmp 0x200'))
+        self.assertEqual(len(pool), 2)
+        self.assertNotIn(counter, pool)
+        with self.assertRaises(KeyError):
+            pool.launch(vm, counter)
+
+    def test_quirks(self):
+        pool = RomPool()
+        chip8 = pool.prepare(assemble(JUMP), 'chip8')
+        schip = pool.prepare(assemble(JUMP), 'schip')
+        self.assertNotEqual(chip8, schip)
+        self.assertEqual(len(pool), 2)
+
+        vm = Chip8(assemble(COUNTER), headless=True)
+        for key, pc in ((chip8, 0x302), (schip, 0x304), (chip8, 0x302)):
+            pool.launch(vm, key)
+            vm.step(3)
+            self.assertEqual(vm.pc, pc)
+
+    def test_launch_paged(self):
+        pool = RomPool()
+        key = pool.prepare(assemble(COUNTER))
+        vm = Chip8(None, headless=True, pages=Chip8.memory_image(assemble(JUMP)))
+        pool.launch(vm, key)
+        vm.run_until(frame=1)
+        self.assertEqual(sum(vm.display.pixels), 8)
+        self.assertIs(vm.mem.pages[2], pool.cartridges[key].image[2])  # Shared
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+from chip8.chip8 import Chip8
+from chip8.quirks import PROFILES, profile_for_filename
+
+
+class TestQuirks(unittest.TestCase):
+
+    def vm(self, profile):
+        return Chip8([], headless=True, quirks=PROFILES[profile])
+
+    def test_profile_for_filename(self):
+        self.assertEqual(profile_for_filename('games/PONG.ch8'), 'chip8')
+        self.assertEqual(profile_for_filename('games/ANT.SC8'), 'schip')
+        self.assertEqual(profile_for_filename('games/t8nks.xo8'), 'xochip')
+        self.assertEqual(profile_for_filename('games/PONG'), 'chip8')
+
+    def test_shift(self):
+        for profile, expected in (('chip8', (0x08, 1)), ('vip', (0x02, 0))):
+            vm = self.vm(profile)
+            vm.v[0x0], vm.v[0x1] = 0x11, 0x04
+            vm.opcode.instruction_lookup(0x8016)
+            self.assertEqual((vm.v[0x0], vm.v[0xf]), expected)
+
+        vm = self.vm('xochip')
+        vm.v[0x0], vm.v[0x1] = 0x01, 0x81
+        vm.opcode.instruction_lookup(0x801E)
+        self.assertEqual((vm.v[0x0], vm.v[0xf]), (0x02, 1))
+
+    def test_vf_reset(self):
+        for profile, expected in (('chip8', 0xaa), ('vip', 0)):
+            vm = self.vm(profile)
+            vm.v[0xf] = 0xaa
+            vm.opcode.instruction_lookup(0x8011)
+            self.assertEqual(vm.v[0xf], expected)
+
+    def test_load_store_i(self):
+        for profile, expected in (('schip', 0x300), ('vip', 0x303)):
+            vm = self.vm(profile)
+            vm.i = 0x300
+            vm.opcode.instruction_lookup(0xF255)
+            self.assertEqual(vm.i, expected)
+            vm.opcode.instruction_lookup(0xF265)
+            self.assertEqual(vm.i, expected + expected - 0x300)
+
+    def test_jump(self):
+        for profile, expected in (('chip8', 0x310), ('schip', 0x320)):
+            vm = self.vm(profile)
+            vm.v[0x0], vm.v[0x3] = 0x10, 0x20
+            vm.opcode.instruction_lookup(0xB300)
+            self.assertEqual(vm.pc, expected)
+
+    def test_sprite_clipping(self):
+        for profile, wrapped in (('chip8', 1), ('schip', 0)):
+            vm = self.vm(profile)
+            vm.i = 0x0
+            vm.v[0x0], vm.v[0x1] = 62 + 64, 30
+            # Draws the "0" font sprite in the bottom right corner
+            vm.opcode.instruction_lookup(0xD015)
+
+            display = vm.display
+            self.assertEqual(display.get_pixel((62, 30)), 1)
+            self.assertEqual(display.get_pixel((63, 31)), 0)
+            self.assertEqual(display.get_pixel((0, 30)), wrapped)
+            self.assertEqual(display.get_pixel((62, 0)), wrapped)
+            self.assertEqual(sum(display.pixels), 14 if wrapped else 3)
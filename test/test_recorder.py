@@ -0,0 +1,192 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import os
+import random
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+
+import pygame
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.recorder import (InputRecorder, Recorder, ReplayFormatException,
+                            load_replay, lzw_compress, play_replay)
+
+# Lit pixel (x, 0) in every recorded frame
+FRAMES = [2, 2, 5, 5, 5, 2]
+
+KEYS = """
+    loop:   ldk v3
+            rnd v4, 0xff
+            ldr v5, v3
+            jmp loop
+"""
+
+
+def lzw_decompress(data, min_code_size):
+    """Reference GIF LZW decoder."""
+    clear, bits, length, out = 1 << min_code_size, 0, 0, bytearray()
+    table, code_size, previous = None, 0, None
+    for byte in bytearray(data):
+        bits |= byte << length
+        length += 8
+        while length >= code_size or table is None:
+            if table is None:
+                table, code_size = [bytearray([i]) for i in range(clear + 2)], min_code_size + 1
+            if length < code_size:
+                break
+            code = bits & ((1 << code_size) - 1)
+            bits >>= code_size
+            length -= code_size
+            if code == clear:
+                table, code_size, previous = [bytearray([i]) for i in range(clear + 2)], \
+                    min_code_size + 1, None
+                continue
+            if code == clear + 1:
+                return out
+            if previous is None:
+                entry = table[code]
+            else:
+                entry = table[code] if code < len(table) else previous + previous[:1]
+                if len(table) < 0x1000:
+                    table.append(previous + entry[:1])
+            out.extend(entry)
+            previous = entry
+            if len(table) == 1 << code_size and code_size < 12:
+                code_size += 1
+    return out
+
+
+def gif_frames(fname):
+    """Returns the delays of the GIF frames."""
+    with open(fname, 'rb') as f:
+        data = bytearray(f.read())
+    delays = []
+    offset = data.find(b'\x21\xf9\x04')
+    while offset != -1:
+        delays.append(struct.unpack('<H', bytes(data[offset + 4:offset + 6]))[0])
+        offset = data.find(b'\x21\xf9\x04', offset + 1)
+    return delays
+
+
+def png_chunks(fname):
+    with open(fname, 'rb') as f:
+        data = f.read()
+    offset, chunks = 8, []
+    while offset < len(data):
+        length, = struct.unpack('>I', data[offset:offset + 4])
+        kind = data[offset + 4:offset + 8]
+        payload = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack('>I', data[offset + 8 + length:offset + 12 + length])
+        assert crc == zlib.crc32(kind + payload) & 0xffffffff
+        chunks.append((kind, payload))
+        offset += 12 + length
+    return chunks
+
+
+class TestRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.vm = Chip8([], headless=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def record(self, name, scale=2):
+        fname = os.path.join(self.path, name)
+        recorder = Recorder(self.vm, fname, scale)
+        recorder.attach()
+        for x in FRAMES:
+            self.vm.display.clear_display()
+            self.vm.display.set_pixel((x, 0), 1)
+            self.vm.end_frame()
+        recorder.detach()
+        recorder.close()
+        return fname
+
+    def test_lzw(self):
+        indices = bytearray(random.Random(1).choice([0, 0, 0, 1]) for _ in range(30000))
+        self.assertEqual(lzw_decompress(lzw_compress(indices, 2), 2), indices)
+
+    def test_gif(self):
+        fname = self.record('out.gif')
+
+        # The identical frames are merged (the delays in 1/100s)
+        self.assertEqual(gif_frames(fname), [3, 5, 2])
+
+        image = pygame.image.load(fname)
+        self.assertEqual(image.get_size(), (128, 64))
+        self.assertEqual(image.get_at((5, 1)), (255, 255, 255, 255))
+        self.assertEqual(image.get_at((3, 1)), (0, 0, 0, 255))
+        self.assertEqual(image.get_at((0, 0)), (0, 0, 0, 255))
+
+    def test_apng(self):
+        fname = self.record('out.apng')
+        chunks = png_chunks(fname)
+        kinds = [kind for kind, _ in chunks]
+        self.assertEqual(kinds[:4], [b'IHDR', b'acTL', b'fcTL', b'IDAT'])
+        self.assertEqual(kinds.count(b'fcTL'), 3)
+        self.assertEqual(kinds.count(b'fdAT'), 2)
+        self.assertEqual(struct.unpack('>II', chunks[1][1]), (3, 0))
+
+        delays = [struct.unpack('>HH', data[20:24]) for kind, data in chunks if kind == b'fcTL']
+        self.assertEqual(delays, [(2, 60), (3, 60), (1, 60)])
+        self.assertEqual(pygame.image.load(fname).get_at((5, 1)), (255, 255, 255, 255))
+
+    def test_y4m(self):
+        fname = self.record('out.y4m')
+        with open(fname, 'rb') as f:
+            header = f.readline()
+            data = f.read()
+        self.assertEqual(header, b'YUV4MPEG2 W128 H64 F60:1 Ip A1:1 Cmono\n')
+        self.assertEqual(len(data), len(FRAMES) * (6 + 128 * 64))
+        self.assertEqual(bytearray(data[6:6 + 8]), bytearray([0, 0, 0, 0, 255, 255, 0, 0]))
+        self.assertEqual(data[:6 + 128 * 64], data[6 + 128 * 64:2 * (6 + 128 * 64)])
+
+    def test_format(self):
+        with self.assertRaises(ValueError):
+            Recorder(self.vm, os.path.join(self.path, 'out.avi'))
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.fname = os.path.join(self.path, 'replay.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_replay(self):
+        vm = Chip8(assemble(KEYS), headless=True, seed=7)
+        recorder = InputRecorder(vm, self.fname, 'ab' * 32, 'chip8', 7, 4)
+        recorder.attach()
+        for frame in range(20):
+            for _ in range(4):
+                vm.cycle()
+            vm.end_frame()
+            vm.keys = 1 << (frame % 16) if frame % 3 else 0
+        recorder.detach()
+        recorder.close()
+
+        replay = load_replay(self.fname)
+        self.assertEqual((replay.rom, replay.quirks, replay.seed), ('ab' * 32, 'chip8', 7))
+        self.assertEqual((replay.cycles_per_frame, replay.frames), (4, 20))
+
+        replayed = Chip8(assemble(KEYS), headless=True, seed=7)
+        play_replay(replayed, replay)
+        self.assertEqual(replayed.state.block, vm.state.block)
+
+    def test_invalid(self):
+        with open(self.fname, 'w') as f:
+            f.write('chip8-replay 1\nrom 00\n')
+        with self.assertRaises(ReplayFormatException):
+            load_replay(self.fname)
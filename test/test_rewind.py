@@ -0,0 +1,114 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.rewind import Rewind, apply_delta, encode_delta
+from chip8.state import STATE_SIZE
+
+# Counts in V0 and draws the counter digit (the framebuffer changes every frame)
+COUNTER = """
+    loop:   add v0, 1
+            ldr v1, v0
+            and v1, v2
+            cls
+            ldf v1
+            drw v3, v3, 5
+            jmp loop
+"""
+
+
+def run_frames(vm, frames, cycles=6):
+    states = []
+    for _ in range(frames):
+        for _ in range(cycles):
+            vm.cycle()
+        vm.end_frame()
+        states.append(bytearray(vm.state.block))
+    return states
+
+
+class TestDelta(unittest.TestCase):
+    def test_round_trip(self):
+        old = bytearray(STATE_SIZE)
+        new = bytearray(old)
+        new[3], new[700], new[701], new[STATE_SIZE - 1] = 1, 2, 3, 4
+        out = bytearray(256)
+        end = encode_delta(old, new, out, 0, len(out))
+        self.assertEqual(end, 3 * 4 + 1 + 2 + 1)
+
+        apply_delta(old, out, 0, end)
+        self.assertEqual(old, new)
+        apply_delta(old, out, 0, end)
+        self.assertEqual(old, bytearray(STATE_SIZE))
+
+    def test_unchanged(self):
+        block = bytearray(STATE_SIZE)
+        self.assertEqual(encode_delta(block, block, bytearray(16), 4, 16), 4)
+
+    def test_limit(self):
+        new = bytearray(b'\x01' * STATE_SIZE)
+        self.assertIsNone(encode_delta(bytearray(STATE_SIZE), new, bytearray(64), 0, 64))
+
+
+class TestRewind(unittest.TestCase):
+    def setUp(self):
+        self.vm = Chip8(assemble(COUNTER), headless=True)
+        self.vm.v[2] = 0xf
+
+    def test_step_back(self):
+        rewind = Rewind(self.vm, seconds=1, frame_rate=20, keyframe_interval=4)
+        rewind.attach()
+        states = run_frames(self.vm, 10)
+
+        for state in reversed(states[:-1]):
+            self.assertTrue(rewind.step_back())
+            self.assertEqual(self.vm.state.block, state)
+        self.assertFalse(rewind.step_back())
+        self.assertEqual(rewind.frames, 1)
+
+    def test_resume_after_rewind(self):
+        rewind = Rewind(self.vm, seconds=1, frame_rate=20, keyframe_interval=4)
+        rewind.attach()
+        states = run_frames(self.vm, 7)
+        for _ in range(3):
+            rewind.step_back()
+        self.assertEqual(self.vm.state.block, states[3])
+
+        states = states[:4] + run_frames(self.vm, 5)
+        for state in reversed(states[:-1]):
+            rewind.step_back()
+            self.assertEqual(self.vm.state.block, state)
+
+    def test_bounded(self):
+        rewind = Rewind(self.vm, seconds=1, frame_rate=8, keyframe_interval=4)
+        rewind.attach()
+        size = rewind.memory_size
+        states = run_frames(self.vm, 50)
+
+        self.assertEqual(rewind.memory_size, size)
+        self.assertLessEqual(rewind.frames, rewind.groups * 4)
+        self.assertGreaterEqual(rewind.frames, 8)
+        frames = rewind.frames
+        while rewind.step_back():
+            pass
+        self.assertEqual(self.vm.state.block, states[-frames])
+
+    def test_small_arena(self):
+        rewind = Rewind(self.vm, seconds=1, frame_rate=20, keyframe_interval=4, delta_budget=8)
+        rewind.attach()
+        states = run_frames(self.vm, 6)
+
+        self.assertEqual(rewind.frames, 6)
+        for state in reversed(states[:-1]):
+            rewind.step_back()
+            self.assertEqual(self.vm.state.block, state)
+
+
+if __name__ == '__main__':
+    unittest.main()
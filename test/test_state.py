@@ -0,0 +1,103 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+from chip8.chip8 import Chip8
+from chip8.state import PAGED_STATE_SIZE, STATE_SIZE, MachineState
+
+
+class TestMachineState(unittest.TestCase):
+
+    def setUp(self):
+        self.vm = Chip8([0xC0, 0xFF, 0x12, 0x00], headless=True, seed=1)
+
+    def test_views(self):
+        state = MachineState()
+        self.assertEqual(len(state.block), STATE_SIZE)
+
+        state.memory[0x200] = 0xaa
+        state.v[0xf] = 0xbb
+        state.registers.pc = 0x1234
+        state.framebuffer[0] = 1
+        self.assertIn(0xaa, state.block)
+        self.assertIn(0xbb, state.block)
+
+        copy = state.copy()
+        self.assertEqual(copy.block, state.block)
+        self.assertEqual(copy.registers.pc, 0x1234)
+        self.assertEqual(copy.framebuffer[0], 1)
+
+    def test_registers(self):
+        self.vm.i = 0xabc
+        self.assertEqual(self.vm.state.registers.i, 0xabc)
+        self.vm.state.registers.pc = 0x300
+        self.vm.load_registers()
+        self.assertEqual(self.vm.pc, 0x300)
+        self.assertEqual(self.vm.mem.fetch_word(0x200), 0xC0FF)
+
+    def test_snapshot_restore(self):
+        snapshot = self.vm.snapshot()
+        v, pixels = self.vm.v, self.vm.display.pixels
+
+        self.vm.cycle()
+        self.vm.mem.store_byte(0x300, 0x11)
+        self.vm.display.set_pixel((1, 1), 1)
+        self.vm.restore(snapshot)
+
+        self.assertEqual(self.vm.pc, 0x200)
+        self.assertEqual(self.vm.mem.fetch_byte(0x300), 0)
+        self.assertEqual(sum(pixels), 0)
+        self.assertIs(self.vm.v, v)
+
+    def test_clone(self):
+        self.vm.cycle()
+        clone = self.vm.clone()
+        self.assertEqual(clone.state.block, self.vm.state.block)
+        self.assertIsNone(clone.display.surface)
+
+        # The clones are independent & deterministic
+        for _ in range(4):
+            self.vm.cycle()
+            clone.cycle()
+        self.assertEqual(clone.state.block, self.vm.state.block)
+
+        clone.v[0x0] = 0x42
+        clone.display.set_pixel((0, 0), 1)
+        self.assertNotEqual(self.vm.v[0x0], 0x42)
+        self.assertEqual(self.vm.display.get_pixel((0, 0)), 0)
+
+
+class TestPagedState(unittest.TestCase):
+
+    def setUp(self):
+        self.image = Chip8.memory_image([0x60, 0x05, 0xA3, 0x00, 0xF0, 0x55, 0x12, 0x06])
+        self.vm = Chip8(None, headless=True, pages=self.image)
+
+    def test_shared_image(self):
+        other = Chip8(None, headless=True, pages=self.image)
+        self.assertEqual(len(self.vm.state.block), PAGED_STATE_SIZE)
+        self.assertEqual(self.vm.pc, 0x200)
+        self.assertEqual(self.vm.mem.fetch_word(0x200), 0x6005)
+        self.assertEqual(self.vm.mem.fetch_byte(0x0), 0xF0)  # The font of 0
+
+        # LD [I], V0 copies only the written page
+        self.vm.step(3)
+        self.assertEqual(self.vm.mem.fetch_byte(0x300), 0x05)
+        self.assertEqual(other.mem.fetch_byte(0x300), 0)
+        self.assertEqual(self.vm.mem.dirty_pages(), [3])
+        self.assertIs(self.vm.mem.pages[2], other.mem.pages[2])
+
+    def test_snapshot_restore_clone(self):
+        snapshot = self.vm.snapshot()
+        self.vm.step(3)
+        clone = self.vm.clone()
+        self.assertIs(clone.mem.pages[3], self.vm.mem.pages[3])
+
+        self.vm.restore(snapshot)
+        self.assertEqual((self.vm.pc, self.vm.v[0]), (0x200, 0))
+        self.assertEqual(self.vm.mem.fetch_byte(0x300), 0)
+        self.assertEqual(clone.mem.fetch_byte(0x300), 0x05)
@@ -0,0 +1,71 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8, RunResult
+
+COUNTER = """
+    loop:   add v0, 1
+            se v0, 0
+            jmp loop
+            add v1, 1
+            jmp loop
+"""
+
+
+class TestStepping(unittest.TestCase):
+    def setUp(self):
+        self.vm = Chip8(assemble(COUNTER), headless=True)
+        self.vm.cycles_per_frame = 10
+        self.frames = []
+        self.vm.frame_listeners.append(lambda: self.frames.append(self.vm.frame))
+
+    def test_step(self):
+        self.assertEqual(self.vm.step(), RunResult('cycles', 1, 0))
+        self.assertEqual(self.vm.v[0], 1)
+        self.assertEqual(self.vm.step(24), RunResult('cycles', 24, 2))
+        self.assertEqual(self.vm.frame_cycles, 5)
+        self.assertEqual(self.frames, [1, 2])
+
+    def test_pc(self):
+        result = self.vm.run_until(pc=0x206)
+        self.assertEqual(result, RunResult('pc', 256 * 3 - 1, 76))
+        self.assertEqual((self.vm.pc, self.vm.v[0], self.vm.v[1]), (0x206, 0, 0))
+
+        # Stops at the address again, not immediately
+        self.assertEqual(self.vm.run_until(pc=0x206).cycles, 256 * 3 + 1)
+
+    def test_frame(self):
+        self.assertEqual(self.vm.run_until(frame=3), RunResult('frame', 30, 3))
+        self.assertEqual(self.vm.run_until(frame=3), RunResult('frame', 0, 0))
+        self.assertEqual(self.frames, [1, 2, 3])
+
+    def test_predicate(self):
+        calls = []
+
+        def predicate(vm):
+            calls.append(vm.pc)
+            return vm.v[1] == 2
+
+        result = self.vm.run_until(predicate=predicate)
+        self.assertEqual(result.reason, 'predicate')
+        self.assertEqual(self.vm.v[1], 2)
+        self.assertEqual(self.vm.pc, 0x200)  # At the end of the block
+        # Called after the jumps & skips and at the frame ends only
+        self.assertLess(len(calls), result.cycles)
+
+    def test_halted(self):
+        vm = Chip8(assemble('ld v0, 1\nend: jmp end'), headless=True)
+        self.assertEqual(vm.run_until(), RunResult('halted', 16, 1))
+
+    def test_cycles_limit(self):
+        self.assertEqual(self.vm.run_until(pc=0x300, cycles=7), RunResult('cycles', 7, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
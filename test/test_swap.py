@@ -0,0 +1,64 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import unittest
+
+from chip8.swap import Swaps
+
+
+class Target(object):
+    def method(self):
+        return []
+
+
+def appending(label):
+    def wrapper(method):
+        def wrapped():
+            return method() + [label]
+        return wrapped
+    return wrapper
+
+
+class TestSwaps(unittest.TestCase):
+
+    def setUp(self):
+        self.target = Target()
+        self.a, self.b, self.c = Swaps(), Swaps(), Swaps()
+
+    def test_restore_in_order(self):
+        self.a.swap(self.target, 'method', appending('a'))
+        self.a.swap(self.target, 'method', appending('a'))  # Once per method
+        self.b.swap(self.target, 'method', appending('b'))
+        self.assertEqual(self.target.method(), ['a', 'b'])
+
+        self.b.restore_all()
+        self.assertEqual(self.target.method(), ['a'])
+        self.a.restore_all()
+        self.assertEqual(self.target.method(), [])
+        self.assertNotIn('method', self.target.__dict__)
+
+    def test_restore_from_the_middle(self):
+        for swaps, label in ((self.a, 'a'), (self.b, 'b'), (self.c, 'c')):
+            swaps.swap(self.target, 'method', appending(label))
+
+        # The wrappers above are kept (built again over the one below)
+        self.b.restore(self.target, 'method')
+        self.assertEqual(self.target.method(), ['a', 'c'])
+        self.a.restore_all()
+        self.assertEqual(self.target.method(), ['c'])
+        self.c.restore_all()
+        self.assertNotIn('method', self.target.__dict__)
+
+    def test_instance_attribute(self):
+        self.target.method = lambda: ['instance']
+        self.a.swap(self.target, 'method', appending('a'))
+        self.a.restore(self.target, 'method')
+        self.a.restore(self.target, 'method')  # Not swapped anymore
+        self.assertEqual(self.target.method(), ['instance'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import io
+import os
+import unittest
+
+from chip8.chip8 import Chip8
+from chip8.display import HEIGHT, WIDTH
+from chip8.terminal import (KEY_HOLD_FRAMES, TerminalKeypad, TerminalRenderer, TerminalRunner,
+                            braille_cells, half_block_cells)
+
+
+def frame(*points):
+    pixels = bytearray(WIDTH * HEIGHT)
+    for x, y in points:
+        pixels[y * WIDTH + x] = 1
+    return pixels
+
+
+class TestTerminalRenderer(unittest.TestCase):
+
+    def test_cells(self):
+        pixels = frame((0, 0), (1, 1), (2, 0), (2, 1), (1, 3), (63, 31))
+        half = half_block_cells(pixels, WIDTH, HEIGHT)
+        self.assertEqual((len(half), len(half[0])), (16, 64))
+        self.assertEqual(list(half[0][:4]), [1, 2, 3, 0])
+        self.assertEqual(half[1][1], 2)
+        self.assertEqual(half[15][63], 2)
+
+        braille = braille_cells(pixels, WIDTH, HEIGHT)
+        self.assertEqual((len(braille), len(braille[0])), (8, 32))
+        self.assertEqual(list(braille[0][:2]), [0x01 | 0x10 | 0x80, 0x01 | 0x02])
+        self.assertEqual(braille[7][31], 0x80)
+
+    def test_diff(self):
+        renderer = TerminalRenderer(WIDTH, HEIGHT)
+        full = renderer.render(frame((0, 0)))
+        self.assertEqual(full.count(u'\x1b['), 16)
+        self.assertTrue(full.startswith(u'\x1b[1;1H\u2580 '))
+
+        self.assertEqual(renderer.render(frame((0, 0))), u'')
+        self.assertEqual(renderer.render(frame((0, 0), (10, 5))), u'\x1b[3;11H\u2584')
+
+        # The short gaps of unchanged cells are rewritten instead of moving the cursor
+        self.assertEqual(renderer.render(frame((0, 0), (8, 4), (10, 5), (11, 4))),
+                         u'\x1b[3;9H\u2580 \u2584\u2580')
+        self.assertEqual(renderer.render(frame((0, 0), (10, 5), (40, 4))),
+                         u'\x1b[3;9H  \u2584 \x1b[3;41H\u2580')
+
+    def test_braille(self):
+        renderer = TerminalRenderer(WIDTH, HEIGHT, 'braille')
+        renderer.render(frame())
+        self.assertEqual(renderer.render(frame((3, 5))), u'\x1b[2;2H\u2810')
+
+
+class TestTerminalRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.read, self.write = os.pipe()
+        self.stdin = os.fdopen(self.read)
+
+    def tearDown(self):
+        self.stdin.close()
+        os.close(self.write)
+
+    def test_keypad(self):
+        keypad = TerminalKeypad(self.read)
+        self.assertEqual(keypad.poll(), 0)
+
+        os.write(self.write, b'5A')
+        self.assertEqual(keypad.poll(), 1 << 0x5 | 1 << 0xA)
+        for _ in range(KEY_HOLD_FRAMES - 1):
+            self.assertEqual(keypad.poll(), 1 << 0x5 | 1 << 0xA)
+        self.assertEqual(keypad.poll(), 0)
+
+        os.write(self.write, b'q')
+        keypad.poll()
+        self.assertTrue(keypad.quit)
+
+    def test_frames(self):
+        # Waits for a key and draws its digit
+        vm = Chip8([0xF1, 0x0A, 0x00, 0xE0, 0xF1, 0x29, 0xD0, 0x05, 0x12, 0x00], headless=True)
+        stdout = io.BytesIO()
+        runner = TerminalRunner(vm, 5, stdin=self.stdin, stdout=stdout)
+
+        runner.frame()
+        self.assertEqual(stdout.getvalue(), b'')
+
+        os.write(self.write, b'7')
+        runner.frame()
+        self.assertEqual(vm.v[1], 7)
+        self.assertIn(u'\x1b[1;1H\u2580\u2580\u2580\u2588'.encode('utf-8'), stdout.getvalue())
+
+        # Redrawn the same digit, nothing has changed on the screen
+        written = runner.bytes_written
+        runner.frame()
+        self.assertFalse(vm.display.dirty)
+        self.assertEqual(runner.bytes_written, written)
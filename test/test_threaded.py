@@ -0,0 +1,85 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import time
+import unittest
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.display import COLORS
+from chip8.opcode import InvalidOpcodeException
+from chip8.threaded import FrameBuffers, ThreadedRunner
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.001)
+    return condition()
+
+
+class TestThreadedRunner(unittest.TestCase):
+
+    def test_frame_buffers(self):
+        buffers = FrameBuffers(4)
+        pixels = bytearray([0, 1, 0, 1])
+        buffers.publish(pixels)
+        pixels[0] = 1
+
+        self.assertEqual(buffers.sequence, 1)
+        self.assertEqual(buffers.front, bytearray([0, 1, 0, 1]))
+
+    def test_publish_and_present(self):
+        vm = Chip8(assemble("""
+                    ld v0, 0
+                    ldf v0
+                    drw v0, v0, 5
+            loop:   jmp loop
+        """))
+        surface = vm.display.surface
+        surface.fill(COLORS[0])
+
+        runner = ThreadedRunner(vm, cycles_per_frame=8, frame_rate=1000)
+        runner.start()
+        self.assertTrue(wait_for(lambda: runner.buffers.sequence > 0))
+        time.sleep(0.02)
+        runner.stop()
+
+        # Only one frame has changed the framebuffer, then the program halted
+        self.assertEqual(runner.buffers.sequence, 1)
+        self.assertEqual(runner.frames, 1)
+        self.assertEqual(runner.buffers.front[:5], bytearray([1, 1, 1, 1, 0]))
+
+        # The drawing instructions don't touch the screen
+        self.assertEqual(surface.get_at((0, 0)), COLORS[0])
+
+        vm.display.present(runner.buffers.front)
+        self.assertEqual(surface.get_at((0, 0)), COLORS[1])
+        self.assertEqual(surface.get_at((4 * vm.display.scale, 0)), COLORS[0])
+
+    def test_keypad(self):
+        vm = Chip8(assemble("""
+                    ldk v1
+            loop:   jmp loop
+        """))
+        runner = ThreadedRunner(vm, cycles_per_frame=4, frame_rate=1000)
+        runner.start()
+        time.sleep(0.01)
+        self.assertEqual(runner.frames, 0)  # Idle until a key is pressed
+        self.assertEqual(vm.pc, 0x200)
+
+        vm.keys = 1 << 0x7
+        self.assertTrue(wait_for(lambda: vm.pc == 0x202))
+        runner.stop()
+        self.assertEqual(vm.v[1], 0x7)
+
+    def test_error(self):
+        vm = Chip8([0x00, 0x00])
+        runner = ThreadedRunner(vm, cycles_per_frame=1, frame_rate=1000)
+        runner.start()
+        self.assertTrue(wait_for(lambda: not runner.running))
+        with self.assertRaises(InvalidOpcodeException):
+            runner.stop()
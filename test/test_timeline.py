@@ -0,0 +1,130 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import gc
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from chip8.assembler import assemble
+from chip8.chip8 import Chip8
+from chip8.threaded import ThreadedRunner
+from chip8.timeline import EMULATE, Timeline
+
+# Draws the digit, clears the screen & beeps
+PROGRAM = """
+    loop:   ldf v0
+            drw v0, v0, 5
+            cls
+            ld v0, 2
+            ldst v0
+            jmp loop
+"""
+
+
+class TestTimeline(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_frame(self, vm, timeline, cycles=6):
+        vm.handle_events()
+        start = time.time()
+        for _ in range(cycles):
+            vm.cycle()
+        vm.end_frame()
+        timeline.metrics.frame(cycles, time.time() - start)
+        vm.sleep(0.001)
+
+    def test_phases(self):
+        vm = Chip8(assemble(PROGRAM))
+        timeline = Timeline(vm)
+        timeline.attach()
+        for _ in range(3):
+            self.run_frame(vm, timeline)
+
+        phases = [span[0] for span in timeline.spans()]
+        self.assertEqual(phases[:5], ['input', 'flip', 'raster', 'flip', 'raster'])
+        self.assertIn('audio', phases)
+        self.assertEqual(phases.count('sleep'), 3)
+        self.assertEqual(set(span[1] for span in timeline.spans()), {threading.current_thread().name})
+        for _, _, start, end in timeline.spans():
+            self.assertLessEqual(start, end)
+
+        # The rasterization is nested in the emulated batch
+        emulate = [span for span in timeline.spans() if span[0] == 'emulate'][0]
+        raster = [span for span in timeline.spans() if span[0] == 'raster'][0]
+        self.assertTrue(emulate[2] <= raster[2] <= raster[3] <= emulate[3])
+
+        timeline.detach()
+        self.assertNotIn('sleep', vm.__dict__)
+        self.assertNotIn('flip', vm.display.__dict__)
+        self.assertNotIn('frame', timeline.metrics.__dict__)
+        self.assertEqual(timeline.metrics.frames, 3)
+
+    def test_ring(self):
+        timeline = Timeline(Chip8(assemble(PROGRAM), headless=True), size=4)
+        for index in range(6):
+            timeline.record(EMULATE, index, index + 0.5)
+        self.assertEqual((len(timeline), timeline.count), (4, 6))
+        self.assertEqual([span[2] for span in timeline.spans()], [2, 3, 4, 5])
+
+    @unittest.skipUnless(hasattr(gc, 'callbacks'), 'gc.callbacks requires Python 3')
+    def test_gc(self):
+        timeline = Timeline(Chip8(assemble(PROGRAM), headless=True))
+        timeline.attach()
+        gc.collect()
+        timeline.detach()
+        gc.collect()
+        self.assertEqual([span[0] for span in timeline.spans()], ['gc'])
+
+    def test_threaded(self):
+        vm = Chip8(assemble(PROGRAM))
+        timeline = Timeline(vm)
+        timeline.attach()
+        runner = ThreadedRunner(vm, cycles_per_frame=6, frame_rate=1000, metrics=timeline.metrics)
+        runner.start()
+        time.sleep(0.05)
+        runner.stop()
+        vm.display.present(runner.buffers.front)
+        timeline.detach()
+
+        threads = dict((span[0], span[1]) for span in timeline.spans())
+        self.assertNotEqual(threads['emulate'], threads['present'])
+        self.assertEqual(threads['emulate'], threads['sleep'])
+        self.assertEqual(threads['present'], threading.current_thread().name)
+
+    def test_write(self):
+        vm = Chip8(assemble(PROGRAM))
+        timeline = Timeline(vm)
+        timeline.attach()
+        self.run_frame(vm, timeline)
+        timeline.detach()
+
+        fname = os.path.join(self.dir, 'trace.json')
+        timeline.write(fname)
+        with open(fname) as f:
+            trace = json.load(f)
+
+        spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+        self.assertEqual(len(spans), len(timeline))
+        self.assertEqual(spans[0]['name'], 'input')
+        self.assertTrue(all(event['dur'] >= 0 and event['ts'] >= 0 for event in spans))
+        names = [event['args']['name'] for event in trace['traceEvents']
+                 if event['name'] == 'thread_name']
+        self.assertEqual(names, [threading.current_thread().name])
+        self.assertEqual(trace['otherData']['overwritten'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
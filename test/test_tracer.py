@@ -0,0 +1,106 @@
+#
+# CHIP-8 interpreter.
+#
+# Copyright (C) 2018 Mateusz Furga
+# This software is released under the MIT license.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from chip8.chip8 import Chip8
+from chip8.debugger import Debugger
+from chip8.tracer import (RECORD_INSTRUCTION, RECORD_MEMORY, TraceFormatException,
+                          TraceReader, TraceWriter, Tracer, filter_records, zstandard)
+
+PROGRAM = [
+    0x61, 0x7B,  # LD V1, 0x7B
+    0xA3, 0x00,  # LD I, 0x300
+    0xF1, 0x33,  # LD B, V1
+    0x12, 0x00   # JP 0x200
+]
+
+
+class TestTracer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tmp, 'trace.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def trace_program(self, codec, cycles, chunk_records=3):
+        vm = Chip8(PROGRAM)
+        tracer = Tracer(vm, TraceWriter(self.fname, codec, chunk_records))
+        tracer.attach()
+        for _ in range(cycles):
+            opcode = vm.mem.fetch_word(vm.pc)
+            vm.pc += 2
+            vm.opcode.instruction_lookup(opcode)
+        tracer.detach()
+        tracer.writer.close()
+        return vm
+
+    def test_round_trip(self):
+        for codec in ('none', 'zlib'):
+            self.trace_program(codec, 8)
+            records = list(TraceReader(self.fname))
+
+            instructions = [r for r in records if r.kind == RECORD_INSTRUCTION]
+            self.assertEqual([r.cycle for r in instructions], list(range(8)))
+            self.assertEqual([r.pc for r in instructions[:4]], [0x200, 0x202, 0x204, 0x206])
+            self.assertEqual(instructions[0].mask, 1 << 1)
+            self.assertEqual(bytearray(instructions[0].data)[1], 0x7B)
+            self.assertEqual(instructions[1].i, 0x300)
+
+            writes = [r for r in records if r.kind == RECORD_MEMORY]
+            self.assertEqual(len(writes), 6)
+            self.assertEqual([w.pc for w in writes[:3]], [0x300, 0x301, 0x302])
+            self.assertEqual([bytearray(w.data)[0] for w in writes[:3]], [1, 2, 3])
+
+    @unittest.skipIf(zstandard is None, 'zstandard is not installed')
+    def test_round_trip_zstd(self):
+        self.trace_program('zstd', 8)
+        self.assertEqual(len(list(TraceReader(self.fname))), 14)
+
+    def test_detach(self):
+        vm = self.trace_program('none', 1)
+        self.assertNotIn('instruction_lookup', vm.opcode.__dict__)
+        self.assertNotIn('store_byte', vm.mem.__dict__)
+
+    def test_detach_under_debugger(self):
+        vm = Chip8(PROGRAM)
+        tracer = Tracer(vm, TraceWriter(self.fname, 'none'))
+        tracer.attach()
+        debugger = Debugger(vm)
+        debugger.add_breakpoint(0x202)
+        tracer.detach()  # Keeps the breakpoints swapped above
+        tracer.writer.close()
+
+        stop = debugger.cont(max_cycles=20)
+        self.assertEqual((stop.reason, stop.pc), ('breakpoint', 0x202))
+        debugger.remove_breakpoint(0x202)
+        self.assertNotIn('instruction_lookup', vm.opcode.__dict__)
+
+    def test_filter_records(self):
+        self.trace_program('zlib', 8)
+
+        records = filter_records(TraceReader(self.fname), pc_range=(0x204, 0x206))
+        self.assertEqual([r.pc for r in records], [0x204, 0x206, 0x204, 0x206])
+
+        records = filter_records(TraceReader(self.fname), opcode=0xA000, opcode_mask=0xF000)
+        self.assertEqual([r.opcode for r in records], [0xA300, 0xA300])
+
+        records = filter_records(TraceReader(self.fname), register=(1, 0x7B))
+        self.assertEqual(len(list(records)), 8)
+
+        records = filter_records(TraceReader(self.fname), pc_range=(0x301, 0x301), memory=True)
+        self.assertEqual([r.kind for r in records], [RECORD_MEMORY, RECORD_MEMORY])
+
+    def test_invalid_file(self):
+        with open(self.fname, 'wb') as f:
+            f.write(b'garbage!')
+        with self.assertRaises(TraceFormatException):
+            list(TraceReader(self.fname))